@@ -0,0 +1,196 @@
+import numpy as np
+import pandas as pd
+
+from binning import (AGE_EDGES, PROJECT_EDGES, SALARY_EDGES, TENURE_EDGES, age_groups,
+                     project_categories, salary_ranges, tenure_groups)
+from timeseries import HeadcountSeries
+
+
+# Aggregation step of each dashboard visualization. Every function takes the
+# filtered assignment frame, leaves it untouched and returns a small result
+# that the chart is drawn from, so results can be cached per filter selection.
+# Results ranked by a count or average break ties by their label, as the
+# normalized model and the SQL backend do, so all three return the same rows
+# in the same order.
+
+
+# Visualization 1: Employee Turnover by Age Group
+def age_group_turnover(df, edges=AGE_EDGES):
+    leavers = df[df['left'] == 1]
+    age = (leavers['last_date'] - leavers['birth_date']).dt.days / 365
+    grouped_df = (leavers.groupby(age_groups(age, edges), observed=False)['emp_no']
+                  .nunique()
+                  .reset_index(name='NO_OF_EMP'))
+    grouped_df['age_group'] = grouped_df['age_group'].astype(str)
+    grouped_df['PCT'] = (grouped_df['NO_OF_EMP'] * 100.00) / grouped_df['NO_OF_EMP'].sum()
+    return grouped_df
+
+
+# Visualization 2: Year-wise Attrition Rate
+def attrition_rate_trend(df, freq="year"):
+    result = HeadcountSeries.from_frame(df, freq).table().rename(columns={'period': 'year'})
+    return result[result['total_emp'] > 0]
+
+
+# Visualization 3: Gender Distribution
+def gender_distribution(df):
+    female_count = df[df['sex'] == 'F'].shape[0]
+    male_count = df[df['sex'] == 'M'].shape[0]
+    gender_counts = pd.DataFrame({
+        'gender': ['Female', 'Male'],
+        'total_no': [female_count, male_count]
+    })
+    gender_counts['pct'] = (gender_counts['total_no'] * 100) / gender_counts['total_no'].sum()
+    return gender_counts
+
+
+# Visualization 4: Performance Rating Distribution
+def performance_rating_distribution(df):
+    grouped_df = df.groupby("Last_performance_rating", observed=True)["emp_no"].nunique().reset_index(name="total_emp")
+    grouped_df["Last_performance_rating"] = grouped_df["Last_performance_rating"].astype(str)
+    grouped_df["pct"] = (grouped_df["total_emp"] * 100.0) / grouped_df["total_emp"].sum()
+    return grouped_df.sort_values(by=["total_emp", "Last_performance_rating"], ascending=[False, True])
+
+
+# Visualization 5: Job Title Distribution
+def title_distribution(df):
+    result = df.groupby("title", observed=True)["emp_no"].nunique().reset_index(name="total_emp")
+    result["title"] = result["title"].astype(str)
+    return result.sort_values(by=["total_emp", "title"], ascending=[False, True])
+
+
+# Visualization 6: Projects Distribution
+def project_distribution(df, edges=PROJECT_EDGES):
+    return (df.groupby(project_categories(df['no_of_projects'], edges), observed=True)['emp_no']
+            .nunique()
+            .reset_index()
+            .rename(columns={'emp_no': 'Total_emp'}))
+
+
+# Histogram counts and bin edges, so the chart can be redrawn from the
+# counts with plt.hist(edges[:-1], bins=edges, weights=counts)
+def _histogram(values, bins):
+    counts, edges = np.histogram(values.dropna(), bins=bins)
+    return {'counts': counts, 'edges': edges}
+
+
+# Visualization 7: Distribution of Employees by Tenure
+def tenure_histogram(df):
+    return _histogram(df.drop_duplicates(subset="emp_no")["tenure"], bins=15)
+
+
+# Visualization 8: Tenure Distribution
+def tenure_group_distribution(df, edges=TENURE_EDGES):
+    grouped_df = df.groupby(tenure_groups(df["tenure"], edges), observed=True)['emp_no'].nunique().reset_index(name="NO_OF_EMP")
+    grouped_df["tenure_group"] = grouped_df["tenure_group"].astype(str)
+    grouped_df["PCT"] = (grouped_df["NO_OF_EMP"] * 100.00) / grouped_df["NO_OF_EMP"].sum()
+    return grouped_df
+
+
+# Visualization 9: Hiring Trend
+def hiring_trend(df):
+    hire_year = df["hire_date"].dt.year.rename("hire_year")
+    result = df.groupby(hire_year)["emp_no"].nunique().reset_index(name="employee_count")
+    return result.sort_values(by="hire_year")
+
+
+# Visualization 10: Exit Trends
+def exit_trend(df):
+    exit_year = df['last_date'].dt.year.rename('exit_year')
+    return (df.groupby(exit_year, observed=True)
+            .agg(total_exits=('emp_no', 'count'))
+            .reset_index()
+            .sort_values('exit_year'))
+
+
+# Visualization 11: Total Employees by Year
+def total_employees_by_year(df, freq="year"):
+    return HeadcountSeries.from_frame(df, freq).table().rename(columns={'period': 'years'})
+
+
+# Visualization 12: Employees by Department
+def department_headcount(df):
+    result = df.groupby('dept_name', observed=True)["emp_no"].nunique().reset_index(name='total_emp')
+    result['dept_name'] = result['dept_name'].astype(str)
+    return result.sort_values(by=['total_emp', 'dept_name'], ascending=[False, True]).reset_index(drop=True)
+
+
+# Visualization 13: Average Salary by Department
+def department_avg_salary(df):
+    df_grouped = df.groupby('dept_name', observed=True).agg(
+        avg_salary=('salary', 'mean'),
+        total_employees=('salary', 'count')
+    ).reset_index()
+    df_grouped['dept_name'] = df_grouped['dept_name'].astype(str)
+    return df_grouped.sort_values(by=['avg_salary', 'dept_name'], ascending=[False, True])
+
+
+# Visualization 14: Managers by Department
+def managers_by_department(df):
+    manager_counts = (df[df['title'] == 'Manager']
+                      .groupby('dept_name', observed=True)['emp_no']
+                      .count()
+                      .reset_index()
+                      .rename(columns={'emp_no': 'total_manager'}))
+    manager_counts['dept_name'] = manager_counts['dept_name'].astype(str)
+    return manager_counts.sort_values(by=['total_manager', 'dept_name'], ascending=[False, True])
+
+
+# Visualization 15: Year-wise Average Salary
+def salary_by_year(df, freq="year"):
+    return HeadcountSeries.from_frame(df, freq).table().rename(columns={'period': 'years'})
+
+
+# Visualization 16: Distribution of Employees by salary
+def salary_histogram(df):
+    return _histogram(df.drop_duplicates(subset=["emp_no"])["salary"], bins=15)
+
+
+# Visualization 17: Salary by Job Title
+def title_avg_salary(df):
+    result = df.groupby(['title', 'emp_no'], observed=True)['salary'].mean().reset_index()
+    result = result.groupby('title', observed=True)['salary'].mean().reset_index(name='avg_sal')
+    result['title'] = result['title'].astype(str)
+    return result.sort_values(by=['avg_sal', 'title'], ascending=[False, True])
+
+
+# Visualization 18: Salary by Performance Rating
+def rating_avg_salary(df):
+    filtered_table = df.drop_duplicates(subset='emp_no')
+    result = filtered_table.groupby('Last_performance_rating', observed=True).agg(
+        avg_salary=('salary', 'mean'),
+        employee_count=('emp_no', 'size')
+    ).reset_index()
+    return result.sort_values(by='Last_performance_rating')
+
+
+# Visualization 19: Employees by Salary Range
+def salary_range_distribution(df, edges=SALARY_EDGES):
+    avg_salary = df.groupby('emp_no')['salary'].transform('mean').round()
+    return df.groupby(salary_ranges(avg_salary, edges), observed=False).agg(
+        NO_OF_EMP=('emp_no', 'nunique')
+    ).reset_index()
+
+
+# All visualization aggregations in display order
+VISUALIZATIONS = {
+    "age_group_turnover": age_group_turnover,
+    "attrition_rate_trend": attrition_rate_trend,
+    "gender_distribution": gender_distribution,
+    "performance_rating_distribution": performance_rating_distribution,
+    "title_distribution": title_distribution,
+    "project_distribution": project_distribution,
+    "tenure_histogram": tenure_histogram,
+    "tenure_group_distribution": tenure_group_distribution,
+    "hiring_trend": hiring_trend,
+    "exit_trend": exit_trend,
+    "total_employees_by_year": total_employees_by_year,
+    "department_headcount": department_headcount,
+    "department_avg_salary": department_avg_salary,
+    "managers_by_department": managers_by_department,
+    "salary_by_year": salary_by_year,
+    "salary_histogram": salary_histogram,
+    "title_avg_salary": title_avg_salary,
+    "rating_avg_salary": rating_avg_salary,
+    "salary_range_distribution": salary_range_distribution,
+}
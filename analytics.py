@@ -0,0 +1,127 @@
+import numpy as np
+
+from aggregations import VISUALIZATIONS
+from cohorts import cohort_spells, survival_curves
+from data_loader import CHUNK_SIZE, SNAPSHOT_DIR, load_snapshot, prepare_data
+from employee_facts import build_employee_facts, filter_employee_facts
+from employee_facts import compute_kpis as kpis_from_facts
+from filters import DERIVED_FILTERS, apply_filters, filter_column, sidebar_selection
+
+
+# Headless analytics API of the dashboard: data preparation, the Key Metrics,
+# the 19 visualization aggregations and the cohort survival curves as plain
+# pandas/NumPy functions.
+# Nothing here imports Streamlit or matplotlib, so batch jobs, benchmarks and
+# worker processes can use it directly; the Streamlit app is a UI on top.
+#
+# `filters` is a {column: allowed values} selection over dept_name, title,
+# left and sex (see filters.sidebar_selection), and the chart filters
+# hire_year, exit_year and salary_range (see crossfilter.py); None or empty
+# value lists leave a column unrestricted.
+
+
+# Key Metrics tiles in display order (four per row in the dashboard): label,
+# KPI key (for the error bound in approximate mode) and formatted value
+METRIC_TILES = [
+    ("Total Employees", "total_employees", lambda k: f"{k['total_employees']:,}"),
+    ("Employees Left", "employees_left", lambda k: f"{k['employees_left']:,}"),
+    ("Employees Stayed", "employees_stayed", lambda k: f"{k['employees_stayed']:,}"),
+    ("Emp in more than 1 departments", "multi_department", lambda k: f"{k['multi_department']:,}"),
+    ("Total Department", "departments", lambda k: k['departments']),
+    ("Average Salary", "avg_salary", lambda k: f"{k['avg_salary']:,.2f}"),
+    ("Average Tenure", "avg_tenure", lambda k: f"{k['avg_tenure']:.2f} yr"),
+    ("Median Tenure", "median_tenure", lambda k: f"{k['median_tenure']:.2f} yr"),
+    ("Avg tenure (Emp who left)", "avg_tenure_left", lambda k: f"{k['avg_tenure_left']:.2f} yrs"),
+    ("Tenure Range(in year)", None, lambda k: f"{k['tenure_min']:.1f} - {k['tenure_max']:.1f}"),
+    ("Avg age (Emp who left)", "avg_age_left", lambda k: f"{k['avg_age_left']:.2f} yrs"),
+    ("Avg projects per emp", "avg_projects", lambda k: f"{k['avg_projects']:,.2f}"),
+    ("Avg Performance Rating", "avg_rating", lambda k: k['avg_rating']),
+    ("Salary Range", None, lambda k: f"{k['salary_min']/1000:.1f}k - {k['salary_max']/1000:.1f}k"),
+    ("Attrition Rate", "attrition_rate", lambda k: f"{k['attrition_rate']:.2f}%"),
+    ("Total Manager", "total_managers", lambda k: k['total_managers']),
+]
+
+
+# Load and prepare the employee dataset from a CSV link or path
+def load_dataset(source, snapshot_dir=SNAPSHOT_DIR, chunksize=CHUNK_SIZE, max_memory_mb=None):
+    return prepare_data(load_snapshot(source, snapshot_dir=snapshot_dir, chunksize=chunksize,
+                                      max_memory_mb=max_memory_mb))
+
+
+# Selection from the sidebar widget values, for callers that think in
+# dashboard terms: make_filters(departments=["Sales"], status="Left")
+def make_filters(departments=(), status="All", titles=(), gender="All"):
+    return sidebar_selection(departments, status, titles, gender)
+
+
+# Rows of `df` matching `filters`. A prebuilt FilterIndex answers it with
+# bitmaps; without one the columns are compared directly.
+def filter_frame(df, filters=None, index=None):
+    filters = {col: values for col, values in (filters or {}).items() if values is not None and len(values)}
+    if not filters:
+        return df
+    if index is not None:
+        return apply_filters(df, index, filters)
+    mask = np.ones(len(df), dtype=bool)
+    for col, values in filters.items():
+        mask &= filter_column(df, col).isin(values).to_numpy()
+    return df[mask]
+
+
+# (left_filter, gender_filter) when `filters` only restricts employee-level
+# columns, so the full fact table can be reused; None otherwise
+def _employee_filters(filters):
+    filters = filters or {}
+    if filters.get("dept_name") or filters.get("title") or any(filters.get(col) for col in DERIVED_FILTERS):
+        return None
+    left = sorted(set(filters.get("left") or []))
+    sex = list(filters.get("sex") or [])
+    if len(sex) > 1:
+        return None
+    left_filter = {(1,): "Left", (0,): "Stayed"}.get(tuple(left), "All")
+    return left_filter, sex[0] if sex else "All"
+
+
+# Key Metrics of `filtered`, the rows already selected by `filters`. `facts`
+# is the fact table of the whole dataset (build_employee_facts); when given,
+# status and gender filters are answered from it instead of regrouping rows.
+def selection_kpis(filtered, filters=None, facts=None):
+    employee_filters = _employee_filters(filters)
+    if facts is not None and employee_filters is not None:
+        return kpis_from_facts(filter_employee_facts(facts, *employee_filters), filtered)
+    return kpis_from_facts(build_employee_facts(filtered), filtered)
+
+
+# All 16 Key Metrics tiles for the rows of `df` matching `filters`
+def compute_kpis(df, filters=None, index=None, facts=None):
+    return selection_kpis(filter_frame(df, filters, index), filters, facts)
+
+
+# Aggregate of one visualization (by its VISUALIZATIONS name)
+def compute_visualization(name, df, filters=None, index=None, **options):
+    if name not in VISUALIZATIONS:
+        raise KeyError(f"Unknown visualization {name!r}")
+    return VISUALIZATIONS[name](filter_frame(df, filters, index), **options)
+
+
+# Year-wise (or quarter/month) hires, exits, headcount and attrition rate
+def attrition_trend(df, filters=None, index=None, freq="year"):
+    return compute_visualization("attrition_rate_trend", df, filters, index, freq=freq)
+
+
+# Kaplan-Meier survival table of the cohorts of `by` (hire_year, dept_name or
+# title) among the rows matching `filters`; see cohorts.py for the retention
+# matrix and per-cohort summary built from it
+def cohort_survival(df, by="hire_year", filters=None, index=None):
+    return survival_curves(cohort_spells(filter_frame(df, filters, index), by))
+
+
+# Key Metrics and every visualization aggregate for one filter selection,
+# filtering the rows once: {"kpis": {...}, name: result, ...}
+def compute_dashboard(df, filters=None, index=None, facts=None, names=None):
+    filtered = filter_frame(df, filters, index)
+    results = {"kpis": selection_kpis(filtered, filters, facts)}
+    for name in names or VISUALIZATIONS:
+        results[name] = VISUALIZATIONS[name](filtered)
+    return results
+
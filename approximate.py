@@ -0,0 +1,386 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from binning import rating_scores
+from employee_facts import rating_label
+from filters import FILTER_COLUMNS
+
+
+# Approximate Key Metrics and tenure/salary histograms, for a fast first
+# answer on very large datasets while the exact results are computed in the
+# background. Nothing here scans the rows of the dataset per selection.
+#
+# The rows are split into cells, one per combination of the sidebar filter
+# columns (department, title, status, gender), and every cell keeps small
+# mergeable summaries:
+#   - a HyperLogLog of its employees, so distinct employee counts of any
+#     selection are one register-wise max over the selected cells,
+#   - a streaming histogram (fixed fine bins over the global value range)
+#     of the row tenure, which merges by addition and answers the median,
+#   - plain sums, counts, minima and maxima, which merge exactly.
+# Statistics over each employee's selected rows (multi-department count,
+# average salary and projects, Visualizations 7 and 16) do not merge across
+# cells, as an employee's rows span several departments and titles. They
+# are estimated from a sample of employees stratified by department, with
+# all rows of every sampled employee.
+#
+# Selections with chart filters (crossfilter.py) are not covered. Error
+# bounds are at about 95%: twice the HyperLogLog or sampling standard
+# error, and half a fine bin width for the median.
+
+HLL_PRECISION = 14
+HISTOGRAM_BINS = 1024
+SAMPLE_EMPLOYEES = 20000
+
+# Visualizations answered from the sketches
+APPROXIMATE_VISUALIZATIONS = ("tenure_histogram", "salary_histogram")
+
+
+# 64-bit mix of integer keys (splitmix64 finalizer)
+def _hash(keys):
+    x = np.asarray(keys).astype(np.uint64)
+    with np.errstate(over="ignore"):
+        x = x + np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+# HyperLogLog register index and rank of every key
+def hll_positions(keys, precision=HLL_PRECISION):
+    h = _hash(keys)
+    index = (h >> np.uint64(64 - precision)).astype(np.int64)
+    rest = (h & np.uint64((1 << (64 - precision)) - 1)).astype(np.float64)
+    # Rank: leading zeros of the remaining bits plus one (the bits fit a
+    # float64 mantissa, so frexp gives their exact bit length)
+    rank = (64 - precision) - np.frexp(rest)[1] + 1
+    return index, rank.astype(np.uint8)
+
+
+# Distinct count estimate of HyperLogLog registers (merged registers are
+# their element-wise maximum)
+def estimate_count(registers):
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int32)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and zeros:
+        # Linear counting for small cardinalities
+        estimate = m * np.log(m / zeros)
+    return float(estimate)
+
+
+# About 95% bound of a HyperLogLog estimate
+def hll_error(estimate, precision=HLL_PRECISION):
+    return 2 * 1.04 / np.sqrt(1 << precision) * estimate
+
+
+# Counts over fixed fine bins of [lo, hi] plus the exact minimum and
+# maximum. Histograms of the same range merge by adding their counts.
+class StreamingHistogram:
+    def __init__(self, lo, hi, counts, vmin=np.nan, vmax=np.nan):
+        self.lo, self.hi = float(lo), float(hi)
+        self.counts = np.asarray(counts, dtype=float)
+        self.vmin, self.vmax = vmin, vmax
+
+    @staticmethod
+    def bin_of(values, lo, hi, bins=HISTOGRAM_BINS):
+        width = (hi - lo) / bins if hi > lo else 1.0
+        return np.clip(((np.asarray(values, dtype=float) - lo) / width).astype(np.int64), 0, bins - 1)
+
+    # Width of a fine bin
+    @property
+    def resolution(self):
+        return (self.hi - self.lo) / len(self.counts) if self.hi > self.lo else 0.0
+
+    # Median like employee_facts._weighted_median (the mean of the two
+    # middle values), from the centres of the bins holding them: within half
+    # a bin width of the exact value
+    def median(self):
+        n = int(self.counts.sum())
+        if not n:
+            return np.nan
+        cum = np.cumsum(self.counts)
+        centres = self.lo + (np.searchsorted(cum, [(n - 1) // 2, n // 2], side="right") + 0.5) * self.resolution
+        return float(np.clip(centres, self.vmin, self.vmax).mean())
+
+
+# Per-cell sums and counts of the non-missing `values`
+def _cell_sums(cell, values, n_cells):
+    values = np.asarray(values, dtype=float)
+    keep = ~np.isnan(values)
+    return (np.bincount(cell[keep], weights=values[keep], minlength=n_cells),
+            np.bincount(cell[keep], minlength=n_cells))
+
+
+# Per-cell minimum (ufunc np.fmin) or maximum (np.fmax), NaN for empty cells
+def _cell_extreme(cell, values, n_cells, ufunc):
+    values = np.asarray(values, dtype=float)
+    keep = ~np.isnan(values)
+    out = np.full(n_cells, np.inf if ufunc is np.fmin else -np.inf)
+    ufunc.at(out, cell[keep], values[keep])
+    return np.where(np.isinf(out), np.nan, out)
+
+
+# Employees sampled with the same rate in every stratum: positions of the
+# sampled employees and their stratum sizes and sample sizes
+def _stratified_sample(strata, size, seed=None):
+    n_strata = strata.max() + 1 if len(strata) else 0
+    population = np.bincount(strata, minlength=n_strata)
+    rate = min(size / len(strata), 1.0) if len(strata) else 1.0
+    sampled = np.minimum(np.maximum(np.round(population * rate), 1), population).astype(np.int64)
+    order = np.lexsort((np.random.default_rng(seed).random(len(strata)), strata))
+    rank = np.arange(len(strata)) - np.concatenate([[0], np.cumsum(population)[:-1]])[strata[order]]
+    keep = order[rank < sampled[strata[order]]]
+    return np.sort(keep), population, sampled
+
+
+# Sketches of every filter cell of a dataset frame (with the `tenure`
+# column, see data_loader.prepare_data), plus the stratified sample
+class SketchCube:
+    def __init__(self, df, precision=HLL_PRECISION, bins=HISTOGRAM_BINS, sample_employees=SAMPLE_EMPLOYEES,
+                 seed=None):
+        self.precision = precision
+        self.n_rows = len(df)
+        columns = list(FILTER_COLUMNS)
+        cell = df.groupby(columns, observed=True, dropna=False, sort=False).ngroup().to_numpy()
+        self.cells = df[columns].iloc[np.unique(cell, return_index=True)[1]].reset_index(drop=True)
+        n_cells = len(self.cells)
+        self.manager = (self.cells["title"] == "Manager").to_numpy()
+        self.left = (self.cells["left"] == 1).to_numpy()
+
+        tenure = df["tenure"].to_numpy(dtype=float)
+        salary = df["salary"].to_numpy(dtype=float)
+        left = df["left"].to_numpy() == 1
+        age = ((df["last_date"] - df["birth_date"]).dt.days / 365.0).to_numpy(dtype=float)
+        rating = df["Last_performance_rating"]
+
+        # Row-level statistics, which merge exactly
+        self.rows = np.bincount(cell, minlength=n_cells)
+        self.tenure_sum, self.tenure_rows = _cell_sums(cell, tenure, n_cells)
+        self.left_tenure_sum, self.left_tenure_rows = _cell_sums(cell, np.where(left, tenure, np.nan), n_cells)
+        self.left_age_sum, self.left_age_rows = _cell_sums(cell, np.where(left, age, np.nan), n_cells)
+        self.rating_sum = np.bincount(cell, weights=rating_scores(rating).fillna(0).to_numpy(), minlength=n_cells)
+        self.rating_rows = np.bincount(cell, weights=rating.notna().to_numpy(), minlength=n_cells)
+        self.tenure_min = _cell_extreme(cell, tenure, n_cells, np.fmin)
+        self.tenure_max = _cell_extreme(cell, tenure, n_cells, np.fmax)
+        self.salary_min = _cell_extreme(cell, salary, n_cells, np.fmin)
+        self.salary_max = _cell_extreme(cell, salary, n_cells, np.fmax)
+
+        # HyperLogLog registers of every cell
+        self.registers = np.zeros((n_cells, 1 << precision), dtype=np.uint8)
+        index, rank = hll_positions(df["emp_no"].to_numpy(), precision)
+        np.maximum.at(self.registers, (cell, index), rank)
+
+        # Streaming histograms of the row tenure (Median Tenure)
+        known = ~np.isnan(tenure)
+        self.tenure_range = (tenure[known].min(), tenure[known].max()) if known.any() else (0.0, 1.0)
+        codes = StreamingHistogram.bin_of(tenure[known], *self.tenure_range, bins)
+        self.tenure_bins = np.bincount(cell[known].astype(np.int64) * bins + codes,
+                                       minlength=n_cells * bins).reshape(n_cells, bins).astype(np.int32)
+
+        # Employees sampled by the department of their first row, with all
+        # their rows
+        emp, emp_nos = pd.factorize(df["emp_no"])
+        first = np.unique(emp, return_index=True)[1]
+        strata = pd.factorize(df["dept_name"].iloc[first])[0] + 1
+        sampled, self.stratum_size, self.stratum_sample = _stratified_sample(strata, sample_employees, seed)
+        in_sample = np.zeros(len(emp_nos), dtype=bool)
+        in_sample[sampled] = True
+        sample_rows = np.flatnonzero(in_sample[emp])
+        self.sample = df[columns + ["emp_no", "salary", "tenure", "no_of_projects"]].iloc[sample_rows].reset_index(drop=True)
+        # Sample position of every sample row's employee, and their strata
+        self.sample_emp = np.searchsorted(sampled, emp[sample_rows])
+        self.sample_strata = strata[sampled]
+
+    def nbytes(self):
+        return (self.registers.nbytes + self.tenure_bins.nbytes
+                + int(self.sample.memory_usage(deep=True).sum()) + self.sample_emp.nbytes)
+
+    # Cells matching a sidebar selection, or None when the selection has
+    # filters the cells do not cover
+    def select(self, selection=None):
+        mask = np.ones(len(self.cells), dtype=bool)
+        for col, values in (selection or {}).items():
+            if values is None or not len(values):
+                continue
+            if col not in self.cells.columns:
+                return None
+            mask &= self.cells[col].isin(values).to_numpy()
+        return mask
+
+    def _distinct(self, cells):
+        if not cells.any():
+            return 0.0
+        return estimate_count(self.registers[cells].max(axis=0))
+
+    # Estimated population total of per-sampled-employee values `y` and its
+    # bound (`z` standard errors), from the per-stratum sample variance with
+    # finite population correction. For counts (`rare`), the bound is at
+    # least `z` sampled employees, as rare values may not be sampled at all.
+    def _total(self, y, z=2, rare=True):
+        strata, n, big_n = self.sample_strata, self.stratum_sample, self.stratum_size
+        sums = np.bincount(strata, weights=y, minlength=len(n))
+        squares = np.bincount(strata, weights=y * y, minlength=len(n))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            total = np.nansum(big_n * sums / n)
+            variance = np.where(n > 1, (squares - sums * sums / n) / (n - 1), 0.0)
+            spread = np.nansum(big_n * big_n * (1 - n / big_n) * variance / n)
+            partial = (n > 0) & (n < big_n)
+            floor = (big_n[partial] / n[partial]).max(initial=0) if rare else 0.0
+        return total, z * max(np.sqrt(max(spread, 0.0)), floor)
+
+    # Estimated ratio of two totals and its bound (linearized)
+    def _ratio(self, y, x):
+        total_y, _ = self._total(y)
+        total_x, _ = self._total(x)
+        if not total_x:
+            return np.nan, 0.0
+        ratio = total_y / total_x
+        _, bound = self._total((y - ratio * x) / total_x, rare=False)
+        return ratio, bound
+
+    # Selected rows of the sampled employees, grouped per sampled employee
+    def _sample_employees(self, selection):
+        mask = np.ones(len(self.sample), dtype=bool)
+        for col, values in (selection or {}).items():
+            if values is not None and len(values):
+                mask &= self.sample[col].isin(values).to_numpy()
+        rows = np.flatnonzero(mask)
+        n = len(self.sample_strata)
+        emp = self.sample_emp[rows]
+        # First selected row of every selected sampled employee
+        first = np.full(n, -1)
+        first[emp[::-1]] = rows[::-1]
+        return emp, rows, np.bincount(emp, minlength=n), first
+
+    # Approximate Key Metrics of a selection (the keys of
+    # employee_facts.compute_kpis) and their error bounds, or None
+    def kpis(self, selection=None):
+        cells = self.select(selection)
+        if cells is None:
+            return None
+        total = self._distinct(cells)
+        left_count = self._distinct(cells & self.left)
+        stayed = self._distinct(cells & ~self.left)
+        managers = self._distinct(cells & self.manager)
+
+        def ratio(sums, counts):
+            count = counts[cells].sum()
+            return sums[cells].sum() / count if count else np.nan
+
+        def low(values):
+            value = np.nanmin(values[cells], initial=np.inf)
+            return value if np.isfinite(value) else np.nan
+
+        def high(values):
+            value = np.nanmax(values[cells], initial=-np.inf)
+            return value if np.isfinite(value) else np.nan
+
+        lo, hi = self.tenure_range
+        row_tenure = StreamingHistogram(lo, hi, self.tenure_bins[cells].sum(axis=0), low(self.tenure_min),
+                                        high(self.tenure_max))
+
+        # Per-employee statistics from the sample
+        emp, rows, n_rows, first = self._sample_employees(selection)
+        selected = (n_rows > 0).astype(float)
+        salary = self.sample["salary"].to_numpy(dtype=float)[rows]
+        known = ~np.isnan(salary)
+        salary_sum = np.bincount(emp[known], weights=salary[known], minlength=len(n_rows))
+        salary_n = np.bincount(emp[known], minlength=len(n_rows))
+        has_salary = (salary_n > 0).astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            salary_mean = np.where(salary_n > 0, salary_sum / salary_n, 0.0)
+        projects = np.where(first >= 0, self.sample["no_of_projects"].to_numpy(dtype=float)[np.maximum(first, 0)], np.nan)
+        has_projects = ~np.isnan(projects)
+        multi, multi_bound = self._total((n_rows > 1).astype(float))
+        avg_salary, salary_bound = self._ratio(salary_mean, has_salary)
+        avg_projects, projects_bound = self._ratio(np.where(has_projects, projects, 0.0), has_projects.astype(float))
+
+        rating_rows = self.rating_rows[cells].sum()
+        kpis = {
+            "total_employees": int(round(total)),
+            "employees_left": int(round(left_count)),
+            "employees_stayed": int(round(stayed)),
+            "multi_department": int(round(multi)),
+            "departments": int(self.cells.loc[cells & (self.rows > 0), "dept_name"].nunique()),
+            "avg_salary": avg_salary,
+            "avg_tenure": ratio(self.tenure_sum, self.tenure_rows),
+            "median_tenure": row_tenure.median(),
+            "avg_tenure_left": ratio(self.left_tenure_sum, self.left_tenure_rows),
+            "tenure_min": low(self.tenure_min),
+            "tenure_max": high(self.tenure_max),
+            "avg_age_left": ratio(self.left_age_sum, self.left_age_rows),
+            "avg_projects": avg_projects,
+            "avg_rating": rating_label(self.rating_sum[cells].sum() / rating_rows if rating_rows else np.nan),
+            "salary_min": low(self.salary_min),
+            "salary_max": high(self.salary_max),
+            "attrition_rate": (left_count / total) * 100.00 if total else np.nan,
+            "total_managers": int(round(managers)),
+        }
+        bounds = {
+            "total_employees": hll_error(total, self.precision),
+            "employees_left": hll_error(left_count, self.precision),
+            "employees_stayed": hll_error(stayed, self.precision),
+            "multi_department": multi_bound,
+            "avg_salary": salary_bound,
+            "median_tenure": row_tenure.resolution / 2,
+            "avg_projects": projects_bound,
+            "attrition_rate": np.sqrt(2) * hll_error(kpis["attrition_rate"], self.precision),
+            "total_managers": hll_error(managers, self.precision),
+        }
+        return kpis, bounds
+
+    # Approximate result of Visualization 7 or 16 (like
+    # aggregations.tenure_histogram / salary_histogram: the values of each
+    # employee's first selected row) from the sample, and the error bound of
+    # the bars (three standard errors, so that it holds for all 15 bars
+    # together at about 95%), or None
+    def visualization(self, name, selection=None, bins=15):
+        cells = self.select(selection)
+        if name not in APPROXIMATE_VISUALIZATIONS or cells is None:
+            return None
+        _, _, n_rows, first = self._sample_employees(selection)
+        column = self.sample["tenure" if name == "tenure_histogram" else "salary"].to_numpy(dtype=float)
+        values = np.where(first >= 0, column[np.maximum(first, 0)], np.nan)
+        known = ~np.isnan(values)
+        if not known.any():
+            return {"counts": np.zeros(bins, dtype=int), "edges": np.linspace(0, 1, bins + 1)}, 0.0
+        value_range = (values[known].min(), values[known].max())
+        if name == "tenure_histogram":
+            # An employee's tenure is the same on all their rows, so the
+            # exact range is that of the selected cells
+            value_range = (np.nanmin(self.tenure_min[cells]), np.nanmax(self.tenure_max[cells]))
+        edges = np.histogram_bin_edges(values[known], bins=bins, range=value_range)
+        codes = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, bins - 1)
+        counts, bound = np.zeros(bins), 0.0
+        for i in range(bins):
+            counts[i], error = self._total((known & (codes == i)).astype(float), z=3)
+            bound = max(bound, error)
+        return {"counts": np.round(counts).astype(int), "edges": edges}, bound
+
+
+# Sketch cubes of the recent dataset versions, each built once in the
+# background
+class SketchBuilds:
+    def __init__(self, keep=2):
+        self.keep = keep
+        self._builds = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sketch")
+
+    # Cube of `version` when built (None while building or after a failed
+    # build); the first call starts the build from the frame frame() returns
+    def get(self, version, frame):
+        with self._lock:
+            future = self._builds.get(version)
+            if future is None:
+                future = self._builds[version] = self._executor.submit(lambda: SketchCube(frame()))
+                for old in list(self._builds)[:-self.keep]:
+                    del self._builds[old]
+        if not future.done() or future.exception() is not None:
+            return None
+        return future.result()
@@ -0,0 +1,152 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from aggregations import VISUALIZATIONS
+from cohorts import DIMENSIONS
+from data_loader import CHUNK_SIZE, stream_csv, prepare_data
+from employee_facts import build_employee_facts, compute_kpis, filter_employee_facts
+from employee_model import EmployeeModel
+from filters import FilterIndex, apply_filters, sidebar_selection
+from synthetic_data import generate_employees, write_csv
+
+
+# Benchmark of the dashboard's data pipeline on synthetic datasets: every
+# stage the dashboard runs (load, preprocessing, filtering, Key Metrics and
+# each of the 19 visualization aggregations) is timed separately, with its
+# peak traced memory, and the results are written as JSON. The same stages
+# are measured for the normalized model (employee_model.py), the dashboard's
+# default data model.
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+
+# Representative sidebar selections: (departments, status, titles, gender)
+SELECTIONS = {
+    "none": ([], "All", [], "All"),
+    "status_gender": ([], "Left", [], "F"),
+    "department": (["Sales", "Development"], "All", [], "All"),
+    "all_filters": (["Sales", "Development", "Research"], "Stayed", ["Engineer", "Staff"], "M"),
+}
+
+
+# Run `func` `repeat` times; returns (result of the last run, timing record)
+def measure(func, repeat=1, trace_memory=True):
+    timings = []
+    peak = None
+    for _ in range(repeat):
+        gc.collect()
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+        if trace_memory:
+            peak = max(peak or 0, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    record = {"seconds": min(timings), "mean_seconds": sum(timings) / len(timings), "runs": repeat}
+    if peak is not None:
+        record["peak_mb"] = round(peak / 1024 / 1024, 3)
+    return result, record
+
+
+def _max_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if platform.system() == "Darwin" else rss / 1024
+
+
+def benchmark_size(n_rows, workdir, repeat=3, seed=0, trace_memory=True, chunksize=CHUNK_SIZE):
+    stages = {}
+
+    def run(name, func, times=repeat):
+        result, stages[name] = measure(func, times, trace_memory)
+        return result
+
+    csv_path = os.path.join(workdir, f"employees_{n_rows}.csv")
+    write_csv(generate_employees(n_rows, seed=seed), csv_path)
+
+    def load():
+        with open(csv_path, "rb") as stream:
+            return stream_csv(stream, chunksize=chunksize)[0]
+
+    df = run("load", load, 1)
+    df = run("preprocess", lambda: prepare_data(df.copy()), 1)
+    index = run("filter_index", lambda: FilterIndex(df), 1)
+    all_facts = run("employee_facts", lambda: build_employee_facts(df), 1)
+
+    for label, widgets in SELECTIONS.items():
+        selection = sidebar_selection(*widgets)
+        filtered = run(f"filter[{label}]", lambda: apply_filters(df, index, selection))
+        departments, status, titles, gender = widgets
+        if departments or titles:
+            facts = run(f"kpi_facts[{label}]", lambda: build_employee_facts(filtered))
+        else:
+            facts = run(f"kpi_facts[{label}]", lambda: filter_employee_facts(all_facts, status, gender))
+        run(f"kpis[{label}]", lambda: compute_kpis(facts, filtered))
+
+    for name, aggregate in VISUALIZATIONS.items():
+        run(f"viz[{name}]", lambda: aggregate(df))
+
+    # Normalized model: views are computed uncached (model._view) so every
+    # run filters again, the Key Metrics and charts reuse the model's views
+    # as the dashboard does
+    model = run("model", lambda: EmployeeModel(df), 1)
+    for label, widgets in SELECTIONS.items():
+        selection = sidebar_selection(*widgets)
+        run(f"model_view[{label}]", lambda: model._view(selection))
+        run(f"model_kpis[{label}]", lambda: model.kpis(selection))
+    for name in VISUALIZATIONS:
+        run(f"model_viz[{name}]", lambda: model.visualization(name))
+    for by in DIMENSIONS:
+        run(f"model_cohorts[{by}]", lambda: model.cohort_spells(by))
+
+    return {
+        "rows": len(df),
+        "employees": int(df["emp_no"].nunique()),
+        "frame_mb": round(df.memory_usage(deep=True).sum() / 1024 / 1024, 3),
+        "model_mb": round(model.nbytes() / 1024 / 1024, 3),
+        "max_rss_mb": round(_max_rss_mb(), 1),
+        "stages": stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard data pipeline")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="dataset sizes in rows (default: 10k 100k 1M 10M)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage; the fastest is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc peak memory tracking")
+    parser.add_argument("--output", default="bench_output.json", help="JSON results file")
+    args = parser.parse_args()
+
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "sizes": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_rows in args.sizes:
+            print(f"Benchmarking {n_rows:,} rows...", flush=True)
+            result = benchmark_size(n_rows, workdir, repeat=args.repeat, seed=args.seed,
+                                    trace_memory=not args.no_memory)
+            results["sizes"][str(n_rows)] = result
+            for stage, record in result["stages"].items():
+                print(f"  {stage:<45} {record['seconds'] * 1000:10.1f} ms"
+                      + (f" {record['peak_mb']:10.1f} MB" if "peak_mb" in record else ""))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
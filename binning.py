@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+
+# Vectorized binning and encoding shared by the KPIs and visualizations.
+# Every grouping is one np.searchsorted pass over the column and comes back
+# as a Categorical, so groupbys run on integer codes. The edges below are the
+# dashboard defaults; every function takes its edges and labels as arguments.
+
+# Age at exit: [21, 30], (30, 40], (40, 50], (50, 60], anything else is 60+
+AGE_EDGES = [21, 30, 40, 50, 60]
+AGE_LABELS = ['21-30', '31-40', '41-50', '51-60']
+AGE_OTHER = '60+'
+
+# Tenure in years: [1, 4], (4, 8], anything else is high tenure
+TENURE_EDGES = [1, 4, 8]
+TENURE_LABELS = ["Low Tenure(1-4)", "Medium Tenure(5-8)"]
+TENURE_OTHER = "High Tenure(9+)"
+
+# Number of projects: [0, 3], (3, 7], (7, 10]
+PROJECT_EDGES = [0, 3, 7, 10]
+PROJECT_LABELS = ['Low(1-3)', 'Medium(4-7)', 'High(8-10)']
+
+# Average salary per employee: (39999, 60000], ..., (100000, 129492]
+SALARY_EDGES = [39999, 60000, 80000, 100000, 129492]
+SALARY_LABELS = ['40k-60k', '60k-80k', '80k-100k', '100k-130k']
+
+# Performance rating codes, lowest to highest, and their scores
+RATING_LABELS = ["PIP", "C", "B", "S", "A"]
+RATING_SCORES = {label: score for score, label in enumerate(RATING_LABELS, start=1)}
+
+
+# Bin index of each value for right-closed bins (edges[i], edges[i + 1]];
+# -1 for values outside the edges or missing. `include_lowest` closes the
+# first bin on the left as well, like pd.cut.
+def bin_codes(values, edges, include_lowest=True):
+    values = np.asarray(values, dtype=float)
+    edges = np.asarray(edges, dtype=float)
+    codes = np.searchsorted(edges, values, side="left") - 1
+    if include_lowest:
+        codes[values == edges[0]] = 0
+    codes[(codes < 0) | (codes >= len(edges) - 1) | np.isnan(values)] = -1
+    return codes
+
+
+# Categorical of bin labels. Values outside the bins get `other` when it is
+# given (as the last category), otherwise they are missing.
+def bin_labels(values, edges, labels, other=None, include_lowest=True):
+    if len(labels) != len(edges) - 1:
+        raise ValueError(f"Expected {len(edges) - 1} labels for {len(edges)} edges, got {len(labels)}")
+    codes = bin_codes(values, edges, include_lowest)
+    categories = list(labels)
+    if other is not None:
+        codes[codes == -1] = len(categories)
+        categories.append(other)
+    index = values.index if isinstance(values, pd.Series) else None
+    return pd.Series(pd.Categorical.from_codes(codes, categories=categories), index=index)
+
+
+def age_groups(ages, edges=AGE_EDGES, labels=AGE_LABELS, other=AGE_OTHER):
+    return bin_labels(ages, edges, labels, other).rename('age_group')
+
+
+def tenure_groups(tenure, edges=TENURE_EDGES, labels=TENURE_LABELS, other=TENURE_OTHER):
+    return bin_labels(tenure, edges, labels, other).rename('tenure_group')
+
+
+def project_categories(projects, edges=PROJECT_EDGES, labels=PROJECT_LABELS):
+    return bin_labels(projects, edges, labels).rename('project_category')
+
+
+def salary_ranges(salaries, edges=SALARY_EDGES, labels=SALARY_LABELS):
+    return bin_labels(salaries, edges, labels, include_lowest=False).rename('salary_range')
+
+
+# Numeric score of each performance rating (0 for unknown ratings, NaN for
+# missing ones). Categorical columns are mapped once per category and then
+# gathered by code.
+def rating_scores(ratings, scores=RATING_SCORES):
+    ratings = pd.Series(ratings)
+    categorical = pd.Categorical(ratings)
+    lookup = np.array([scores.get(category, 0) for category in categorical.categories] + [np.nan], dtype=float)
+    return pd.Series(lookup[categorical.codes], index=ratings.index)
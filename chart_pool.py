@@ -0,0 +1,153 @@
+import atexit
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from aggregations import VISUALIZATIONS
+from charts import render_figure
+
+
+# Parallel aggregation and rendering of independent visualizations. The
+# charts of a section only share their input, so each one can be aggregated
+# and drawn in its own worker; results come back in the order the tasks were
+# given, and the wall time approaches that of the slowest chart.
+#
+# A chart's result is aggregated in the pool from the filtered frame, or by
+# a query callable (the data model or SQL backend, which live in the
+# dashboard process): in thread workers the query runs in the worker, with
+# process workers it runs in one of the pool's threads and the result is
+# sent to a process to be rendered.
+#
+# Process workers get the filtered frame through shared memory: it is
+# written once as an Arrow IPC stream straight into a shared block, and
+# every worker maps the same block instead of receiving a pickled copy per
+# chart. The worker's frame wraps the block's buffers without copying them,
+# except for the columns Arrow and pandas store differently (dates with
+# missing values and nullable integers), which are converted.
+
+EXECUTORS = ("process", "thread")
+
+
+# Arrow IPC copy of a DataFrame in a shared memory block
+class SharedFrame:
+    def __init__(self, df):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        # Size the stream first, then write it into the block itself
+        sizer = pa.MockOutputStream()
+        with ipc.new_stream(sizer, table.schema) as writer:
+            writer.write_table(table)
+        self.size = sizer.size()
+        self.shm = shared_memory.SharedMemory(create=True, size=max(self.size, 1))
+        sink = pa.FixedSizeBufferWriter(pa.py_buffer(self.shm.buf[:self.size]))
+        with ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        self.handle = (self.shm.name, self.size)
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+# Frame attached in this worker process: (handle, shared memory, frame).
+# Charts of the same section usually land on the same worker, so the frame
+# is mapped once per worker and section.
+_attached = {}
+
+
+# Drop the attached frame before unmapping its block (the dashboard process
+# owns the block and unlinks it)
+def _detach():
+    shm = _attached.pop("shm", None)
+    _attached.clear()
+    if shm is not None:
+        try:
+            shm.close()
+        except BufferError:
+            # Still referenced by a zero-copy column; unmapped once freed
+            pass
+
+
+def _attach(handle):
+    if _attached.get("handle") != handle:
+        _detach()
+        name, size = handle
+        shm = shared_memory.SharedMemory(name=name)
+        table = ipc.open_stream(pa.py_buffer(shm.buf[:size])).read_all()
+        # One block per column, so the columns can wrap the shared buffers
+        df = table.to_pandas(split_blocks=True, self_destruct=True)
+        _attached.update(handle=handle, shm=shm, df=df)
+    return _attached["df"]
+
+
+atexit.register(_detach)
+
+
+# Aggregate (unless the result is already known) and render one chart.
+# `source` is the frame itself in thread workers and a SharedFrame handle
+# in process workers; `result` is None (aggregate from the frame), a query
+# returning the result, or the result.
+def _chart_task(source, name, result, render_args):
+    if result is None:
+        df = source if not isinstance(source, tuple) else _attach(source)
+        result = VISUALIZATIONS[name](df)
+    elif callable(result):
+        result = result()
+    return result, render_figure(name, result, *render_args)
+
+
+class ChartPool:
+    def __init__(self, workers, executor="process"):
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown chart executor {executor!r}; expected one of {EXECUTORS}")
+        self.kind = executor
+        self.queries = None
+        if executor == "process":
+            # Fresh interpreters rather than forks of the (threaded) server
+            self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            self.queries = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chart-queries")
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="charts")
+
+    # Run the query of a chart in this process, then render it in a worker
+    def _query_and_render(self, name, query, render_args):
+        return self.executor.submit(_chart_task, None, name, query(), render_args).result()
+
+    # Run (name, result, (figsize, theme, fmt)) tasks and return one (result,
+    # image bytes) per task, or the exception it raised. A task's result is
+    # None to aggregate it from the filtered frame, a callable querying it,
+    # or the known result. `frame()` returns the filtered frame and is only
+    # called when some result is None.
+    def run(self, tasks, frame):
+        shared = None
+        source = None
+        if any(result is None for _, result, _ in tasks):
+            if self.kind == "process":
+                shared = SharedFrame(frame())
+                source = shared.handle
+            else:
+                source = frame()
+        try:
+            futures = []
+            for name, result, render_args in tasks:
+                if callable(result) and self.queries is not None:
+                    futures.append(self.queries.submit(self._query_and_render, name, result, render_args))
+                else:
+                    futures.append(self.executor.submit(_chart_task, source, name, result, render_args))
+            outcomes = []
+            for future in futures:
+                try:
+                    outcomes.append(future.result())
+                except Exception as e:
+                    outcomes.append(e)
+            return outcomes
+        finally:
+            if shared is not None:
+                shared.close()
+
+    def shutdown(self):
+        if self.queries is not None:
+            self.queries.shutdown(wait=False, cancel_futures=True)
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,428 @@
+import contextlib
+import io
+import threading
+
+import matplotlib
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib.artist import setp
+from matplotlib.figure import Figure
+
+from instrumentation import span
+from result_cache import figure_key
+
+
+# Matches the savefig options st.pyplot uses, so cached images look the same
+RENDER_DPI = 200
+
+
+# Charts are drawn on their own Figure, so renders can run in parallel
+# threads, except that a matplotlib style changes the global rcParams. The
+# style is applied once for every render that asks for it: renders with the
+# style currently applied (or with none) run concurrently, and switching to
+# another style waits until they have finished. The previous rcParams are
+# restored when the last render with a style ends.
+class _SharedStyle:
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._theme = None
+        self._active = 0
+        self._saved = None
+
+    @contextlib.contextmanager
+    def use(self, theme):
+        with self._condition:
+            while self._active and self._theme != theme:
+                self._condition.wait()
+            if not self._active and theme:
+                saved = matplotlib.rcParams.copy()
+                try:
+                    matplotlib.style.use(theme)
+                except BaseException:
+                    dict.update(matplotlib.rcParams, saved)
+                    raise
+                self._saved = saved
+            self._theme = theme
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                if not self._active:
+                    if self._saved is not None:
+                        # Like matplotlib.rc_context, bypassing the validation
+                        # of deprecated parameters
+                        dict.update(matplotlib.rcParams, self._saved)
+                        self._saved = None
+                    self._theme = None
+                    self._condition.notify_all()
+
+
+_style = _SharedStyle()
+
+
+# Drawing functions for the 19 visualizations. Each one builds a standalone
+# Figure (not registered with pyplot, so nothing piles up in pyplot's state)
+# from the aggregation result and never modifies that result.
+
+# Visualization 1: Employee Turnover by Age Group
+def draw_age_group_turnover(grouped_df, figsize=(8, 4)):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    sns.barplot(x='age_group', y='NO_OF_EMP', data=grouped_df, color='#1f77b4',
+                order=list(grouped_df['age_group']), ax=ax)
+    ax.set_title('Employee Turnover by Age Group', fontsize=10, fontweight='bold')
+    ax.set_xlabel('Age Group', fontsize=8)
+    ax.set_ylabel('Number of Employees', fontsize=8)
+    for p in ax.patches:
+        ax.annotate(f"{int(p.get_height())}", (p.get_x() + p.get_width() / 2., p.get_height()),
+                    ha='center', va='center', xytext=(0, 5), textcoords='offset points', fontsize=10)
+    ax.grid(axis='y', alpha=0.2)
+    return fig
+
+
+# Visualization 2: Year-wise Attrition Rate
+def draw_attrition_rate_trend(result, figsize=(14, 6)):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    ax.plot(result['year'], result['pct'], marker='o', markersize=8,
+            color='royalblue', linewidth=3, label='Attrition Rate')
+    ax.set_title('Employee Attrition Rate Trend', fontsize=16, fontweight='bold', pad=20)
+    ax.set_xlabel('Year', fontsize=12)
+    ax.set_ylabel('Attrition Rate (%)', fontsize=12)
+    for x, y in zip(result['year'], result['pct']):
+        ax.text(x, y, f'{y:.1f}%', ha='center', va='bottom', fontsize=10, weight='bold')
+    ax.grid(alpha=0.2)
+    ax.legend()
+    return fig
+
+
+# Visualization 3: Gender Distribution
+def draw_gender_distribution(gender_counts, figsize=(1, 1)):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    ax.pie(gender_counts['total_no'], labels=gender_counts['gender'],
+           autopct='%1.1f%%', startangle=90, colors=['#ff9999', '#66b3ff'], textprops={'fontsize': 6})
+    ax.set_title('Employee Distribution by Gender', fontsize=4)
+    ax.axis('equal')
+    return fig
+
+
+# Visualization 4: Performance Rating Distribution
+def draw_performance_rating_distribution(grouped_df, figsize=(14, 5)):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    sns.barplot(x="Last_performance_rating", y="total_emp", data=grouped_df,
+                hue="Last_performance_rating", palette="viridis", ax=ax)
+    for p in ax.patches:
+        ax.annotate(f'{int(p.get_height())}', (p.get_x() + p.get_width() / 2., p.get_height()),
+                    ha='center', va='bottom', fontsize=10)
+    ax.set_title("Employee Distribution by Last Performance Rating", fontsize=16, fontweight='bold')
+    ax.set_xlabel("Last Performance Rating", fontsize=12)
+    ax.set_ylabel("Total Employees", fontsize=12)
+    ax2 = ax.twinx()
+    sns.lineplot(x="Last_performance_rating", y="pct", data=grouped_df,
+                 ax=ax2, color="red", marker="o", label="Percentage", linewidth=2)
+    ax2.set_ylabel("Percentage of Total (%)", fontsize=12, color="red")
+    ax.tick_params(axis='x', labelrotation=45)
+    return fig
+
+
+# Visualization 5: Job Title Distribution
+def draw_title_distribution(result, figsize=(14, 5)):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    sns.barplot(x="title", y="total_emp", data=result, hue="title", palette="viridis", ax=ax)
+    ax.set_title("Employee Count by Job Title", fontsize=16, fontweight='bold')
+    ax.set_xlabel("Job Title", fontsize=12)
+    ax.set_ylabel("Number of Employees", fontsize=12)
+    ax.tick_params(axis='x', labelrotation=45, labelsize=12)
+    for index, value in enumerate(result["total_emp"]):
+        ax.text(index, value + 0.1, str(value), ha="center", va="bottom", fontsize=12)
+    return fig
+
+
+# Visualization 6: Projects Distribution
+def draw_project_distribution(summary, figsize=(14, 5)):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    sns.barplot(x='project_category', y='Total_emp', data=summary,
+                hue='project_category', palette='viridis', ax=ax)
+    ax.set_title('Employee Distribution by No of Projects', fontsize=16, fontweight='bold')
+    ax.set_xlabel('Project Category', fontsize=12)
+    ax.set_ylabel('Total Employees', fontsize=12)
+    for index, value in enumerate(summary['Total_emp']):
+        ax.text(index, value * 0.5, str(value), color='white', ha='center', va='bottom', fontsize=12)
+    return fig
+
+
+# Visualization 7: Distribution of Employees by Tenure
+def draw_tenure_histogram(hist, figsize=(14, 5)):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    ax.hist(hist["edges"][:-1], bins=hist["edges"], weights=hist["counts"], color="skyblue", edgecolor="black")
+    ax.set_title("Distribution of Employees by Tenure", fontsize=16, fontweight='bold')
+    ax.set_xlabel("Tenure (Years)", fontsize=12)
+    ax.set_ylabel("Total Employees", fontsize=12)
+    ax.grid(axis="y", linestyle="--", alpha=0.7)
+    return fig
+
+
+# Visualization 8: Tenure Distribution
+def draw_tenure_group_distribution(grouped_df, figsize=(14, 5)):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    sns.barplot(x="tenure_group", y="NO_OF_EMP", data=grouped_df,
+                hue="tenure_group", palette="viridis", ax=ax)
+    for p in ax.patches:
+        ax.annotate(f'{int(p.get_height())}', (p.get_x() + p.get_width() / 2., p.get_height()),
+                    ha='center', va='bottom', fontsize=10)
+    ax.set_title("Employee distribution by Tenure Group", fontsize=16, fontweight='bold')
+    ax.set_xlabel("Tenure Group", fontsize=12)
+    ax.set_ylabel("Number of Employees", fontsize=12)
+    return fig
+
+
+# Visualization 9: Hiring Trend
+def draw_hiring_trend(result, figsize=(14, 5)):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    sns.lineplot(x='hire_year', y='employee_count', data=result, marker='o', color='blue', ax=ax)
+    ax.set_title('Employee Hired Trends by Year', fontsize=16, fontweight='bold')
+    ax.set_xlabel('Year', fontsize=12)
+    ax.set_ylabel('Number of Employees', fontsize=12)
+    for index, row in result.iterrows():
+        ax.text(row['hire_year'], row['employee_count'] + 0.1, f"{row['employee_count']:,}",
+                ha='center', va='bottom', fontsize=10)
+    return fig
+
+
+# Visualization 10: Exit Trends
+def draw_exit_trend(exit_counts, figsize=(14, 5)):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    sns.lineplot(x='exit_year', y='total_exits', data=exit_counts,
+                 marker='o', markersize=8, linewidth=2.5, color='#e63946', ax=ax)
+    ax.set_title('Employee Exit Trends by Year', fontsize=16, fontweight='bold', pad=20)
+    ax.set_xlabel('Year', fontsize=12)
+    ax.set_ylabel('Number of Exits', fontsize=12)
+    # Labels offset in points, so a handful of exits does not push them far above the axes
+    for x, y in zip(exit_counts['exit_year'], exit_counts['total_exits']):
+        ax.annotate(f'{y:,}', (x, y), xytext=(0, 6), textcoords='offset points', ha='center', va='bottom',
+                    fontsize=10, bbox=dict(facecolor='white', alpha=0.8, edgecolor='none'))
+    return fig
+
+
+# Visualization 11: Total Employees by Year
+def draw_total_employees_by_year(merged, figsize=(20, 7)):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    ax.plot(merged['years'], merged['total_emp'], marker='o', color='skyblue', label='Total Employees')
+    for index, value in enumerate(merged['total_emp']):
+        ax.annotate(f"{value:,}", (merged['years'].iloc[index], value), xytext=(0, 8), textcoords='offset points',
+                    ha='center', fontsize=10, bbox=dict(facecolor='white', alpha=0.7, edgecolor='gray'))
+    ax.set_title('Total Employee by Year', fontsize=20, fontweight='bold')
+    ax.set_xlabel('Year', fontsize=16)
+    ax.set_ylabel('Total Employee Count', fontsize=16)
+    ax.set_xticks(merged['years'])
+    ax.tick_params(axis='x', labelsize=12, labelrotation=45)
+    return fig
+
+
+# Visualization 12: Employees by Department
+def draw_department_headcount(result, figsize=(14, 5)):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    sns.barplot(x='total_emp', y='dept_name', data=result, hue='dept_name', palette='Blues_r', legend=False, ax=ax)
+    for index, value in enumerate(result['total_emp']):
+        ax.text(value + 1, index, f"{value:,}", va='center')
+    ax.set_title('Total Employees by Department', fontsize=16, fontweight='bold')
+    ax.set_xlabel('Total Employees', fontsize=12)
+    ax.set_ylabel('Department Name', fontsize=12)
+    return fig
+
+
+# Visualization 13: Average Salary by Department
+def draw_department_avg_salary(df_grouped, figsize=(14, 5)):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    bars = ax.bar(df_grouped['dept_name'], df_grouped['avg_salary'], color='skyblue')
+    for bar, count in zip(bars, df_grouped['total_employees']):
+        ax.text(bar.get_x() + bar.get_width() / 2, bar.get_height(),
+                f'{count:,}', ha='center', va='bottom')
+    ax.set_title('Average Salary by Department', fontsize=16, fontweight='bold')
+    ax.set_xlabel('Department Name', fontsize=12)
+    ax.set_ylabel('Average Salary', fontsize=12)
+    setp(ax.get_xticklabels(), rotation=45, ha='right')
+    return fig
+
+
+# Visualization 14: Managers by Department
+def draw_managers_by_department(manager_counts, figsize=(14, 5)):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    sns.barplot(x='dept_name', y='total_manager', hue='dept_name',
+                data=manager_counts, palette='dark:#1f3b6f_r', legend=False, ax=ax)
+    for p in ax.patches:
+        ax.annotate(f"{p.get_height():,.0f}",
+                    (p.get_x() + p.get_width() / 2, p.get_height() / 2),
+                    ha='center', va='center', color='white', fontsize=10, fontweight='bold')
+    ax.set_title('Total Managers by Department', fontsize=16, fontweight='bold')
+    ax.set_xlabel('Department Name', fontsize=12)
+    ax.set_ylabel('Total Managers', fontsize=12)
+    return fig
+
+
+# Visualization 15: Year-wise Average Salary
+def draw_salary_by_year(merged_df, figsize=(12, 6)):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    ax.plot(merged_df['years'].astype(str), merged_df['avg_sal'],
+            marker='o', color='skyblue', linestyle='-', linewidth=2)
+    for i, val in enumerate(merged_df['avg_sal']):
+        ax.text(i, val, f'{val:,.2f}', ha='center', va='bottom', rotation=90)
+    ax.set_title('Average Salary by Year', fontsize=18, fontweight='bold')
+    ax.set_xlabel('Year', fontsize=14)
+    ax.set_ylabel('Average Salary', fontsize=14)
+    ax.grid(axis='y', linestyle='--', alpha=0.5)
+    fig.tight_layout()  # Prevent label cutoff
+    return fig
+
+
+# Visualization 16: Distribution of Employees by salary
+def draw_salary_histogram(hist, figsize=(10, 4)):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    ax.hist(hist["edges"][:-1], bins=hist["edges"], weights=hist["counts"], color="skyblue", edgecolor="black")
+    ax.set_title(" Distribution of Employees by salary", fontsize=14, fontweight='bold')
+    ax.set_xlabel("Salary", fontsize=10)
+    ax.set_ylabel("Total Employees", fontsize=10)
+    ax.grid(False)
+    return fig
+
+
+# Visualization 17: Salary by Job Title
+def draw_title_avg_salary(result, figsize=(10, 4)):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    sns.barplot(x='title', y='avg_sal', data=result, hue='title', palette='viridis', legend=False, ax=ax)
+    ax.set_title('Average Salary by Job Title', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Job Title', fontsize=10)
+    ax.set_ylabel('Average Salary', fontsize=10)
+    for index, value in enumerate(result['avg_sal']):
+        ax.annotate(f'{value:.2f}', (index, value + 500),
+                    ha='center', va='bottom', fontsize=10)
+    return fig
+
+
+# Visualization 18: Salary by Performance Rating
+def draw_rating_avg_salary(result, figsize=(10, 4)):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    ax.bar(result['Last_performance_rating'].astype(str), result['avg_salary'], color='skyblue')
+    for i, val in enumerate(result['avg_salary']):
+        ax.text(i, val, f'{val:,.2f}', ha='center', va='bottom')
+    ax.set_title('Average Salary by Last Performance Rating', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Last Performance Rating', fontsize=10)
+    ax.set_ylabel('Average Salary', fontsize=10)
+    return fig
+
+
+# Visualization 19: Employees by Salary Range
+def draw_salary_range_distribution(salary_dist, figsize=(10, 4)):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    sns.barplot(x='salary_range', y='NO_OF_EMP', data=salary_dist, color='skyblue', ax=ax)
+    for i, row in salary_dist.iterrows():
+        ax.annotate(f"{row['NO_OF_EMP']}", (i, row['NO_OF_EMP']),
+                    ha='center', va='bottom')
+    ax.set_title('Employees by Salary Range', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Salary Range', fontsize=10)
+    ax.set_ylabel('Total Employees', fontsize=10)
+    return fig
+
+
+# Cohort survival curves (cohorts.survival_curves): the share of each cohort
+# still employed by years since hire, as step lines with their 95% band
+def draw_cohort_survival(curves, figsize=(14, 6)):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    palette = sns.color_palette("tab10", max(curves["cohort"].nunique(), 1))
+    for color, (cohort, curve) in zip(palette, curves.groupby("cohort", observed=True)):
+        time = np.concatenate([[0.0], curve["time"].to_numpy()])
+        ax.step(time, np.concatenate([[100.0], curve["survival"].to_numpy() * 100]),
+                where="post", color=color, linewidth=2, label=str(cohort))
+        ax.fill_between(time, np.concatenate([[100.0], curve["lower"].to_numpy() * 100]),
+                        np.concatenate([[100.0], curve["upper"].to_numpy() * 100]),
+                        step="post", color=color, alpha=0.15)
+    ax.set_title('Employee Retention by Cohort (Kaplan-Meier)', fontsize=16, fontweight='bold')
+    ax.set_xlabel('Years since Hire', fontsize=12)
+    ax.set_ylabel('Still Employed (%)', fontsize=12)
+    ax.grid(alpha=0.2)
+    if len(curves):
+        ax.legend(title='Cohort', fontsize=9, loc='lower left')
+    return fig
+
+
+# Cohort retention matrix (cohorts.retention_matrix): retention % of each
+# cohort after each whole year since hire
+def draw_cohort_retention(matrix, figsize=(14, 6)):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    # Colour scale from the lowest retention rounded down to 10%
+    lowest = np.nanmin(matrix.to_numpy(dtype=float), initial=100.0)
+    sns.heatmap(matrix, ax=ax, cmap="RdYlGn", vmin=lowest // 10 * 10, vmax=100, annot=matrix.size <= 400, fmt=".0f", annot_kws={"fontsize": 7},
+                cbar_kws={"label": "Still Employed (%)"})
+    ax.set_title('Cohort Retention Matrix', fontsize=16, fontweight='bold')
+    ax.set_xlabel('Years since Hire', fontsize=12)
+    ax.set_ylabel('Cohort', fontsize=12)
+    return fig
+
+
+# Drawing function of each visualization, keyed like aggregations.VISUALIZATIONS,
+# plus the two charts of the cohort section
+CHARTS = {
+    "age_group_turnover": draw_age_group_turnover,
+    "attrition_rate_trend": draw_attrition_rate_trend,
+    "gender_distribution": draw_gender_distribution,
+    "performance_rating_distribution": draw_performance_rating_distribution,
+    "title_distribution": draw_title_distribution,
+    "project_distribution": draw_project_distribution,
+    "tenure_histogram": draw_tenure_histogram,
+    "tenure_group_distribution": draw_tenure_group_distribution,
+    "hiring_trend": draw_hiring_trend,
+    "exit_trend": draw_exit_trend,
+    "total_employees_by_year": draw_total_employees_by_year,
+    "department_headcount": draw_department_headcount,
+    "department_avg_salary": draw_department_avg_salary,
+    "managers_by_department": draw_managers_by_department,
+    "salary_by_year": draw_salary_by_year,
+    "salary_histogram": draw_salary_histogram,
+    "title_avg_salary": draw_title_avg_salary,
+    "rating_avg_salary": draw_rating_avg_salary,
+    "salary_range_distribution": draw_salary_range_distribution,
+    "cohort_survival": draw_cohort_survival,
+    "cohort_retention": draw_cohort_retention,
+}
+
+
+# Draw a chart and encode it as PNG (or SVG) bytes
+def render_figure(name, result, figsize=None, theme=None, fmt="png"):
+    draw = CHARTS[name]
+    with _style.use(theme):
+        with span("draw", chart=name):
+            fig = draw(result) if figsize is None else draw(result, figsize=figsize)
+        with span("encode", chart=name, format=fmt):
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format=fmt, dpi=RENDER_DPI, bbox_inches="tight")
+        fig.clear()
+    return buffer.getvalue()
+
+
+# Encoded chart bytes, rendered once per figure_key() and served from
+# `cache` (a result_cache.ResultCache) afterwards
+def render_chart(name, result, cache, figsize=None, theme=None, fmt="png"):
+    key = figure_key(name, result, figsize, theme, fmt)
+    return cache.get_or_compute(key, lambda: render_figure(name, result, figsize, theme, fmt))
@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+
+
+# Cohort retention and Kaplan-Meier survival curves. Employees are grouped
+# into cohorts by hire year, department or job title (an employee who worked
+# in several departments or titles belongs to each of those cohorts), and
+# their tenure is the time to the event "left the company", censored at the
+# end of the data for employees still employed.
+#
+# The input is a table of spells: cohort, duration in years, whether the
+# employee left, and the number of employees with those values. All cohorts
+# of a dimension are computed in one pass: the spells are sorted by (cohort,
+# duration), and the at-risk counts and survival products come out of
+# cumulative sums that restart at every cohort boundary, with no loop over
+# cohorts.
+
+# Cohort dimensions and their display names
+DIMENSIONS = {"hire_year": "Hire year", "dept_name": "Department", "title": "Job title"}
+
+# Result name of the survival table of each dimension, for the result cache
+COHORT_VIEWS = {f"cohorts_{by}": by for by in DIMENSIONS}
+
+# Years since hire shown in the cohort summary
+SUMMARY_YEARS = (1, 5, 10)
+
+
+def cohort_view(by):
+    return f"cohorts_{by}"
+
+
+# Spell table of a frame with one row per assignment (it must have the
+# `tenure` column and, for hire-year cohorts, `hire_year`): one spell per
+# distinct employee and cohort value
+def cohort_spells(df, by):
+    if by not in DIMENSIONS:
+        raise KeyError(f"Unknown cohort dimension {by!r}; expected one of {list(DIMENSIONS)}")
+    pairs = df[["emp_no", by, "tenure", "left"]].drop_duplicates(subset=["emp_no", by])
+    return pd.DataFrame({
+        "cohort": pairs[by].array,
+        "duration": pairs["tenure"].to_numpy(dtype=float),
+        "event": pairs["left"].to_numpy() == 1,
+        "n": np.ones(len(pairs), dtype=np.int64),
+    })
+
+
+# Per-cohort sums over consecutive runs of `values`: `starts` marks the
+# first entry of every cohort, the sums restart there
+def _cohort_cumsum(values, starts):
+    total = np.cumsum(values)
+    first = np.flatnonzero(starts)
+    before = total[first] - values[first]
+    return total - np.repeat(before, np.diff(np.append(first, len(values))))
+
+
+# Kaplan-Meier table of every cohort: one row per distinct duration in a
+# cohort, with the employees at risk just before it, the exits and the
+# censored employees at it, the survival probability after it and its 95%
+# confidence band (Greenwood). `cohort` is categorical, in cohort order.
+def survival_curves(spells):
+    cohort = pd.Categorical(spells["cohort"])
+    codes = cohort.codes.astype(np.int64)
+    duration = spells["duration"].to_numpy(dtype=float)
+    event = spells["event"].to_numpy(dtype=bool)
+    n = spells["n"].to_numpy(dtype=float)
+    keep = (codes >= 0) & ~np.isnan(duration) & (n > 0)
+    codes, duration, event, n = codes[keep], duration[keep], event[keep], n[keep]
+
+    # Sort by (cohort code, duration) and collapse equal spells; the
+    # durations are carried as they are, not packed into one float key
+    order = np.lexsort((duration, codes))
+    codes, duration, event, n = codes[order], duration[order], event[order], n[order]
+    distinct = np.ones(len(codes), dtype=bool)
+    distinct[1:] = (codes[1:] != codes[:-1]) | (duration[1:] != duration[:-1])
+    first = np.flatnonzero(distinct)
+    removed = np.add.reduceat(n, first) if len(first) else np.zeros(0)
+    exits = np.add.reduceat(n * event, first) if len(first) else np.zeros(0)
+    codes, duration = codes[first], duration[first]
+
+    starts = np.ones(len(codes), dtype=bool)
+    starts[1:] = codes[1:] != codes[:-1]
+    sizes = np.bincount(codes, weights=removed, minlength=len(cohort.categories))
+    at_risk = sizes[codes] - (_cohort_cumsum(removed, starts) - removed)
+
+    # Product of (1 - exits / at risk) as a sum of logs; once everyone at
+    # risk has left the survival stays at zero
+    hazard = exits / at_risk
+    gone = _cohort_cumsum((hazard >= 1).astype(float), starts) > 0
+    log_survival = _cohort_cumsum(np.log1p(-np.where(hazard < 1, hazard, 0.0)), starts)
+    survival = np.where(gone, 0.0, np.exp(log_survival))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        greenwood = _cohort_cumsum(np.where(at_risk > exits, exits / (at_risk * (at_risk - exits)), 0.0), starts)
+    margin = 1.96 * survival * np.sqrt(greenwood)
+
+    return pd.DataFrame({
+        "cohort": pd.Categorical.from_codes(codes, dtype=cohort.dtype),
+        "time": duration,
+        "at_risk": at_risk.astype(np.int64),
+        "exits": exits.astype(np.int64),
+        "censored": (removed - exits).astype(np.int64),
+        "survival": survival,
+        "lower": np.clip(survival - margin, 0, 1),
+        "upper": np.clip(survival + margin, 0, 1),
+    })
+
+
+# Survival of every cohort at each of `years` since hire, as a cohort x
+# year frame of percentages. A cohort whose longest spell is shorter than a
+# year is not observed that long, and gets NaN there (the triangle of
+# recent cohorts).
+def retention_matrix(curves, years=None):
+    cohorts = curves["cohort"].cat.categories
+    codes = curves["cohort"].cat.codes.to_numpy().astype(np.int64)
+    # A negative tenure (an exit dated before the hire) counts as leaving at
+    # hire; unclipped it would sort into the previous cohort's keys below
+    time = np.maximum(curves["time"].to_numpy(dtype=float), 0.0)
+    if years is None:
+        years = np.arange(int(np.floor(time.max())) + 1 if len(time) else 1)
+    years = np.asarray(years, dtype=float)
+
+    # Last row at or before each (cohort, year), found with one searchsorted
+    # over the rows sorted by (cohort, time)
+    span = (np.nanmax(time) if len(time) else 0) + years.max() + 1
+    keys = codes * span + time
+    grid_codes = np.repeat(np.arange(len(cohorts)), len(years))
+    grid = grid_codes * span + np.tile(years, len(cohorts))
+    position = np.searchsorted(keys, grid, side="right") - 1
+    found = (position >= 0) & (codes[np.maximum(position, 0)] == grid_codes)
+    values = np.where(found, curves["survival"].to_numpy()[np.maximum(position, 0)], 1.0)
+
+    followed = np.full(len(cohorts), -np.inf)
+    np.maximum.at(followed, codes, time)
+    values[np.tile(years, len(cohorts)) > followed[grid_codes]] = np.nan
+    matrix = pd.DataFrame(values.reshape(len(cohorts), len(years)) * 100,
+                          index=pd.Index(cohorts, name="cohort"), columns=years.astype(int))
+    return matrix[np.isfinite(followed)]
+
+
+# One row per cohort: employees, exits, median tenure (the first time the
+# survival falls to 50% or below; NaN while more than half are still
+# employed) and the retention after each of `years`. The survival is a
+# product computed as a sum of logs, so it is compared with a tolerance.
+def cohort_summary(curves, years=SUMMARY_YEARS):
+    grouped = curves.groupby("cohort", observed=True)
+    half = curves["survival"] <= 0.5 + 1e-9
+    summary = pd.DataFrame({
+        "employees": grouped["at_risk"].first(),
+        "left": grouped["exits"].sum(),
+        "median_tenure": curves[half].groupby("cohort", observed=True)["time"].first(),
+    })
+    retention = retention_matrix(curves, years)
+    for year in retention.columns:
+        summary[f"retained_{year}y_pct"] = retention[year]
+    return summary.reset_index()
+
+
+# The `limit` largest cohorts, largest first, for the default chart
+def largest_cohorts(curves, limit=8):
+    sizes = curves.groupby("cohort", observed=True)["at_risk"].first()
+    return sizes.sort_values(ascending=False, kind="stable").index[:limit].tolist()
@@ -0,0 +1,82 @@
+from aggregations import VISUALIZATIONS
+from cohorts import COHORT_VIEWS, cohort_view
+
+
+# Cross-filtering from chart clicks. Clicking a department in Visualization
+# 12, a year in Visualization 9/10 or a salary range in Visualization 19
+# sets a chart filter that applies on top of the sidebar selection to the
+# views that depend on it: every view except those broken down by the
+# filter's own column. The clicked chart keeps showing all of its values so
+# the selection can be changed, and so do the other charts along the same
+# dimension (a department click does not collapse the department salary and
+# manager charts to one bar).
+#
+# The salary range filter is the band of each employee's average salary
+# over all of their rows, while Visualization 19 averages the rows of the
+# current selection; the two differ when department or title filters are
+# active, so the filter is labelled as the all-time band.
+#
+# Each view's effective selection is derived from the dependency graph
+# below, and results are cached per (version, effective selection, view),
+# so changing one chart filter only recomputes the views that depend on it.
+
+# Chart filter column set by clicking each source chart
+CROSS_FILTERS = {
+    "department_headcount": "dept_name",
+    "hiring_trend": "hire_year",
+    "exit_trend": "exit_year",
+    "salary_range_distribution": "salary_range",
+}
+
+# Chart filter columns each view is broken down by, besides its own
+VIEW_DIMENSIONS = {
+    "department_avg_salary": "dept_name",
+    "managers_by_department": "dept_name",
+    cohort_view("dept_name"): "dept_name",
+    cohort_view("hire_year"): "hire_year",
+}
+
+# Chart filters every view (the 19 visualizations, the Key Metrics and the
+# cohort survival tables) depends on
+DEPENDENCIES = {
+    name: [col for col in CROSS_FILTERS.values()
+           if col not in (CROSS_FILTERS.get(name), VIEW_DIMENSIONS.get(name))]
+    for name in list(VISUALIZATIONS) + ["kpis"] + list(COHORT_VIEWS)
+}
+
+
+# Selection a view is computed with: the sidebar selection plus the chart
+# filters it depends on. A department click narrows the sidebar departments
+# (and is ignored when it lies outside them).
+def view_selection(name, selection, cross):
+    selection = dict(selection or {})
+    for col, values in (cross or {}).items():
+        if not values or col not in DEPENDENCIES[name]:
+            continue
+        if col == "dept_name" and selection.get("dept_name"):
+            values = [value for value in values if value in selection["dept_name"]]
+            if not values:
+                continue
+        selection[col] = list(values)
+    return selection
+
+
+# Values picked in a chart's point selection (a list of {field: value}),
+# as chart filter values
+def picked_values(chart, points):
+    col = CROSS_FILTERS[chart]
+    values = [point[col] for point in points or [] if isinstance(point, dict) and point.get(col) is not None]
+    if col in ("hire_year", "exit_year"):
+        values = [int(value) for value in values]
+    return sorted(set(values))
+
+
+# Chart filters with the filter of `chart` replaced by `values`
+def update_cross(cross, chart, values):
+    cross = {col: list(v) for col, v in (cross or {}).items() if v}
+    col = CROSS_FILTERS[chart]
+    if values:
+        cross[col] = list(values)
+    else:
+        cross.pop(col, None)
+    return cross
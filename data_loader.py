@@ -0,0 +1,374 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pandas.api.types import union_categoricals
+
+from filters import derive_filters
+
+
+# Where the typed columnar copy of the source CSV is kept between runs
+SNAPSHOT_DIR = os.environ.get("DASHBOARD_SNAPSHOT_DIR", ".snapshot")
+SNAPSHOT_FILE = "employees.parquet"
+META_FILE = "employees.meta.json"
+
+# Column types for the employee dataset
+DATE_COLUMNS = ["hire_date", "last_date", "birth_date"]
+CATEGORY_COLUMNS = ["dept_name", "title", "sex", "Last_performance_rating"]
+INT_COLUMNS = ["emp_no", "salary", "no_of_projects", "left"]
+
+# Chunked CSV parsing defaults
+CHUNK_SIZE = 200_000
+PREVIEW_LINES = 5
+
+
+class MemoryBudgetExceeded(MemoryError):
+    pass
+
+
+# Convert the raw CSV columns to compact types: datetime64 dates,
+# categorical strings and the smallest integer type that fits
+def optimize_dtypes(df):
+    for col in DATE_COLUMNS:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    for col in INT_COLUMNS:
+        if col in df.columns and pd.api.types.is_numeric_dtype(df[col]):
+            if df[col].isna().any():
+                df[col] = pd.to_numeric(df[col], downcast="float")
+            else:
+                df[col] = pd.to_numeric(df[col], downcast="integer")
+    return df
+
+
+# Typed columns plus the derived `tenure` column (years from hire date to
+# last date, or to the latest last date for employees still employed)
+def prepare_data(df):
+    df = optimize_dtypes(df)
+    if "hire_date" in df.columns and "last_date" in df.columns:
+        max_last_date = df['last_date'].max()
+        df["tenure"] = ((df['last_date'].fillna(max_last_date) - df['hire_date']).dt.days / 365.0)
+    return derive_filters(df)
+
+
+# Read-only view of a NumPy array
+def read_only(values):
+    values = values.view()
+    values.setflags(write=False)
+    return values
+
+
+# The same frame backed by read-only buffers, for the dataset shared by every
+# session: filtering and aggregating it work as usual (a filtered frame is a
+# new frame), but writing into it raises instead of changing the data under
+# the other sessions. NumPy-backed and categorical columns are wrapped
+# without copying the data (nullable integers are copied once); Arrow-backed
+# strings are immutable already.
+def freeze_frame(df):
+    columns = {}
+    for col in df.columns:
+        values = df[col].array
+        if isinstance(values, pd.Categorical):
+            values = pd.Categorical.from_codes(read_only(values.codes), dtype=values.dtype)
+        elif isinstance(values, (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)):
+            data = values.to_numpy(dtype=values.dtype.numpy_dtype, na_value=0)
+            values = type(values)(read_only(data), read_only(values.isna()))
+        elif isinstance(df[col].dtype, np.dtype):
+            values = read_only(df[col].to_numpy())
+        columns[col] = values
+    frozen = pd.DataFrame(columns, index=df.index, copy=False)
+    frozen.attrs.update(df.attrs)
+    return frozen
+
+
+def _snapshot_paths(snapshot_dir):
+    return (os.path.join(snapshot_dir, SNAPSHOT_FILE),
+            os.path.join(snapshot_dir, META_FILE))
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# Replace the metadata file atomically, so a reader never sees truncated JSON
+def _write_meta(meta, meta_path):
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+# Write the snapshot and its metadata next to each other, replacing the
+# previous files atomically so a reader never sees a half-written snapshot
+def write_snapshot(df, meta, snapshot_dir=SNAPSHOT_DIR):
+    os.makedirs(snapshot_dir, exist_ok=True)
+    data_path, meta_path = _snapshot_paths(snapshot_dir)
+    df.to_parquet(data_path + ".tmp", index=False)
+    os.replace(data_path + ".tmp", data_path)
+    _write_meta(meta, meta_path)
+
+
+def read_snapshot(snapshot_dir=SNAPSHOT_DIR):
+    data_path, _ = _snapshot_paths(snapshot_dir)
+    return read_parquet_frame(data_path)
+
+
+# Binary reader that counts and hashes the bytes flowing through it, so the
+# source can be parsed while it downloads without keeping a second copy
+class _CountingReader(io.RawIOBase):
+    def __init__(self, raw):
+        self._raw = raw
+        self.bytes_read = 0
+        self.sha256 = hashlib.sha256()
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        data = self._raw.read(len(b))
+        n = len(data)
+        b[:n] = data
+        self.bytes_read += n
+        self.sha256.update(data)
+        return n
+
+    def close(self):
+        self._raw.close()
+        super().close()
+
+
+def _local_path(public_link):
+    if public_link.startswith("file://"):
+        return public_link[len("file://"):]
+    if "://" not in public_link:
+        return public_link
+    return None
+
+
+# Open the source as a byte stream. Returns (stream, validators, total_size),
+# or (None, validators, None) when the source is unchanged since `meta`
+def open_source(public_link, meta=None, timeout=60):
+    meta = meta or {}
+    path = _local_path(public_link)
+    if path is not None:
+        stat = os.stat(path)
+        validators = {"etag": f"{stat.st_mtime_ns}-{stat.st_size}", "last_modified": None}
+        if meta.get("etag") == validators["etag"]:
+            return None, validators, None
+        return open(path, "rb"), validators, stat.st_size
+
+    # Only needed for remote sources
+    import requests
+
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    response = requests.get(public_link, headers=headers, timeout=timeout, stream=True)
+    response.raise_for_status()
+    validators = {"etag": response.headers.get("ETag"),
+                  "last_modified": response.headers.get("Last-Modified")}
+    if response.status_code == 304:
+        response.close()
+        return None, validators, None
+    response.raw.decode_content = True
+    total = response.headers.get("Content-Length")
+    return response.raw, validators, int(total) if total else None
+
+
+# Union of the categoricals of one column across chunks, with sorted
+# categories so the result does not depend on the order rows arrived in.
+# Chunks that all have the same categories (e.g. the bins of a derived
+# column) keep their order. A chunk where the column is empty has
+# categories of another dtype (float for an all-NaN column), so the
+# categories are first cast to the dtype the non-empty chunks share, or to
+# strings if they disagree.
+def _union_categories(values):
+    values = [pd.Categorical(value) for value in values]
+    if all(value.categories.equals(values[0].categories) for value in values[1:]):
+        return union_categoricals(values)
+    dtypes = {value.categories.dtype for value in values if len(value.categories)}
+    dtype = dtypes.pop() if len(dtypes) == 1 else str
+    values = [value if value.categories.dtype == dtype else
+              value.rename_categories(value.categories.astype(dtype)) for value in values]
+    return union_categoricals(values, sort_categories=True)
+
+
+# Concatenate typed chunks, unioning the categories so the categorical
+# columns stay categorical instead of falling back to object
+def _concat_chunks(chunks):
+    if len(chunks) == 1:
+        return chunks[0]
+    categorical = [col for col in chunks[0].columns
+                   if isinstance(chunks[0][col].dtype, pd.CategoricalDtype)]
+    unioned = {col: _union_categories([chunk[col] for chunk in chunks]) for col in categorical}
+    df = pd.concat([chunk.drop(columns=categorical) for chunk in chunks], ignore_index=True)
+    for col in categorical:
+        df[col] = unioned[col]
+    return df[chunks[0].columns]
+
+
+# Arrow type a column is written with while streaming. Later chunks can
+# downcast a column to a different type (int8 in one chunk, int16 or float
+# with missing values in the next; categories of their own), so the file
+# keeps the widest type of each kind and one string dictionary per
+# categorical column, and the frame is downcast again when it is read back.
+def _stream_type(arrow_type):
+    if pa.types.is_integer(arrow_type):
+        return pa.int64()
+    if pa.types.is_floating(arrow_type):
+        return pa.float64()
+    if pa.types.is_timestamp(arrow_type):
+        return pa.timestamp("us")
+    if pa.types.is_dictionary(arrow_type):
+        return pa.dictionary(pa.int32(), pa.large_string())
+    if pa.types.is_null(arrow_type) or pa.types.is_string(arrow_type):
+        return pa.large_string()
+    return arrow_type
+
+
+# Parse a CSV byte stream in chunks, downcasting each chunk and appending it
+# to the Parquet file at `path` as it arrives, so only one parsed chunk is in
+# memory at a time. Returns (preview_lines, rows, bytes_read, sha256).
+# `max_memory_mb` caps the peak of loading the result (the frame read back
+# plus one chunk) and fails as soon as the chunks read so far would exceed
+# it; `progress(bytes_read, total, rows)` is called after every chunk.
+def stream_csv_to_parquet(stream, path, chunksize=CHUNK_SIZE, max_memory_mb=None, progress=None, total=None):
+    reader = _CountingReader(stream)
+    budget = max_memory_mb * 1024 * 1024 if max_memory_mb else None
+    writer, schema, preview, rows, used, largest = None, None, None, 0, 0, 0
+    try:
+        with io.BufferedReader(reader) as buffered:
+            for chunk in pd.read_csv(buffered, encoding="utf-8", chunksize=chunksize):
+                chunk = optimize_dtypes(chunk)
+                if preview is None:
+                    preview = chunk.head(PREVIEW_LINES).to_csv(index=False).splitlines()
+                rows += len(chunk)
+                size = int(chunk.memory_usage(deep=True).sum())
+                used, largest = used + size, max(largest, size)
+                if budget is not None and used + largest > budget:
+                    raise MemoryBudgetExceeded(
+                        f"Dataset exceeds the memory budget of {max_memory_mb} MB after {rows:,} rows "
+                        f"(the loaded frame plus one chunk, {(used + largest) / 1024 / 1024:.0f} MB)")
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                del chunk
+                if writer is None:
+                    schema = pa.schema([pa.field(field.name, _stream_type(field.type)) for field in table.schema])
+                    writer = pq.ParquetWriter(path, schema)
+                writer.write_table(table.cast(schema))
+                if progress is not None:
+                    progress(reader.bytes_read, total, rows)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    if writer is None:
+        pd.DataFrame().to_parquet(path, index=False)
+    else:
+        writer.close()
+    return preview or [], rows, reader.bytes_read, reader.sha256.hexdigest()
+
+
+# Read a Parquet file into a typed frame. The Arrow buffers are released
+# column by column as they are converted, so the read peaks at about one
+# frame. Categories are sorted so the frame does not depend on the order
+# the rows arrived in.
+def read_parquet_frame(path):
+    df = pq.read_table(path).to_pandas(split_blocks=True, self_destruct=True)
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].cat.reorder_categories(df[col].cat.categories.sort_values())
+    return optimize_dtypes(df)
+
+
+# Parse a CSV byte stream through a temporary Parquet file (see
+# stream_csv_to_parquet) and read it back. Returns (df, preview_lines,
+# bytes_read, sha256).
+def stream_csv(stream, chunksize=CHUNK_SIZE, max_memory_mb=None, progress=None, total=None):
+    fd, path = tempfile.mkstemp(suffix=".parquet")
+    os.close(fd)
+    try:
+        preview, _, bytes_read, digest = stream_csv_to_parquet(
+            stream, path, chunksize=chunksize, max_memory_mb=max_memory_mb, progress=progress, total=total)
+        return read_parquet_frame(path), preview, bytes_read, digest
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+# Preview lines stored alongside the snapshot
+def snapshot_preview(snapshot_dir=SNAPSHOT_DIR):
+    _, meta_path = _snapshot_paths(snapshot_dir)
+    return _read_meta(meta_path).get("preview", [])
+
+
+# Version of a snapshot after merging a delta file with content hash
+# `digest` into it (see delta_refresh.py)
+def delta_version(version, digest):
+    return hashlib.sha256(f"{version}:{digest}".encode("utf-8")).hexdigest()
+
+
+# Content hash of the current snapshot and the delta files merged into it,
+# used to version cached results
+def snapshot_version(snapshot_dir=SNAPSHOT_DIR):
+    _, meta_path = _snapshot_paths(snapshot_dir)
+    meta = _read_meta(meta_path)
+    version = meta.get("sha256")
+    for delta in meta.get("deltas", []):
+        version = delta_version(version, delta["sha256"])
+    return version
+
+
+# Load the employee dataset from its columnar snapshot. The source is fetched
+# once and streamed into the chunked parser, and only when its ETag,
+# Last-Modified or content hash has changed.
+def load_snapshot(public_link, snapshot_dir=SNAPSHOT_DIR, timeout=60,
+                  chunksize=CHUNK_SIZE, max_memory_mb=None, progress=None):
+    data_path, meta_path = _snapshot_paths(snapshot_dir)
+    meta = _read_meta(meta_path)
+    have_snapshot = os.path.exists(data_path) and meta.get("source") == public_link
+
+    try:
+        stream, validators, total = open_source(public_link, meta if have_snapshot else None, timeout)
+    except OSError:
+        # Source unreachable (requests' errors are OSErrors too): serve the
+        # last good snapshot if there is one
+        if have_snapshot:
+            return read_snapshot(snapshot_dir)
+        raise
+
+    if stream is None:
+        return read_snapshot(snapshot_dir)
+
+    # The chunks are written straight to the new snapshot file, which
+    # replaces the old one only when the content has changed
+    os.makedirs(snapshot_dir, exist_ok=True)
+    stream_path = data_path + ".tmp"
+    preview, _, _, digest = stream_csv_to_parquet(stream, stream_path, chunksize=chunksize,
+                                                  max_memory_mb=max_memory_mb, progress=progress, total=total)
+    new_meta = {"source": public_link, "sha256": digest, "preview": preview, **validators}
+    if have_snapshot and meta.get("sha256") == digest:
+        # Same content under new validators: keep the existing snapshot file
+        # and the deltas merged into it
+        os.remove(stream_path)
+        if meta.get("deltas"):
+            new_meta["deltas"] = meta["deltas"]
+    else:
+        os.replace(stream_path, data_path)
+    _write_meta(new_meta, meta_path)
+    return read_snapshot(snapshot_dir)
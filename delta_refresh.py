@@ -0,0 +1,374 @@
+import argparse
+import hashlib
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_loader import (SNAPSHOT_DIR, _concat_chunks, _read_meta, _snapshot_paths, delta_version, freeze_frame,
+                         optimize_dtypes, prepare_data, read_snapshot, snapshot_version, write_snapshot)
+from employee_facts import build_employee_facts, update_employee_facts
+from employee_model import EMPLOYEE_COLUMNS, EmployeeModel
+from filters import DERIVED_FILTERS, FILTER_COLUMNS, FilterIndex, derive_filters, filter_column
+from timeseries import HeadcountSeries
+
+
+# Incremental refresh of the employee dataset from delta files, without
+# downloading and parsing the full source again.
+#
+# A delta file is a CSV with the dataset's columns (any subset, but always
+# `emp_no`). Each row is either
+#   - an update of an employee's attributes (e.g. a new `last_date` and
+#     `left` for an exit): non-empty attribute columns replace the values on
+#     all of that employee's rows, and
+#   - when it has a department, title or salary, an assignment row that is
+#     appended unless the employee already has it (new hires, new salaries).
+# Applying a delta twice gives the same data.
+#
+# Only the affected employees' derived values (tenure, per-employee facts)
+# are recomputed, and cached results of selections that contain none of
+# their rows are carried over to the new version. The merged snapshot is
+# written to disk and the new version swapped in atomically, so sessions
+# keep reading the previous version until it is ready.
+
+DELTA_PATTERN = ".csv"
+
+EMPLOYEE_ATTRIBUTES = [col for col in EMPLOYEE_COLUMNS if col != "emp_no"]
+ASSIGNMENT_COLUMNS = ["dept_name", "title", "salary"]
+DERIVED_COLUMNS = ["tenure"] + list(DERIVED_FILTERS)
+
+
+def read_delta(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    delta = optimize_dtypes(pd.read_csv(io.BytesIO(data), encoding="utf-8"))
+    if "emp_no" not in delta.columns:
+        raise ValueError(f"Delta file {path} has no emp_no column")
+    return delta, hashlib.sha256(data).hexdigest()
+
+
+# `values` with the positions in `mask` replaced by `new`, keeping
+# categoricals categorical and integers in the smallest type that fits
+def _replace_values(values, mask, new):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        missing = [value for value in pd.unique(new[mask].dropna()) if value not in values.cat.categories]
+        values = values.cat.add_categories(missing)
+        new = new.astype(object)
+    elif pd.api.types.is_datetime64_any_dtype(values):
+        new = pd.to_datetime(new, errors="coerce")
+    result = values.where(~mask, new)
+    if pd.api.types.is_numeric_dtype(values) and pd.api.types.is_numeric_dtype(result):
+        downcast = "float" if result.isna().any() else "integer"
+        result = pd.to_numeric(result, downcast=downcast)
+    return result
+
+
+# Merge a delta into the typed frame `df` (which is left unchanged).
+# Returns the merged frame and the emp_nos of the affected employees.
+def merge_delta(df, delta):
+    delta = delta.dropna(subset=["emp_no"]).astype({"emp_no": np.int64})
+    merged = df.copy(deep=False)
+    attributes = [col for col in EMPLOYEE_ATTRIBUTES if col in delta.columns and col in df.columns]
+    # Latest non-empty value of each attribute per employee
+    updates = delta.groupby("emp_no", sort=False)[attributes].last() if attributes else None
+
+    emp_nos = merged["emp_no"].to_numpy(dtype=np.int64)
+    if updates is not None:
+        for col in attributes:
+            new = updates[col].reindex(emp_nos)
+            mask = new.notna().to_numpy()
+            if mask.any():
+                merged[col] = _replace_values(merged[col], mask, pd.Series(new.to_numpy(), index=merged.index))
+
+    assignments = [col for col in ASSIGNMENT_COLUMNS if col in delta.columns]
+    if assignments:
+        candidates = delta.dropna(subset=assignments, how="all")
+        key_columns = ["emp_no"] + assignments
+        existing = merged.loc[merged["emp_no"].isin(candidates["emp_no"]), key_columns]
+        known = set(existing.astype(object).itertuples(index=False, name=None))
+        keys = candidates[key_columns].astype(object).drop_duplicates()
+        new_rows = keys[[key not in known for key in keys.itertuples(index=False, name=None)]]
+        if len(new_rows):
+            merged = _append_rows(merged, new_rows, updates)
+
+    affected = pd.unique(delta["emp_no"])
+    return merged, affected
+
+
+# Append assignment rows, taking the employee attributes from the
+# employee's existing rows, or from the delta for new employees
+def _append_rows(merged, new_rows, updates):
+    first = merged.drop_duplicates(subset="emp_no").set_index("emp_no")
+    attributes = [col for col in EMPLOYEE_ATTRIBUTES if col in merged.columns]
+    current = first.loc[first.index.intersection(new_rows["emp_no"].unique()), attributes]
+    if updates is not None:
+        new_employees = updates.index.difference(current.index)
+        current = pd.concat([current.astype(object), updates.loc[new_employees].astype(object)])
+    rows = new_rows.reset_index(drop=True)
+    for col in merged.columns:
+        if col in attributes:
+            rows[col] = current[col].reindex(rows["emp_no"]).to_numpy() if col in current else np.nan
+        elif col not in rows:
+            rows[col] = np.nan
+    rows = rows[list(merged.columns)]
+    for col in merged.columns:
+        if col in DERIVED_COLUMNS:
+            # Missing until update_derived recomputes them
+            rows[col] = pd.Series(index=rows.index, dtype=merged[col].dtype)
+        elif isinstance(merged[col].dtype, pd.CategoricalDtype):
+            rows[col] = rows[col].astype("category")
+        elif pd.api.types.is_datetime64_any_dtype(merged[col]):
+            rows[col] = pd.to_datetime(rows[col], errors="coerce")
+        elif pd.api.types.is_numeric_dtype(merged[col]):
+            rows[col] = pd.to_numeric(rows[col], errors="coerce")
+    merged = _concat_chunks([merged.reset_index(drop=True), rows])
+    for col in merged.columns:
+        if pd.api.types.is_numeric_dtype(merged[col]) and col not in DERIVED_COLUMNS:
+            merged[col] = pd.to_numeric(merged[col], downcast="float" if merged[col].isna().any() else "integer")
+    return merged
+
+
+# Recompute the derived columns of the affected employees' rows: the derived
+# filters, and the tenure of every row when the latest last_date (the end
+# of open tenures) moved. Returns True when every row's tenure was
+# recomputed.
+def update_derived(merged, previous, affected):
+    derive_filters(merged, merged["emp_no"].isin(affected).to_numpy())
+    if "hire_date" not in merged.columns or "last_date" not in merged.columns:
+        return False
+    max_last_date = merged["last_date"].max()
+    if "tenure" not in merged.columns or max_last_date != previous["last_date"].max():
+        merged["tenure"] = (merged["last_date"].fillna(max_last_date) - merged["hire_date"]).dt.days / 365.0
+        return True
+    rows = merged["emp_no"].isin(affected).to_numpy() | merged["tenure"].isna().to_numpy()
+    tenure = merged["tenure"].to_numpy(dtype=float, copy=True)
+    part = merged.loc[rows]
+    tenure[rows] = (part["last_date"].fillna(max_last_date) - part["hire_date"]).dt.days.to_numpy() / 365.0
+    merged["tenure"] = tenure
+    return False
+
+
+def _key_string(value):
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        value = int(value)
+    return str(value)
+
+
+# Whether any of `rows` matches the selection of a selection_key()
+def _selection_matches(rows, key):
+    mask = np.ones(len(rows), dtype=bool)
+    for col, values in key:
+        if col in rows.columns:
+            mask &= rows[col].map(_key_string).isin(values).to_numpy()
+    return bool(mask.any())
+
+
+# Merge delta files into `df` in order. Returns the merged frame, its
+# version, the affected emp_nos, the applied deltas ({"file", "sha256"}) and
+# whether every row's derived values were recomputed.
+def apply_deltas(df, version, paths):
+    affected, deltas, full = [], [], False
+    for path in paths:
+        delta, digest = read_delta(path)
+        merged, emp_nos = merge_delta(df, delta)
+        full = update_derived(merged, df, emp_nos) or full
+        df = merged
+        affected.extend(emp_nos.tolist())
+        deltas.append({"file": os.path.basename(path), "sha256": digest})
+        version = delta_version(version, digest)
+    return df, version, pd.unique(np.asarray(affected, dtype=np.int64)), deltas, full
+
+
+# Names of the delta files merged into the snapshot
+def applied_deltas(snapshot_dir=SNAPSHOT_DIR):
+    _, meta_path = _snapshot_paths(snapshot_dir)
+    return [delta["file"] for delta in _read_meta(meta_path).get("deltas", [])]
+
+
+# Replace the snapshot with the merged frame, recording the new deltas
+def write_snapshot_deltas(df, deltas, snapshot_dir=SNAPSHOT_DIR):
+    _, meta_path = _snapshot_paths(snapshot_dir)
+    meta = _read_meta(meta_path)
+    meta["deltas"] = meta.get("deltas", []) + deltas
+    write_snapshot(df.drop(columns=DERIVED_COLUMNS, errors="ignore"), meta, snapshot_dir)
+
+
+# One immutable version of the dataset with the structures built from it:
+# the frame, filter index and employee facts, or the normalized model. The
+# version is held once per process and read by every session, so its frames
+# and arrays are read-only (data_loader.freeze_frame): sessions select rows
+# and aggregate, and only their small results are per session. `frame` is
+# the merged frame the next refresh starts from (the same frame as `df` with
+# `keep_frame`, None when refreshes are off), and `headcount` its yearly
+# headcount series, which a refresh appends the affected employees to.
+class DatasetVersion:
+    def __init__(self, version, df=None, index=None, facts=None, model=None, frame=None, headcount=None):
+        self.version = version
+        self.df = df
+        self.index = index
+        self.facts = facts
+        self.model = model
+        self.frame = frame
+        self.headcount = headcount
+
+    # With `previous`, the version `df` was merged from by a delta touching
+    # the employees `affected`, only their facts (or model totals) and
+    # headcount events are rebuilt; `full` when every row's tenure changed
+    @classmethod
+    def build(cls, df, version, keep_frame=True, keep_source=True, previous=None, affected=None, full=False):
+        df.attrs["version"] = version
+        df = freeze_frame(df)
+        headcount = None
+        if keep_frame or keep_source:
+            if previous is not None and previous.headcount is not None:
+                headcount = previous.headcount.copy().append(df[df["emp_no"].isin(affected)])
+            else:
+                headcount = HeadcountSeries.from_frame(df)
+        if keep_frame:
+            if (previous is not None and previous.facts is not None and not full
+                    and _extends_departments(previous.df, df)):
+                facts = update_employee_facts(previous.facts, df, affected)
+            else:
+                facts = build_employee_facts(df)
+            return cls(version, df=df, index=FilterIndex(df), facts=freeze_frame(facts), frame=df,
+                       headcount=headcount)
+        model = EmployeeModel(df, version, previous.model if previous is not None else None, affected)
+        return cls(version, model=model, frame=df if keep_source else None, headcount=headcount)
+
+
+# Whether the department codes of `df` extend those of `previous`, so the
+# previous employee facts' department masks are still valid (the merged
+# categories are sorted, so a new department can shift the codes)
+def _extends_departments(previous, df):
+    before = pd.Categorical(previous["dept_name"]).categories
+    return pd.Categorical(df["dept_name"]).categories[:len(before)].equals(before)
+
+
+# Unfiltered yearly time series charts of a headcount series, as the
+# aggregations of the same name return them
+def headcount_results(series):
+    table = series.table()
+    trend = table.rename(columns={'period': 'year'})
+    return {
+        "attrition_rate_trend": trend[trend['total_emp'] > 0],
+        "total_employees_by_year": table.rename(columns={'period': 'years'}),
+        "salary_by_year": table.rename(columns={'period': 'years'}),
+    }
+
+
+# The current dataset version plus the background refresh that replaces it.
+# `current` is swapped in a single assignment, so readers never wait. With
+# `keep_source` (needed for delta refreshes) the normalized model keeps the
+# merged frame next to it, so a refresh merges into it in memory instead of
+# reading and preparing the snapshot again.
+class LiveDataset:
+    def __init__(self, df, snapshot_dir=SNAPSHOT_DIR, keep_frame=True, result_cache=None, poll_seconds=60,
+                 keep_source=True):
+        self.snapshot_dir = snapshot_dir
+        self.keep_frame = keep_frame
+        self.keep_source = keep_source
+        self.result_cache = result_cache
+        self.poll_seconds = poll_seconds
+        self.current = DatasetVersion.build(prepare_data(df), snapshot_version(snapshot_dir), keep_frame, keep_source)
+        self.error = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="refresh")
+        self._pending = None
+        self._last_poll = 0.0
+        self._lock = threading.Lock()
+
+    # Delta files in `delta_dir` that have not been applied yet, by name
+    def pending_files(self, delta_dir):
+        try:
+            names = sorted(name for name in os.listdir(delta_dir) if name.endswith(DELTA_PATTERN))
+        except OSError:
+            return []
+        applied = set(applied_deltas(self.snapshot_dir))
+        return [os.path.join(delta_dir, name) for name in names if name not in applied]
+
+    # Start a background refresh when new delta files have appeared. Checks
+    # the directory at most every `poll_seconds`; returns the pending refresh.
+    def poll(self, delta_dir):
+        with self._lock:
+            if self._pending is not None and not self._pending.done():
+                return self._pending
+            now = time.monotonic()
+            if now - self._last_poll < self.poll_seconds:
+                return None
+            self._last_poll = now
+            paths = self.pending_files(delta_dir)
+            if not paths:
+                return None
+            self._pending = self._executor.submit(self._refresh, paths)
+            return self._pending
+
+    def _refresh(self, paths):
+        try:
+            version = self.refresh(paths)
+            self.error = None
+            return version
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            raise
+
+    # Apply delta files in order, write the merged snapshot and swap in the
+    # new version. Returns the new version.
+    def refresh(self, paths):
+        previous = self.current
+        # The snapshot holds the same rows in the same order, so the previous
+        # version's structures still extend it
+        base = previous.frame if previous.frame is not None else prepare_data(read_snapshot(self.snapshot_dir))
+        df, version, affected, deltas, full = apply_deltas(base, previous.version, paths)
+        write_snapshot_deltas(df, deltas, self.snapshot_dir)
+        updated = DatasetVersion.build(df, version, self.keep_frame, self.keep_source, previous, affected, full)
+
+        if self.result_cache is not None and not full:
+            # Rows of the affected employees before and after the refresh,
+            # with their chart filter values
+            columns = [col for col in FILTER_COLUMNS if col in df.columns]
+            touched = []
+            for rows in (base, df):
+                rows = rows.loc[rows["emp_no"].isin(affected)]
+                values = rows[columns].astype(object)
+                for col in DERIVED_FILTERS:
+                    values[col] = filter_column(rows, col).astype(object)
+                touched.append(values)
+            touched = pd.concat(touched)
+            self.result_cache.copy_version(previous.version, version,
+                                           lambda key: not _selection_matches(touched, key[1]))
+        if self.result_cache is not None and updated.headcount is not None:
+            # The unfiltered time series come from the appended headcount
+            # series instead of a pass over every employee
+            for name, result in headcount_results(updated.headcount).items():
+                self.result_cache.put((version, (), name), result)
+        self.current = updated
+        return version
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Apply delta files to the snapshot, e.g. before running precompute.py
+def main():
+    parser = argparse.ArgumentParser(description="Merge delta files into the employee snapshot")
+    parser.add_argument("deltas", nargs="+", help="delta CSV files, applied in the given order")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    applied = set(applied_deltas(args.snapshot_dir))
+    paths = [path for path in args.deltas if os.path.basename(path) not in applied]
+    if not paths:
+        print("All delta files are already applied")
+        return
+    df = prepare_data(read_snapshot(args.snapshot_dir))
+    df, version, _, deltas, _ = apply_deltas(df, snapshot_version(args.snapshot_dir), paths)
+    write_snapshot_deltas(df, deltas, args.snapshot_dir)
+    print(f"Applied {len(paths)} delta files in {time.perf_counter() - start:.1f}s; snapshot version {version[:12]}")
+
+
+if __name__ == "__main__":
+    main()
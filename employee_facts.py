@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+from binning import RATING_LABELS, rating_scores
+
+
+# Build a one-row-per-employee aggregate table from the assignment rows in
+# `df` (which must already have the `tenure` column). Every KPI tile is
+# answered from this table, so a filter change only reduces ~one row per
+# employee instead of re-grouping the full assignment table.
+def build_employee_facts(df):
+    rating = df["Last_performance_rating"]
+    rows = pd.DataFrame({
+        "emp_no": df["emp_no"],
+        "salary": df["salary"],
+        "tenure": df["tenure"],
+        "age": (df["last_date"] - df["birth_date"]).dt.days / 365.0,
+        "no_of_projects": df["no_of_projects"],
+        "left": df["left"],
+        "sex": df["sex"],
+        "rating_score": rating_scores(rating).fillna(0),
+        "rating_known": rating.notna().astype(np.int32),
+        "is_manager": (df["title"] == "Manager").astype(np.int8),
+    })
+    facts = rows.groupby("emp_no", sort=False, observed=True).agg(
+        n_rows=("salary", "size"),
+        salary_mean=("salary", "mean"),
+        salary_min=("salary", "min"),
+        salary_max=("salary", "max"),
+        tenure=("tenure", "mean"),
+        tenure_min=("tenure", "min"),
+        tenure_max=("tenure", "max"),
+        age=("age", "mean"),
+        projects=("no_of_projects", "mean"),
+        left=("left", "max"),
+        sex=("sex", "first"),
+        rating_score_sum=("rating_score", "sum"),
+        rating_rows=("rating_known", "sum"),
+        is_manager=("is_manager", "max"),
+    )
+
+    # Departments each employee worked in, as a bitmask over the department
+    # codes, so the department count of any employee subset is one OR-reduce
+    dept = pd.Categorical(df["dept_name"])
+    if len(dept.categories) <= 64:
+        bits = pd.DataFrame({
+            "emp_no": df["emp_no"].to_numpy(),
+            "dept_bit": np.left_shift(np.uint64(1), dept.codes.astype(np.uint64)),
+        }).loc[dept.codes >= 0].drop_duplicates()
+        facts["dept_mask"] = bits.groupby("emp_no")["dept_bit"].sum().reindex(facts.index, fill_value=0).astype(np.uint64)
+    return facts
+
+
+# Fact table with the rows of the employees in `emp_nos` rebuilt from `df`.
+# The department codes of `df` must extend those the facts were built with.
+def update_employee_facts(facts, df, emp_nos):
+    updated = build_employee_facts(df[df["emp_no"].isin(emp_nos)])
+    if ("dept_mask" in updated.columns) != ("dept_mask" in facts.columns):
+        return build_employee_facts(df)
+    return pd.concat([facts.drop(index=updated.index, errors="ignore"), updated])
+
+
+# Restrict the fact table to employees matching the employee-level filters
+def filter_employee_facts(facts, left_filter="All", gender_filter="All"):
+    mask = np.ones(len(facts), dtype=bool)
+    if left_filter == "Left":
+        mask &= facts["left"].to_numpy() == 1
+    elif left_filter == "Stayed":
+        mask &= facts["left"].to_numpy() == 0
+    if gender_filter != "All":
+        mask &= (facts["sex"] == gender_filter).to_numpy()
+    return facts if mask.all() else facts[mask]
+
+
+# Mean and median of per-employee values weighted by their number of rows,
+# which reproduces the statistics of the original assignment-row column
+def _weighted_mean(values, weights):
+    keep = ~np.isnan(values)
+    total = weights[keep].sum()
+    return (values[keep] * weights[keep]).sum() / total if total else np.nan
+
+
+def _weighted_median(values, weights):
+    keep = ~np.isnan(values)
+    values, weights = values[keep], weights[keep]
+    if not len(values):
+        return np.nan
+    order = np.argsort(values, kind="stable")
+    values, cum = values[order], np.cumsum(weights[order])
+    n = cum[-1]
+    lo = values[np.searchsorted(cum, (n - 1) // 2, side="right")]
+    hi = values[np.searchsorted(cum, n // 2, side="right")]
+    return (lo + hi) / 2
+
+
+def rating_label(score):
+    if 1 <= score < 5:
+        return RATING_LABELS[int(score) - 1]
+    return "A"
+
+
+# All 16 Key Metrics tiles from a (filtered) fact table. `df` is only needed
+# when the department bitmask could not be built (more than 64 departments).
+def compute_kpis(facts, df=None):
+    weights = facts["n_rows"].to_numpy(dtype=float)
+    tenure = facts["tenure"].to_numpy(dtype=float)
+    left = facts["left"].to_numpy() == 1
+    total = len(facts)
+    left_count = int(left.sum())
+
+    if "dept_mask" in facts.columns:
+        departments = bin(int(np.bitwise_or.reduce(facts["dept_mask"].to_numpy(), initial=np.uint64(0)))).count("1")
+    else:
+        departments = df["dept_name"].nunique()
+
+    rating_rows = facts["rating_rows"].sum()
+    average_rating = facts["rating_score_sum"].sum() / rating_rows if rating_rows else np.nan
+
+    return {
+        "total_employees": total,
+        "employees_left": left_count,
+        "employees_stayed": int((facts["left"].to_numpy() == 0).sum()),
+        "multi_department": int((facts["n_rows"].to_numpy() > 1).sum()),
+        "departments": departments,
+        "avg_salary": facts["salary_mean"].mean(),
+        "avg_tenure": _weighted_mean(tenure, weights),
+        "median_tenure": _weighted_median(tenure, weights),
+        "avg_tenure_left": _weighted_mean(tenure[left], weights[left]),
+        "tenure_min": facts["tenure_min"].min(),
+        "tenure_max": facts["tenure_max"].max(),
+        "avg_age_left": _weighted_mean(facts["age"].to_numpy(dtype=float)[left], weights[left]),
+        "avg_projects": facts["projects"].mean(),
+        "avg_rating": rating_label(average_rating),
+        "salary_min": facts["salary_min"].min(),
+        "salary_max": facts["salary_max"].max(),
+        "attrition_rate": (left_count / total) * 100.00 if total else np.nan,
+        "total_managers": int(facts["is_manager"].sum()),
+    }
@@ -0,0 +1,578 @@
+import numpy as np
+import pandas as pd
+
+from aggregations import VISUALIZATIONS
+from binning import (AGE_EDGES, PROJECT_EDGES, SALARY_EDGES, SALARY_LABELS, TENURE_EDGES, age_groups,
+                     project_categories, rating_scores, salary_ranges, tenure_groups)
+from cohorts import DIMENSIONS
+from employee_facts import _weighted_mean, _weighted_median, rating_label
+from data_loader import freeze_frame
+from filters import DERIVED_FILTERS, selection_key
+from result_cache import ResultCache
+from timeseries import HeadcountSeries, period_codes
+
+
+# Normalized in-memory model of the employee dataset. The source CSV is a
+# denormalized join with one row per department/title/salary assignment, so
+# every employee attribute is repeated on each of an employee's rows. Here
+# the data is split into
+#   - an employee table, one row per employee (attributes from their first
+#     row, plus the derived tenure), and
+#   - assignment arrays, one entry per source row: employee, department and
+#     title codes and the salary.
+# A filter selection becomes a mask over employees plus (for department and
+# title filters) over assignment rows, and the Key Metrics and charts are
+# answered with bincounts over those codes, so nothing is deduplicated per
+# query. The interface matches sql_backend.SqlBackend.
+
+EMPLOYEE_COLUMNS = ["emp_no", "birth_date", "sex", "hire_date", "no_of_projects",
+                    "Last_performance_rating", "left", "last_date"]
+
+
+def _codes(values):
+    categorical = pd.Categorical(values)
+    return categorical.codes, list(categorical.categories)
+
+
+# Distinct (code, employee) pairs of assignment rows with a known code, as
+# two arrays sorted by code and then employee. The pairs are deduplicated as
+# one int64 key each, so memory follows the number of rows rather than
+# codes x employees.
+def _distinct_pairs(codes, emp, n_employees):
+    keep = codes >= 0
+    pairs = np.unique(codes[keep].astype(np.int64) * n_employees + emp[keep])
+    return pairs // n_employees, pairs % n_employees
+
+
+# Rows and employees selected by one filter selection
+class ModelView:
+    def __init__(self, model, rows, counts):
+        self.model = model
+        # Selected assignment rows (None: every row of the selected employees)
+        self._rows = rows
+        # Number of selected rows of every employee
+        self.counts = counts
+        self.selected = counts > 0
+
+    @property
+    def rows(self):
+        if self._rows is None:
+            self._rows = np.flatnonzero(self.selected[self.model.emp])
+        return self._rows
+
+    # Codes of the selected employees, in first-appearance order
+    @property
+    def employees(self):
+        return np.flatnonzero(self.selected)
+
+    # First selected row of every selected employee (aligned with employees)
+    @property
+    def first_rows(self):
+        if self._rows is None:
+            return self.model.first_row[self.selected]
+        _, index = np.unique(self.model.emp[self.rows], return_index=True)
+        return self.rows[index]
+
+    # Number of distinct selected employees per code of a row-level column
+    def distinct_employees(self, codes, n_codes):
+        rows = self.rows
+        pair_codes, _ = _distinct_pairs(codes[rows], self.model.emp[rows], len(self.selected))
+        return np.bincount(pair_codes, minlength=n_codes)
+
+    # Employee attribute of the selected employees (a Categorical for
+    # categorical columns, otherwise a NumPy array)
+    def employee(self, col):
+        column = self.model.employees[col]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            return column.array[self.selected]
+        return column.to_numpy()[self.selected]
+
+    # Salary sum and number of known salaries of every selected employee
+    def salary_totals(self):
+        model = self.model
+        if self._rows is None:
+            return model.salary_sum[self.selected], model.salary_n[self.selected]
+        emp, salary = model.emp[self.rows], model.salary[self.rows].astype(float)
+        known = ~np.isnan(salary)
+        sums = np.bincount(emp[known], weights=salary[known], minlength=len(self.selected))
+        counts = np.bincount(emp[known], minlength=len(self.selected))
+        return sums[self.selected], counts[self.selected]
+
+    # Lowest and highest selected salary
+    def salary_range(self):
+        model = self.model
+        if self._rows is None:
+            low, high = model.salary_min[self.selected], model.salary_max[self.selected]
+        else:
+            low = high = model.salary[self.rows].astype(float)
+        if not len(low) or np.isnan(low).all():
+            return np.nan, np.nan
+        return np.nanmin(low), np.nanmax(high)
+
+    # Number of departments the selected rows belong to
+    def department_count(self):
+        model = self.model
+        if self._rows is None and model.dept_mask is not None:
+            mask = np.bitwise_or.reduce(model.dept_mask[self.selected], initial=model.dept_mask.dtype.type(0))
+            return bin(int(mask)).count("1")
+        dept = model.dept[self.rows]
+        return int((np.bincount(dept[dept >= 0], minlength=len(model.departments)) > 0).sum())
+
+    # Number of selected employees with a selected Manager row
+    def manager_count(self):
+        model = self.model
+        if self._rows is None:
+            return int(model.is_manager[self.selected].sum())
+        if "Manager" not in model.titles:
+            return 0
+        rows = self.rows
+        managers = np.zeros(len(self.selected), dtype=bool)
+        managers[model.emp[rows][model.title[rows] == model.titles.index("Manager")]] = True
+        return int(managers.sum())
+
+    # Age at exit of the selected employees, in years
+    def age(self):
+        return (pd.Series(self.employee("last_date")) - pd.Series(self.employee("birth_date"))).dt.days.to_numpy() / 365.0
+
+
+class EmployeeModel:
+    # With `previous`, the model of the data before a delta merge (whose rows
+    # are the first rows of `df`, see delta_refresh.merge_delta), only the
+    # appended rows are coded and only the employees in `emp_nos` (and new
+    # employees) are regrouped
+    def __init__(self, df, version=None, previous=None, emp_nos=None):
+        if previous is None:
+            emp, uniques = pd.factorize(df["emp_no"])
+            self.emp_nos = pd.Index(uniques)
+            self.emp = emp.astype(np.int32)
+            self.first_row = np.unique(self.emp, return_index=True)[1].astype(np.int32)
+            changed = None
+        else:
+            changed = self._extend(previous, df, emp_nos)
+        self.n_rows = np.bincount(self.emp, minlength=len(self.emp_nos)).astype(np.int32)
+
+        # Employee attributes keep the frame's compact dtypes (categoricals,
+        # downcast integers), with the derived filters computed at load
+        columns = [col for col in EMPLOYEE_COLUMNS + ["tenure"] + list(DERIVED_FILTERS) if col in df.columns]
+        self.employees = df[columns].iloc[self.first_row].reset_index(drop=True)
+
+        self.dept, self.departments = _codes(df["dept_name"])
+        self.title, self.titles = _codes(df["title"])
+        self.salary = df["salary"].to_numpy()
+        self._employee_totals(previous, changed)
+
+        # Views of the most recent selections, shared by the Key Metrics and
+        # every chart of a rerun
+        self._views = ResultCache(max_entries=8)
+
+        self.version = version if version is not None else df.attrs.get("version")
+        self.columns = list(df.columns)
+
+        # The model is shared by every session: views only read it
+        self.employees = freeze_frame(self.employees)
+        for array in self._arrays():
+            array.setflags(write=False)
+
+    # Employee codes of `df` from the previous model's: the appended rows of
+    # known employees keep their code and new employees get the next ones.
+    # Returns the mask of employees whose totals must be regrouped.
+    def _extend(self, previous, df, emp_nos):
+        n_old = len(previous.emp)
+        added = df["emp_no"].to_numpy()[n_old:]
+        codes = previous.emp_nos.get_indexer(added)
+        unknown = np.flatnonzero(codes < 0)
+        new_codes, uniques = pd.factorize(added[unknown])
+        codes[unknown] = len(previous.emp_nos) + new_codes
+        first_new = n_old + unknown[np.unique(new_codes, return_index=True)[1]]
+
+        self.emp_nos = previous.emp_nos.append(pd.Index(uniques))
+        self.emp = np.concatenate([previous.emp, codes.astype(np.int32)])
+        self.first_row = np.concatenate([previous.first_row, first_new.astype(np.int32)])
+        changed = np.zeros(len(self.emp_nos), dtype=bool)
+        known = self.emp_nos.get_indexer(pd.unique(np.asarray(emp_nos)))
+        changed[known[known >= 0]] = True
+        changed[len(previous.emp_nos):] = True
+        return changed
+
+    # Per-employee totals over all of an employee's rows, which answer the
+    # Key Metrics of selections without department/title filters. With
+    # `changed`, the totals of the other employees are taken from `previous`.
+    def _employee_totals(self, previous, changed):
+        if changed is not None and previous.departments == self.departments and previous.titles == self.titles:
+            rows = np.flatnonzero(changed[self.emp])
+            employees = np.flatnonzero(changed)
+        else:
+            rows, employees, previous = None, None, None
+        emp = self.emp if rows is None else self.emp[rows]
+        salary = pd.Series(self.salary if rows is None else self.salary[rows], dtype=float)
+        grouped = salary.groupby(emp)
+
+        # Totals of the regrouped employees, merged into the previous ones
+        def totals(name, values, dtype):
+            if previous is None:
+                return values.to_numpy().astype(dtype)
+            result = np.zeros(len(self.emp_nos), dtype=dtype)
+            result[:len(previous.emp_nos)] = getattr(previous, name)
+            result[employees] = values.reindex(employees).to_numpy()
+            return result
+
+        self.salary_sum = totals("salary_sum", grouped.sum(), float)
+        if salary.isna().any() or (previous is not None and previous.salary_n is not previous.n_rows):
+            self.salary_n = totals("salary_n", grouped.count(), np.int32)
+        else:
+            self.salary_n = self.n_rows
+        self.salary_min = totals("salary_min", grouped.min(), float).astype(self.salary.dtype)
+        self.salary_max = totals("salary_max", grouped.max(), float).astype(self.salary.dtype)
+
+        manager = self.titles.index("Manager") if "Manager" in self.titles else None
+        is_manager = np.zeros(len(self.emp_nos), dtype=bool)
+        if manager is not None:
+            title = self.title if rows is None else self.title[rows]
+            is_manager[emp[title == manager]] = True
+        self.is_manager = is_manager if previous is None else totals("is_manager", pd.Series(is_manager), bool)
+
+        # Departments of every employee as a bitmask over department codes
+        self.dept_mask = None
+        if len(self.departments) <= 64:
+            dtype = next(t for t in (np.uint8, np.uint16, np.uint32, np.uint64)
+                         if np.iinfo(t).bits >= len(self.departments))
+            dept = self.dept if rows is None else self.dept[rows]
+            bits = np.left_shift(np.uint64(1), np.maximum(dept, 0).astype(np.uint64)).astype(dtype)
+            bits[dept < 0] = 0
+            dept_mask = np.zeros(len(self.emp_nos), dtype=dtype)
+            np.bitwise_or.at(dept_mask, emp, bits)
+            if previous is None or previous.dept_mask is None:
+                self.dept_mask = dept_mask
+            else:
+                self.dept_mask = totals("dept_mask", pd.Series(dept_mask), dtype)
+
+    def _arrays(self):
+        arrays = [self.emp, self.first_row, self.n_rows, self.dept, self.title, self.salary, self.salary_sum,
+                  self.salary_min, self.salary_max, self.is_manager]
+        if self.salary_n is not self.n_rows:
+            arrays.append(self.salary_n)
+        if self.dept_mask is not None:
+            arrays.append(self.dept_mask)
+        return arrays
+
+    def nbytes(self):
+        return int(self.employees.memory_usage(deep=True).sum()) + sum(array.nbytes for array in self._arrays())
+
+    # One row per assignment with the employee attributes repeated, like the
+    # source frame, e.g. to build sketches (approximate.py) from the model
+    def frame(self):
+        df = self.employees.iloc[self.emp].reset_index(drop=True)
+        df["dept_name"] = pd.Categorical.from_codes(self.dept, self.departments)
+        df["title"] = pd.Categorical.from_codes(self.title, self.titles)
+        df["salary"] = self.salary
+        return df
+
+    # Distinct values of a filter column, for the sidebar options
+    def values(self, col):
+        if col == "dept_name":
+            return list(self.departments)
+        if col == "title":
+            return list(self.titles)
+        return sorted(self.employees[col].dropna().unique().tolist())
+
+    # Per-employee values of an employee-level filter, including the chart
+    # filters of filters.DERIVED_FILTERS
+    def employee_filter(self, col):
+        if col in self.employees.columns:
+            return self.employees[col]
+        if col == "hire_year":
+            return self.employees["hire_date"].dt.year.astype("Int64")
+        if col == "exit_year":
+            return self.employees["last_date"].dt.year.astype("Int64")
+        if col == "salary_range":
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return salary_ranges(pd.Series(np.round(self.salary_sum / self.salary_n)))
+        return self.employees[col]
+
+    def view(self, selection=None):
+        return self._views.get_or_compute(selection_key(selection or {}), lambda: self._view(selection))
+
+    def _view(self, selection):
+        selection = {col: values for col, values in (selection or {}).items()
+                     if values is not None and len(values)}
+        selected = np.ones(len(self.employees), dtype=bool)
+        for col in ("left", "sex", "hire_year", "exit_year", "salary_range"):
+            if col in selection:
+                selected &= self.employee_filter(col).isin(selection[col]).to_numpy()
+
+        row_filters = [(codes, names, selection[col]) for col, codes, names in (
+            ("dept_name", self.dept, self.departments), ("title", self.title, self.titles)) if col in selection]
+        if not row_filters:
+            return ModelView(self, None, np.where(selected, self.n_rows, 0))
+
+        mask = selected[self.emp]
+        for codes, names, values in row_filters:
+            allowed = np.zeros(len(names) + 1, dtype=bool)
+            allowed[[names.index(value) for value in values if value in names]] = True
+            mask &= allowed[codes]
+        rows = np.flatnonzero(mask)
+        return ModelView(self, rows, np.bincount(self.emp[rows], minlength=len(self.employees)))
+
+    def visualization(self, name, selection=None):
+        if name not in VISUALIZATIONS:
+            raise KeyError(f"Unknown visualization {name!r}")
+        return getattr(self, name)(self.view(selection))
+
+    # All 16 Key Metrics tiles (see employee_facts.compute_kpis)
+    def kpis(self, selection=None):
+        view = self.view(selection)
+        weights = view.counts[view.selected].astype(float)
+        left = view.employee("left") == 1
+        tenure = view.employee("tenure").astype(float)
+        total, left_count = int(view.selected.sum()), int(left.sum())
+
+        salary_sum, salary_n = view.salary_totals()
+        salary_mean = salary_sum / np.where(salary_n == 0, np.nan, salary_n)
+        salary_min, salary_max = view.salary_range()
+
+        rating = pd.Series(view.employee("Last_performance_rating"))
+        rating_known = rating.notna().to_numpy()
+        rating_rows = weights[rating_known].sum()
+        rating_sum = (rating_scores(rating).fillna(0).to_numpy() * weights).sum()
+
+        return {
+            "total_employees": total,
+            "employees_left": left_count,
+            "employees_stayed": int((view.employee("left") == 0).sum()),
+            "multi_department": int((weights > 1).sum()),
+            "departments": view.department_count(),
+            "avg_salary": np.nanmean(salary_mean) if np.any(~np.isnan(salary_mean)) else np.nan,
+            "avg_tenure": _weighted_mean(tenure, weights),
+            "median_tenure": _weighted_median(tenure, weights),
+            "avg_tenure_left": _weighted_mean(tenure[left], weights[left]),
+            "tenure_min": np.nanmin(tenure) if np.any(~np.isnan(tenure)) else np.nan,
+            "tenure_max": np.nanmax(tenure) if np.any(~np.isnan(tenure)) else np.nan,
+            "avg_age_left": _weighted_mean(view.age()[left], weights[left]),
+            "avg_projects": pd.Series(view.employee("no_of_projects"), dtype=float).mean(),
+            "avg_rating": rating_label(rating_sum / rating_rows if rating_rows else np.nan),
+            "salary_min": salary_min,
+            "salary_max": salary_max,
+            "attrition_rate": (left_count / total) * 100.00 if total else np.nan,
+            "total_managers": view.manager_count(),
+        }
+
+    # Selected employees per group of an employee-level grouping, in category
+    # order, as a frame of (column, count_name)
+    def _employee_groups(self, view, groups, column, count_name, observed):
+        counts = pd.Series(groups).value_counts(sort=False, dropna=True)
+        if observed:
+            counts = counts[counts > 0]
+        return pd.DataFrame({column: counts.index, count_name: counts.to_numpy()})
+
+    # Distinct selected employees per value of a row-level column, in
+    # category order (only the values that occur)
+    def _row_groups(self, view, codes, names, column, count_name):
+        counts = view.distinct_employees(codes, len(names))
+        present = np.flatnonzero(counts)
+        return pd.DataFrame({column: [names[i] for i in present], count_name: counts[present]})
+
+    # Hire/exit totals of the selected employees (salary from their first
+    # selected row), per period
+    def _headcount(self, view, freq):
+        employees = self.employees.iloc[view.employees]
+        salary = self.salary[view.first_rows].astype(float)
+        hire = np.array(period_codes(employees["hire_date"], freq), dtype=float)
+        leave = np.array(period_codes(employees["last_date"], freq), dtype=float)
+        leave[employees["left"].to_numpy() != 1] = np.nan
+
+        def totals(periods):
+            keep = ~np.isnan(periods)
+            frame = pd.DataFrame({"period": periods[keep].astype(np.int64), "n": 1.0,
+                                  "salary": np.nan_to_num(salary[keep])})
+            grouped = frame.groupby("period")[["n", "salary"]].sum()
+            return grouped["n"].rename_axis(None), grouped["salary"].rename_axis(None)
+
+        return HeadcountSeries.from_totals(*totals(hire), *totals(leave), freq=freq).table()
+
+    # Visualization 1: Employee Turnover by Age Group
+    def age_group_turnover(self, view, edges=AGE_EDGES):
+        left = view.employee("left") == 1
+        grouped_df = self._employee_groups(view, age_groups(view.age()[left], edges),
+                                           "age_group", "NO_OF_EMP", observed=False)
+        grouped_df["age_group"] = grouped_df["age_group"].astype(str)
+        grouped_df["PCT"] = (grouped_df["NO_OF_EMP"] * 100.00) / grouped_df["NO_OF_EMP"].sum()
+        return grouped_df
+
+    # Visualization 2: Year-wise Attrition Rate
+    def attrition_rate_trend(self, view, freq="year"):
+        result = self._headcount(view, freq).rename(columns={'period': 'year'})
+        return result[result['total_emp'] > 0]
+
+    # Visualization 3: Gender Distribution
+    def gender_distribution(self, view):
+        sex = view.employee("sex")
+        weights = view.counts[view.selected]
+        gender_counts = pd.DataFrame({
+            'gender': ['Female', 'Male'],
+            'total_no': [int(weights[sex == 'F'].sum()), int(weights[sex == 'M'].sum())]
+        })
+        gender_counts['pct'] = (gender_counts['total_no'] * 100) / gender_counts['total_no'].sum()
+        return gender_counts
+
+    # Visualization 4: Performance Rating Distribution
+    def performance_rating_distribution(self, view):
+        ratings = pd.Categorical(view.employee("Last_performance_rating"),
+                                 categories=self.values("Last_performance_rating"))
+        grouped_df = self._employee_groups(view, ratings, "Last_performance_rating", "total_emp", observed=True)
+        grouped_df["Last_performance_rating"] = grouped_df["Last_performance_rating"].astype(str)
+        grouped_df["pct"] = (grouped_df["total_emp"] * 100.0) / grouped_df["total_emp"].sum()
+        return grouped_df.sort_values(by=["total_emp", "Last_performance_rating"], ascending=[False, True])
+
+    # Visualization 5: Job Title Distribution
+    def title_distribution(self, view):
+        result = self._row_groups(view, self.title, self.titles, "title", "total_emp")
+        return result.sort_values(by=["total_emp", "title"], ascending=[False, True])
+
+    # Visualization 6: Projects Distribution
+    def project_distribution(self, view, edges=PROJECT_EDGES):
+        categories = project_categories(view.employee("no_of_projects").astype(float), edges)
+        result = self._employee_groups(view, categories.array, "project_category", "Total_emp", observed=True)
+        result["project_category"] = pd.Categorical(result["project_category"],
+                                                    categories=categories.cat.categories)
+        return result
+
+    # Visualization 7: Distribution of Employees by Tenure
+    def tenure_histogram(self, view):
+        tenure = view.employee("tenure").astype(float)
+        counts, edges = np.histogram(tenure[~np.isnan(tenure)], bins=15)
+        return {'counts': counts, 'edges': edges}
+
+    # Visualization 8: Tenure Distribution
+    def tenure_group_distribution(self, view, edges=TENURE_EDGES):
+        groups = tenure_groups(view.employee("tenure").astype(float), edges)
+        grouped_df = self._employee_groups(view, groups.array, "tenure_group", "NO_OF_EMP", observed=True)
+        grouped_df["tenure_group"] = grouped_df["tenure_group"].astype(str)
+        grouped_df["PCT"] = (grouped_df["NO_OF_EMP"] * 100.00) / grouped_df["NO_OF_EMP"].sum()
+        return grouped_df
+
+    # Visualization 9: Hiring Trend
+    def hiring_trend(self, view):
+        hire_year = pd.Series(view.employee("hire_date")).dt.year.dropna().astype(int)
+        counts = hire_year.value_counts().sort_index()
+        return pd.DataFrame({"hire_year": counts.index, "employee_count": counts.to_numpy()})
+
+    # Visualization 10: Exit Trends
+    def exit_trend(self, view):
+        exit_year = pd.Series(view.employee("last_date")).dt.year
+        weights = pd.Series(view.counts[view.selected])
+        keep = exit_year.notna()
+        counts = weights[keep].groupby(exit_year[keep].astype(int)).sum().sort_index()
+        return pd.DataFrame({"exit_year": counts.index, "total_exits": counts.to_numpy()})
+
+    # Visualization 11: Total Employees by Year
+    def total_employees_by_year(self, view, freq="year"):
+        return self._headcount(view, freq).rename(columns={'period': 'years'})
+
+    # Visualization 12: Employees by Department
+    def department_headcount(self, view):
+        result = self._row_groups(view, self.dept, self.departments, "dept_name", "total_emp")
+        return result.sort_values(by=['total_emp', 'dept_name'], ascending=[False, True]).reset_index(drop=True)
+
+    # Visualization 13: Average Salary by Department
+    def department_avg_salary(self, view):
+        rows = view.rows
+        dept, salary = self.dept[rows], self.salary[rows].astype(float)
+        keep = (dept >= 0) & ~np.isnan(salary)
+        n_dept = len(self.departments)
+        total = np.bincount(dept[keep], weights=salary[keep], minlength=n_dept)
+        count = np.bincount(dept[keep], minlength=n_dept)
+        present = np.flatnonzero(np.bincount(dept[dept >= 0], minlength=n_dept))
+        df_grouped = pd.DataFrame({
+            'dept_name': [self.departments[i] for i in present],
+            'avg_salary': total[present] / np.where(count[present] == 0, np.nan, count[present]),
+            'total_employees': count[present],
+        })
+        return df_grouped.sort_values(by=['avg_salary', 'dept_name'], ascending=[False, True])
+
+    # Visualization 14: Managers by Department
+    def managers_by_department(self, view):
+        rows = view.rows
+        dept = self.dept[rows]
+        if "Manager" in self.titles:
+            dept = dept[(self.title[rows] == self.titles.index("Manager")) & (dept >= 0)]
+        else:
+            dept = dept[:0]
+        counts = np.bincount(dept, minlength=len(self.departments))
+        present = np.flatnonzero(counts)
+        manager_counts = pd.DataFrame({'dept_name': [self.departments[i] for i in present],
+                                       'total_manager': counts[present]})
+        return manager_counts.sort_values(by=['total_manager', 'dept_name'], ascending=[False, True])
+
+    # Visualization 15: Year-wise Average Salary
+    def salary_by_year(self, view, freq="year"):
+        return self._headcount(view, freq).rename(columns={'period': 'years'})
+
+    # Visualization 16: Distribution of Employees by salary
+    def salary_histogram(self, view):
+        salary = self.salary[view.first_rows].astype(float)
+        counts, edges = np.histogram(salary[~np.isnan(salary)], bins=15)
+        return {'counts': counts, 'edges': edges}
+
+    # Visualization 17: Salary by Job Title
+    def title_avg_salary(self, view):
+        rows = view.rows
+        title, salary = self.title[rows], self.salary[rows].astype(float)
+        keep = title >= 0
+        n_titles = len(self.titles)
+        pairs, inverse = np.unique(self.emp[rows][keep].astype(np.int64) * n_titles + title[keep],
+                                   return_inverse=True)
+        salary = salary[keep]
+        known = ~np.isnan(salary)
+        pair_sum = np.bincount(inverse[known], weights=salary[known], minlength=len(pairs))
+        pair_n = np.bincount(inverse[known], minlength=len(pairs))
+        pair_mean = pair_sum / np.where(pair_n == 0, np.nan, pair_n)
+        result = pd.DataFrame({"title": pairs % n_titles, "salary": pair_mean}).groupby("title")["salary"].mean()
+        result = pd.DataFrame({"title": [self.titles[i] for i in result.index], "avg_sal": result.to_numpy()})
+        return result.sort_values(by=['avg_sal', 'title'], ascending=[False, True])
+
+    # Visualization 18: Salary by Performance Rating
+    def rating_avg_salary(self, view):
+        ratings = pd.Categorical(view.employee("Last_performance_rating"),
+                                 categories=self.values("Last_performance_rating"))
+        first = pd.DataFrame({"Last_performance_rating": ratings, "salary": self.salary[view.first_rows]})
+        result = first.groupby('Last_performance_rating', observed=True).agg(
+            avg_salary=('salary', 'mean'),
+            employee_count=('salary', 'size')
+        ).reset_index()
+        return result.sort_values(by='Last_performance_rating')
+
+    # Visualization 19: Employees by Salary Range
+    def salary_range_distribution(self, view, edges=SALARY_EDGES):
+        rows = view.rows
+        salary = self.salary[rows].astype(float)
+        known = ~np.isnan(salary)
+        total = np.bincount(self.emp[rows][known], weights=salary[known], minlength=len(self.employees))
+        count = np.bincount(self.emp[rows][known], minlength=len(self.employees))
+        selected = view.selected & (count > 0)
+        avg_salary = np.round(total[selected] / count[selected])
+        ranges = salary_ranges(avg_salary, edges)
+        counts = ranges.value_counts(sort=False, dropna=True)
+        return pd.DataFrame({"salary_range": pd.Categorical(counts.index, categories=SALARY_LABELS),
+                             "NO_OF_EMP": counts.to_numpy()})
+
+    # Spells of the cohort analysis (cohorts.py): one per selected employee
+    # and hire year, or per selected employee and department/title of their
+    # selected rows
+    def cohort_spells(self, by, selection=None):
+        if by not in DIMENSIONS:
+            raise KeyError(f"Unknown cohort dimension {by!r}; expected one of {list(DIMENSIONS)}")
+        view = self.view(selection)
+        if by == "hire_year":
+            employees = view.employees
+            cohort = self.employee_filter("hire_year").array[view.selected]
+        else:
+            codes, names = (self.dept, self.departments) if by == "dept_name" else (self.title, self.titles)
+            rows = view.rows
+            cohort_codes, employees = _distinct_pairs(codes[rows], self.emp[rows], len(self.employees))
+            cohort = pd.Categorical.from_codes(cohort_codes, names)
+        return pd.DataFrame({
+            "cohort": cohort,
+            "duration": self.employees["tenure"].to_numpy(dtype=float)[employees],
+            "event": self.employees["left"].to_numpy()[employees] == 1,
+            "n": np.ones(len(employees), dtype=np.int64),
+        })
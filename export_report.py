@@ -0,0 +1,193 @@
+import argparse
+import itertools
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import pandas as pd
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+
+from aggregations import VISUALIZATIONS
+from analytics import METRIC_TILES
+from charts import CHARTS, RENDER_DPI
+from data_loader import CHUNK_SIZE, SNAPSHOT_DIR, load_snapshot, prepare_data, read_snapshot, snapshot_version
+from employee_model import EmployeeModel
+from filters import selection_key, sidebar_selection
+from result_store import STORE_FILE, PrecomputedStore
+
+
+# Headless export of the dashboard as a report pack: for every slice of the
+# data (each department, each job title, optionally each department and
+# title pair) the 16 Key Metrics tiles and the 19 charts, as a multi-page
+# PDF and/or a folder of PNG images, plus CSV files of the Key Metrics and
+# of the aggregates behind every chart.
+#
+# The Key Metrics and chart aggregates of every slice are computed once in
+# the parent process, read from the precomputed result store (precompute.py)
+# where it covers the slice and otherwise answered by the normalized model,
+# the dashboard's default backend. Drawing and saving the charts, the slow
+# part, then runs in a process pool, one slice per task, and the workers
+# only receive the small aggregates. Charts are drawn with the
+# non-interactive Agg backend.
+
+SLICES = {"department": "dept_name", "title": "title"}
+FORMATS = ("pdf", "png")
+
+# Page size of the Key Metrics page, in inches
+KPI_PAGE = (11, 8.5)
+
+def _init_worker():
+    matplotlib.use("Agg")
+
+
+def _slug(text):
+    return re.sub(r"[^A-Za-z0-9]+", "_", str(text)).strip("_") or "all"
+
+
+# Slices of the report: (name, {kind: value}) for every value of the
+# `by` kinds ("department", "title" or "department_title")
+def report_slices(df, by=("department", "title"), overall=False):
+    values = {kind: sorted(df[col].dropna().unique().tolist()) for kind, col in SLICES.items()}
+    slices = [("All employees", {})] if overall else []
+    for kind in by:
+        if kind == "department_title":
+            slices += [(f"{dept} - {title}", {"department": dept, "title": title})
+                       for dept, title in itertools.product(values["department"], values["title"])]
+        else:
+            slices += [(str(value), {kind: value}) for value in values[kind]]
+    return slices
+
+
+def _selection(filters):
+    return sidebar_selection([filters["department"]] if "department" in filters else [], "All",
+                             [filters["title"]] if "title" in filters else [], "All")
+
+
+# Key Metrics and every chart aggregate of a selection, from the result
+# store where the precomputation covered it, otherwise from the model
+def _results(model, selection, store=None, version=None):
+    names = ["kpis"] + list(VISUALIZATIONS)
+    if store is not None:
+        key = selection_key(selection)
+        results = {name: store.get(version, key, name) for name in names}
+        if all(result is not None for result in results.values()):
+            return results
+    results = {"kpis": model.kpis(selection)}
+    results.update((name, model.visualization(name, selection)) for name in VISUALIZATIONS)
+    return results
+
+
+# The 16 tiles on one page, four per row like the dashboard
+def draw_kpi_page(kpis, title):
+    fig = Figure(figsize=KPI_PAGE)
+    fig.suptitle(f"Key Metrics - {title}", fontsize=18, fontweight="bold")
+    for i, (label, _, value) in enumerate(METRIC_TILES):
+        row, col = divmod(i, 4)
+        x, y = 0.05 + col * 0.235, 0.8 - row * 0.21
+        fig.text(x, y, label, fontsize=10, color="dimgray")
+        fig.text(x, y - 0.07, str(value(kpis)), fontsize=20, fontweight="bold")
+    return fig
+
+
+# An aggregate as long-format rows (row, column, value); the histograms
+# become one row per bin
+def aggregate_rows(result):
+    if isinstance(result, dict):
+        edges = result["edges"]
+        result = pd.DataFrame({"bin_start": edges[:-1], "bin_end": edges[1:], "count": result["counts"]})
+    frame = result.reset_index(drop=True).astype(object)
+    frame.insert(0, "row", range(len(frame)))
+    return frame.melt(id_vars="row", var_name="column", value_name="value")
+
+
+# Export one slice from its `results` (see _results); returns its Key
+# Metrics row and its aggregate rows
+def export_slice(name, filters, results, output_dir, formats=FORMATS, dpi=RENDER_DPI):
+    slug = "_".join(_slug(value) for value in filters.values()) or "all"
+    kind = "_".join(filters) or "all"
+
+    figures = [("kpis", draw_kpi_page(results["kpis"], name))]
+    for chart in VISUALIZATIONS:
+        fig = CHARTS[chart](results[chart])
+        fig.text(0.01, 0.005, name, fontsize=8, color="gray")
+        figures.append((chart, fig))
+    if "pdf" in formats:
+        with PdfPages(os.path.join(output_dir, f"{kind}_{slug}.pdf")) as pdf:
+            for _, fig in figures:
+                pdf.savefig(fig, bbox_inches="tight")
+    if "png" in formats:
+        folder = os.path.join(output_dir, f"{kind}_{slug}")
+        os.makedirs(folder, exist_ok=True)
+        for i, (chart, fig) in enumerate(figures):
+            fig.savefig(os.path.join(folder, f"{i:02d}_{chart}.png"), dpi=dpi, bbox_inches="tight")
+    for _, fig in figures:
+        fig.clear()
+
+    kpis = {"slice": name, **{key: filters.get(key) for key in SLICES}, **results["kpis"]}
+    rows = [aggregate_rows(results[chart]).assign(chart=chart) for chart in VISUALIZATIONS]
+    rows = pd.concat(rows, ignore_index=True).assign(slice=name)
+    return kpis, rows[["slice", "chart", "row", "column", "value"]]
+
+
+def _export_task(task):
+    return export_slice(*task)
+
+
+# Export every slice of `by` into `output_dir`, with `workers` processes
+# (default: one per core). `df` is the dataset as loaded by load_snapshot,
+# read from the snapshot when not given. Returns the number of slices
+# exported.
+def export_report(output_dir, snapshot_dir=SNAPSHOT_DIR, store_path=None, by=("department", "title"),
+                  overall=False, formats=FORMATS, workers=None, dpi=RENDER_DPI, df=None):
+    os.makedirs(output_dir, exist_ok=True)
+    store_path = store_path or os.path.join(snapshot_dir, STORE_FILE)
+    store = PrecomputedStore(store_path) if os.path.exists(store_path) else None
+    df = prepare_data(df if df is not None else read_snapshot(snapshot_dir))
+    slices = report_slices(df, by, overall)
+    model = EmployeeModel(df)
+    del df
+    version = snapshot_version(snapshot_dir)
+    tasks = [(name, filters, _results(model, _selection(filters), store, version), output_dir, tuple(formats), dpi)
+             for name, filters in slices]
+    del model
+    if store is not None:
+        store.close()
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks)) or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        exported = list(pool.map(_export_task, tasks))
+
+    pd.DataFrame([kpis for kpis, _ in exported]).to_csv(os.path.join(output_dir, "kpis.csv"), index=False)
+    pd.concat([rows for _, rows in exported], ignore_index=True).to_csv(
+        os.path.join(output_dir, "aggregates.csv"), index=False)
+    return len(tasks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the Key Metrics and charts of every department and title")
+    parser.add_argument("source", help="employee CSV link or path (refreshes the snapshot first)")
+    parser.add_argument("--output-dir", default="report", help="directory for the PDF/PNG files and CSVs")
+    parser.add_argument("--by", nargs="+", choices=list(SLICES) + ["department_title"], default=["department", "title"],
+                        help="slices to export (default: each department and each title)")
+    parser.add_argument("--overall", action="store_true", help="also export the whole dataset")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    parser.add_argument("--dpi", type=int, default=RENDER_DPI, help=f"resolution of the PNG images (default {RENDER_DPI})")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR)
+    parser.add_argument("--store", default=None, help=f"precomputed result store (default <snapshot-dir>/{STORE_FILE})")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = load_snapshot(args.source, snapshot_dir=args.snapshot_dir, chunksize=args.chunk_size)
+    count = export_report(args.output_dir, args.snapshot_dir, args.store, args.by, args.overall,
+                          args.formats, args.workers, args.dpi, df)
+    print(f"Exported {count} slices x ({len(METRIC_TILES)} Key Metrics + {len(VISUALIZATIONS)} charts) "
+          f"into {args.output_dir} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
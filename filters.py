@@ -0,0 +1,144 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from binning import salary_ranges
+
+
+# Columns the sidebar can filter on
+FILTER_COLUMNS = ["dept_name", "title", "left", "sex"]
+
+
+# Employee-level filters set by clicking a chart (crossfilter.py). They are
+# derived from the dataset's columns: the hire and exit year, and the salary
+# band of the employee's average salary over all of their rows (so they must
+# be computed on the full dataset, not on a filtered frame).
+def hire_years(df):
+    return df["hire_date"].dt.year.astype("Int16")
+
+
+def exit_years(df):
+    return df["last_date"].dt.year.astype("Int16")
+
+
+def salary_bands(df):
+    return salary_ranges(df.groupby("emp_no")["salary"].transform("mean").round())
+
+
+DERIVED_FILTERS = {"hire_year": hire_years, "exit_year": exit_years, "salary_range": salary_bands}
+# Columns each derived filter is computed from
+DERIVED_SOURCES = {"hire_year": ["hire_date"], "exit_year": ["last_date"], "salary_range": ["emp_no", "salary"]}
+
+
+# Add the derived filter columns to `df` once, when the dataset is loaded,
+# so filtering and the filter bitmaps read them like any other column. With
+# a boolean row mask `rows` (all rows of the employees changed by a delta)
+# only those rows are recomputed.
+def derive_filters(df, rows=None):
+    for col, derive in DERIVED_FILTERS.items():
+        if not all(source in df.columns for source in DERIVED_SOURCES[col]):
+            continue
+        if rows is None or col not in df.columns:
+            df[col] = derive(df)
+        elif rows.any():
+            values = df[col].copy()
+            values.iloc[np.flatnonzero(rows)] = derive(df.loc[rows]).array
+            df[col] = values
+    return df
+
+
+# Values of a filter column for every row of `df`
+def filter_column(df, col):
+    if col in df.columns or col not in DERIVED_FILTERS:
+        return df[col]
+    return DERIVED_FILTERS[col](df)
+
+
+# Per-value row bitmaps for the filterable columns. Each distinct value maps
+# to a packed bitmap (one bit per row), so a selection is a handful of OR/AND
+# operations over n_rows / 8 bytes, however many filters are active. The
+# bitmaps of the derived (chart) filters are built on first use.
+class FilterIndex:
+    def __init__(self, df, columns=FILTER_COLUMNS):
+        self.n_rows = len(df)
+        self.bitmaps = {}
+        for col in columns:
+            if col in df.columns:
+                self.bitmaps[col] = self._bitmaps(df[col])
+        self._df = df
+        self._lock = threading.Lock()
+
+    # Read-only, as the index is shared by every session
+    @staticmethod
+    def _bitmaps(values):
+        codes, uniques = pd.factorize(values, sort=True)
+        bitmaps = {value: np.packbits(codes == i) for i, value in enumerate(uniques.tolist())}
+        for bitmap in bitmaps.values():
+            bitmap.setflags(write=False)
+        return bitmaps
+
+    def _column(self, col):
+        if col not in self.bitmaps and col in DERIVED_FILTERS:
+            with self._lock:
+                if col not in self.bitmaps:
+                    self.bitmaps[col] = self._bitmaps(filter_column(self._df, col))
+        return self.bitmaps[col]
+
+    def values(self, col):
+        return list(self.bitmaps.get(col, {}))
+
+    # Bitmap of the rows matching `selection` ({column: allowed values});
+    # empty or missing value lists leave that column unrestricted. Returns
+    # None when nothing is restricted.
+    def bitmap(self, selection):
+        result = None
+        for col, values in selection.items():
+            if values is None or len(values) == 0:
+                continue
+            bitmaps = self._column(col)
+            union = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+            for value in values:
+                if value in bitmaps:
+                    np.bitwise_or(union, bitmaps[value], out=union)
+            if result is None:
+                result = union
+            else:
+                np.bitwise_and(result, union, out=result)
+        return result
+
+    # Integer positions of the rows matching `selection`, or None for all rows
+    def select(self, selection):
+        result = self.bitmap(selection)
+        if result is None:
+            return None
+        return np.flatnonzero(np.unpackbits(result, count=self.n_rows))
+
+
+# Translate the sidebar widgets into a {column: values} selection
+def sidebar_selection(department_name=(), left_filter="All", title_filter=(), gender_filter="All"):
+    return {
+        "dept_name": list(department_name or []),
+        "title": list(title_filter or []),
+        "left": {"Left": [1], "Stayed": [0]}.get(left_filter, []),
+        "sex": [] if gender_filter == "All" else [gender_filter],
+    }
+
+
+# Hashable, order-independent key of a selection, for caching results per
+# filter combination
+def selection_key(selection):
+    return tuple(sorted(
+        (col, tuple(sorted(str(value) for value in values)))
+        for col, values in selection.items() if values
+    ))
+
+
+# Rows of `df` matching `selection`. With no active filter the frame itself
+# is returned, otherwise a single positional take replaces the chain of
+# boolean-mask copies.
+def apply_filters(df, index, selection):
+    rows = index.select(selection)
+    if rows is None:
+        return df
+    return df.take(rows)
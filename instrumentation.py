@@ -0,0 +1,171 @@
+import contextlib
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+
+# Timing spans around the stages of a dashboard rerun. A trace is opened
+# for each rerun (or fragment rerun) and span() records a nested, timed
+# stage into the trace of the current context; with no trace open, or with
+# instrumentation disabled, span() returns a shared no-op context manager.
+#
+# Finished traces can be appended to a file as JSON lines (one span per
+# line) or in the OpenTelemetry OTLP/JSON format (one request per trace, as
+# written by the collector's file exporter).
+
+EXPORT_FORMATS = ("jsonl", "otlp")
+
+_config = {"enabled": False, "memory": False, "export_path": None, "export_format": "jsonl"}
+_current = contextvars.ContextVar("trace", default=None)
+_export_lock = threading.Lock()
+_ids = itertools.count(1)
+_noop = contextlib.nullcontext()
+
+
+def configure(enabled=False, memory=False, export_path=None, export_format="jsonl"):
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown trace export format {export_format!r}; expected one of {EXPORT_FORMATS}")
+    _config.update(enabled=bool(enabled), memory=bool(memory), export_path=export_path,
+                   export_format=export_format)
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+class Span:
+    def __init__(self, name, parent, depth, attributes):
+        self.name = name
+        self.span_id = next(_ids)
+        self.parent = parent
+        self.depth = depth
+        self.attributes = attributes
+        self.thread = threading.current_thread().name
+        self.start_ns = time.time_ns()
+        self.duration_ns = None
+        self.memory_delta = None
+        self.error = None
+
+    def as_dict(self):
+        return {"span_id": self.span_id, "parent_id": self.parent, "name": self.name, "depth": self.depth,
+                "start_ns": self.start_ns, "duration_ms": self.duration_ns / 1e6, "memory_delta": self.memory_delta,
+                "thread": self.thread, "error": self.error, "attributes": self.attributes}
+
+
+# Spans of one rerun
+class Trace:
+    def __init__(self, name):
+        self.name = name
+        self.trace_id = os.urandom(16).hex()
+        self.spans = []
+        self._lock = threading.Lock()
+        self._stack = threading.local()
+
+    @contextlib.contextmanager
+    def span(self, name, **attributes):
+        stack = self._stack.__dict__.setdefault("spans", [])
+        record = Span(name, stack[-1].span_id if stack else None, len(stack), attributes)
+        memory = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        stack.append(record)
+        start = time.perf_counter_ns()
+        try:
+            yield record
+        except BaseException as e:
+            record.error = type(e).__name__
+            raise
+        finally:
+            record.duration_ns = time.perf_counter_ns() - start
+            if memory is not None:
+                record.memory_delta = tracemalloc.get_traced_memory()[0] - memory
+            stack.pop()
+            with self._lock:
+                self.spans.append(record)
+
+    # Finished spans in start order
+    def records(self):
+        with self._lock:
+            return sorted(self.spans, key=lambda record: (record.start_ns, record.depth))
+
+
+# Trace open in this context, if any
+def current_trace():
+    return _current.get()
+
+
+# Record a stage of the current trace
+def span(name, **attributes):
+    trace = _current.get()
+    if trace is None:
+        return _noop
+    return trace.span(name, **attributes)
+
+
+# Open a trace for this context, or a span when one is already open. Yields
+# the trace (None when instrumentation is disabled); a trace opened here is
+# exported when the block ends.
+@contextlib.contextmanager
+def trace(name, **attributes):
+    active = _current.get()
+    if active is not None:
+        with active.span(name, **attributes):
+            yield active
+        return
+    if not _config["enabled"]:
+        yield None
+        return
+    opened = Trace(name)
+    token = _current.set(opened)
+    try:
+        with opened.span(name, **attributes):
+            yield opened
+    finally:
+        _current.reset(token)
+        if _config["export_path"]:
+            export(opened, _config["export_path"], _config["export_format"])
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(trace, record):
+    attributes = {**record.attributes, "thread.name": record.thread}
+    if record.memory_delta is not None:
+        attributes["memory.delta_bytes"] = record.memory_delta
+    span = {
+        "traceId": trace.trace_id,
+        "spanId": f"{record.span_id:016x}",
+        "name": record.name,
+        "kind": 1,
+        "startTimeUnixNano": str(record.start_ns),
+        "endTimeUnixNano": str(record.start_ns + record.duration_ns),
+        "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()],
+        "status": {"code": 2, "message": record.error} if record.error else {},
+    }
+    if record.parent is not None:
+        span["parentSpanId"] = f"{record.parent:016x}"
+    return span
+
+
+# Append the spans of `trace` to `path`
+def export(trace, path, fmt="jsonl"):
+    records = trace.records()
+    if fmt == "otlp":
+        lines = [json.dumps({"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "employee-dashboard"}}]},
+            "scopeSpans": [{"scope": {"name": "instrumentation"},
+                            "spans": [_otlp_span(trace, record) for record in records]}],
+        }]})]
+    else:
+        lines = [json.dumps({"trace_id": trace.trace_id, "trace": trace.name, **record.as_dict()}, default=str)
+                 for record in records]
+    with _export_lock, open(path, "a", encoding="utf-8") as f:
+        f.writelines(line + "\n" for line in lines)
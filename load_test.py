@@ -0,0 +1,276 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+from synthetic_data import generate_employees, write_csv
+
+
+# Load test of the dashboard with many concurrent sessions, on a single
+# machine and without network access. Every simulated user drives the app
+# script headlessly through Streamlit's AppTest: they log in, then apply
+# random sidebar filter combinations and switch between the sections.
+# All sessions run in this process, like the sessions of one Streamlit
+# server, so they share its cached dataset and results. The latency of
+# every rerun, the throughput and the memory of the process are reported
+# for synthetic datasets of each requested size.
+
+APP_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "new_Visual.py")
+
+DEFAULT_SIZES = [10_000, 100_000]
+DEFAULT_USERNAME = "adminSaheli"
+DEFAULT_PASSWORD = "25@das20"
+
+# Relative weights of the actions a user takes after logging in
+ACTIONS = {"filter": 3, "section": 2}
+
+STATUSES = ["All", "Left", "Stayed"]
+GENDERS = ["All", "M", "F"]
+
+
+# Resident memory of this process in MB (Linux)
+def _rss_mb():
+    with open("/proc/self/status", encoding="ascii") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def _widget(widgets, label):
+    return next(widget for widget in widgets if widget.label == label)
+
+
+# Make `secrets` the app's settings for every session. AppTest would swap
+# its own secrets in and out around each run, which races when sessions run
+# concurrently (and with the app's background threads).
+def _use_secrets(secrets):
+    import streamlit as st
+    from streamlit.runtime.secrets import Secrets
+
+    app_secrets = Secrets()
+    app_secrets._secrets = secrets
+    st.secrets = app_secrets
+
+
+# Errors shown by the app (exceptions and st.error) after a run
+def _errors(at):
+    return [str(e.value) for e in at.exception] + [str(e.value) for e in at.error]
+
+
+# One simulated user: an AppTest session timing each of its reruns
+class Session:
+    def __init__(self, number, seed, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.number = number
+        self.rng = random.Random(seed)
+        self.at = AppTest.from_file(APP_SCRIPT, default_timeout=timeout)
+        self.reruns = []
+        self.errors = []
+
+    def _timed(self, action, run):
+        start = time.perf_counter()
+        run()
+        seconds = time.perf_counter() - start
+        errors = _errors(self.at)
+        self.reruns.append({"session": self.number, "action": action, "seconds": seconds, "ok": not errors})
+        self.errors.extend(errors)
+
+    def login(self, username, password):
+        self._timed("open", self.at.run)
+        _widget(self.at.sidebar.text_input, "Username").input(username)
+        _widget(self.at.sidebar.text_input, "Password").input(password)
+        self._timed("login", _widget(self.at.sidebar.button, "Login").click().run)
+        if not self.at.session_state["logged_in"]:
+            raise RuntimeError(f"Session {self.number} could not log in")
+
+    # A random combination of the four sidebar filters
+    def apply_filters(self):
+        sidebar = self.at.sidebar
+        for label in ("Department Name", "Job Title"):
+            widget = _widget(sidebar.multiselect, label)
+            options = list(widget.options)
+            widget.set_value(self.rng.sample(options, self.rng.randint(0, min(3, len(options)))))
+        _widget(sidebar.selectbox, "Employee Status").set_value(self.rng.choice(STATUSES))
+        _widget(sidebar.selectbox, "Gender").set_value(self.rng.choice(GENDERS))
+        self._timed("filter", self.at.run)
+
+    # Switch to another section through the lazy-section selector. With
+    # `lazy_sections` off there is no selector (every tab is drawn on each
+    # run), so the action is a plain rerun and reported as such.
+    def switch_section(self):
+        radio = next((widget for widget in self.at.radio if widget.label == "Section"), None)
+        if radio is None:
+            self._timed("rerun", self.at.run)
+            return
+        radio.set_value(self.rng.choice([title for title in radio.options if title != radio.value]))
+        self._timed("section", self.at.run)
+
+    def act(self):
+        action = self.rng.choices(list(ACTIONS), weights=list(ACTIONS.values()))[0]
+        if action == "filter":
+            self.apply_filters()
+        else:
+            self.switch_section()
+
+
+def _percentiles(seconds):
+    if not seconds:
+        return {}
+    values = np.percentile(np.asarray(seconds) * 1000, [50, 95, 99])
+    return {"p50_ms": round(values[0], 1), "p95_ms": round(values[1], 1), "p99_ms": round(values[2], 1),
+            "max_ms": round(max(seconds) * 1000, 1), "reruns": len(seconds)}
+
+
+# Load test of one dataset size: `sessions` users, `concurrency` of them
+# active at a time, each taking `actions` actions after logging in with
+# `think_seconds` (at most) between them
+def load_test_size(n_rows, workdir, sessions=20, concurrency=10, actions=10, think_seconds=0.0, seed=0,
+                   timeout=300, username=DEFAULT_USERNAME, password=DEFAULT_PASSWORD, secrets=None):
+    import streamlit as st
+
+    csv_path = os.path.join(workdir, f"employees_{n_rows}.csv")
+    write_csv(generate_employees(n_rows, seed=seed), csv_path)
+    # Sections are switched through the lazy-section selector, unless the
+    # settings turn lazy sections off
+    secrets = {"google_drive_link": "file://" + csv_path,
+               "snapshot_dir": os.path.join(workdir, f"snapshot_{n_rows}"),
+               "lazy_sections": True,
+               **(secrets or {})}
+
+    _use_secrets(secrets)
+    # Start from empty caches, so each size loads its own dataset
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    gc.collect()
+    rss_start = _rss_mb()
+
+    # The first session loads the dataset; its time is reported apart
+    warmup = Session(-1, seed, timeout)
+    warmup.login(username, password)
+    gc.collect()
+    rss_loaded = _rss_mb()
+
+    peak = [rss_loaded]
+    lock = threading.Lock()
+
+    def run_session(number):
+        session = Session(number, seed * 100_003 + number, timeout)
+        try:
+            session.login(username, password)
+            for _ in range(actions):
+                if think_seconds:
+                    time.sleep(session.rng.uniform(0, think_seconds))
+                session.act()
+        except Exception as e:
+            session.errors.append(f"{type(e).__name__}: {e}")
+        with lock:
+            peak[0] = max(peak[0], _rss_mb())
+        return session
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="session") as executor:
+        finished = list(executor.map(run_session, range(sessions)))
+    wall = time.perf_counter() - start
+    rss_end = _rss_mb()
+    peak[0] = max(peak[0], rss_end)
+
+    reruns = [rerun for session in finished for rerun in session.reruns]
+    errors = [error for session in finished for error in session.errors]
+    by_action = {action: _percentiles([r["seconds"] for r in reruns if r["action"] == action])
+                 for action in ["open", "login", "rerun"] + list(ACTIONS)}
+    dashboard = [r["seconds"] for r in reruns if r["action"] != "open"]
+    return {
+        "rows": n_rows,
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "actions_per_session": actions,
+        "load_seconds": round(sum(r["seconds"] for r in warmup.reruns), 3),
+        "wall_seconds": round(wall, 3),
+        "throughput_reruns_per_s": round(len(reruns) / wall, 2) if wall else None,
+        "latency": _percentiles(dashboard),
+        "latency_by_action": {action: stats for action, stats in by_action.items() if stats},
+        "failed_reruns": sum(not r["ok"] for r in reruns),
+        "errors": sorted(set(errors))[:20],
+        "memory": {
+            "start_rss_mb": round(rss_start, 1),
+            "loaded_rss_mb": round(rss_loaded, 1),
+            "end_rss_mb": round(rss_end, 1),
+            "peak_rss_mb": round(peak[0], 1),
+            # Memory the sessions added on top of the loaded dataset, averaged
+            # over the sessions (resident memory is per process)
+            "avg_per_session_mb": round((rss_end - rss_loaded) / sessions, 3) if sessions else None,
+        },
+    }
+
+
+def _secret(text):
+    key, _, value = text.partition("=")
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the dashboard with concurrent simulated sessions")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="dataset sizes in rows (default: 10k 100k)")
+    parser.add_argument("--sessions", type=int, default=20, help="simulated users per size")
+    parser.add_argument("--concurrency", type=int, default=10, help="users active at the same time")
+    parser.add_argument("--actions", type=int, default=10, help="filter changes and section switches per user")
+    parser.add_argument("--think-seconds", type=float, default=0.0, help="longest pause between a user's actions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300, help="longest rerun in seconds")
+    parser.add_argument("--username", default=DEFAULT_USERNAME)
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--secret", action="append", default=[], metavar="KEY=VALUE",
+                        help="app setting, e.g. data_model=\"frame\" or chart_workers=4 (values are JSON)")
+    parser.add_argument("--output", default="load_test_output.json", help="JSON results file")
+    args = parser.parse_args()
+
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "settings": dict(_secret(text) for text in args.secret),
+        "sizes": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_rows in args.sizes:
+            print(f"Load testing {n_rows:,} rows with {args.sessions} sessions "
+                  f"({args.concurrency} concurrent)...", flush=True)
+            result = load_test_size(n_rows, workdir, sessions=args.sessions, concurrency=args.concurrency,
+                                    actions=args.actions, think_seconds=args.think_seconds, seed=args.seed,
+                                    timeout=args.timeout, username=args.username, password=args.password,
+                                    secrets=results["settings"])
+            results["sizes"][str(n_rows)] = result
+            latency, memory = result["latency"], result["memory"]
+            print(f"  load {result['load_seconds']:.1f} s, {result['throughput_reruns_per_s']} reruns/s, "
+                  f"p50 {latency.get('p50_ms')} ms, p95 {latency.get('p95_ms')} ms, p99 {latency.get('p99_ms')} ms")
+            for action, stats in result["latency_by_action"].items():
+                print(f"  {action:<10} {stats['reruns']:6d} reruns  p50 {stats['p50_ms']:9.1f} ms  "
+                      f"p95 {stats['p95_ms']:9.1f} ms  p99 {stats['p99_ms']:9.1f} ms")
+            print(f"  memory: {memory['loaded_rss_mb']:.0f} MB loaded, {memory['peak_rss_mb']:.0f} MB peak, "
+                  f"{memory['avg_per_session_mb']:.2f} MB per session on average")
+            if result["failed_reruns"]:
+                print(f"  {result['failed_reruns']} reruns failed, e.g. {result['errors'][0]}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
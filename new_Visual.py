@@ -1,12 +1,31 @@
-import altair as alt
+import os
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import requests
+import numpy as np
+import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from datetime import datetime
 
+from analytics import METRIC_TILES, selection_kpis
+from aggregations import VISUALIZATIONS
+from approximate import APPROXIMATE_VISUALIZATIONS, SketchBuilds
+from cohorts import (DIMENSIONS, cohort_spells, cohort_summary, cohort_view, largest_cohorts, retention_matrix,
+                     survival_curves)
+from crossfilter import CROSS_FILTERS, picked_values, update_cross, view_selection
+from instrumentation import configure as configure_instrumentation, current_trace, span, trace
+from filters import apply_filters, selection_key, sidebar_selection
+from result_cache import ResultCache, figure_key
+from result_store import STORE_FILE, PrecomputedStore
+from sql_backend import SqlBackend
+from delta_refresh import LiveDataset
+from data_loader import CHUNK_SIZE, SNAPSHOT_DIR, load_snapshot, snapshot_preview, snapshot_version
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Plotting modules (altair, matplotlib/seaborn through charts.py) are only
+# imported once they are needed, after login or by the boot warm-up, so the
+# login page does not wait for them
+
 
 # Page configuration
 st.set_page_config(layout="wide")
@@ -51,30 +70,292 @@ st.markdown(
     """,
     unsafe_allow_html=True,
 )
-# Function to load data from a public Google Drive link
+# Function to load data from a public Google Drive link. Outside a script
+# run (the boot warm-up) nothing is drawn and errors go to the log.
 def load_data_from_google_drive(public_link):
+    interactive = get_script_run_ctx() is not None
     try:
-        # Fetch the file content for debugging
-        response = requests.get(public_link)
-        content = response.text
+        snapshot_dir = st.secrets.get("snapshot_dir", SNAPSHOT_DIR)
+        progress_bar = st.progress(0.0, text="Loading employee data...") if interactive else None
+
+        def report_progress(bytes_read, total, rows):
+            if progress_bar is None:
+                return
+            fraction = min(bytes_read / total, 1.0) if total else 0.0
+            progress_bar.progress(fraction, text=f"Loading employee data... {rows:,} rows")
+
+        # Stream the source once into the chunked parser, or reuse the typed
+        # columnar snapshot when the source has not changed
+        df = load_snapshot(public_link, snapshot_dir=snapshot_dir,
+                           chunksize=st.secrets.get("chunk_size", CHUNK_SIZE),
+                           max_memory_mb=st.secrets.get("max_memory_mb"),
+                           progress=report_progress)
+        df.attrs["version"] = snapshot_version(snapshot_dir)
+        if not interactive:
+            return df
+        progress_bar.empty()
 
         # Print the first few lines for inspection
         st.write("First 5 lines of the file:")
-        st.code(content.splitlines()[:5])
+        st.code(snapshot_preview(snapshot_dir))
 
-        # Load the data into a DataFrame
-        df = pd.read_csv(public_link, encoding="utf-8")
         return df
     except Exception as e:
+        if not interactive:
+            traceback.print_exc()
         st.error(f"Error loading data from Google Drive: {e}")
         return None
 
-# Cache the data to improve performance
-@st.cache_data
-def load_data():
+# Aggregation results shared by all sessions, keyed on dataset version and
+# filter selection
+@st.cache_resource
+def load_result_cache():
+    return ResultCache(max_entries=st.secrets.get("result_cache_size", 512))
+
+# Results of the batch precomputation (precompute.py), if it has been run
+@st.cache_resource
+def load_precomputed_store():
+    path = st.secrets.get("precomputed_store")
+    if path is None:
+        path = os.path.join(st.secrets.get("snapshot_dir", SNAPSHOT_DIR), STORE_FILE)
+    return PrecomputedStore(path)
+
+# Encoded chart images shared by all sessions, bounded in entries and bytes
+@st.cache_resource
+def load_figure_cache():
+    return ResultCache(max_entries=st.secrets.get("figure_cache_size", 1024),
+                       max_bytes=st.secrets.get("figure_cache_mb", 256) * 1024 * 1024)
+
+# Background workers that prefetch the sections next to the one on screen
+@st.cache_resource
+def load_prefetch_executor():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+
+# Sketches of the dataset versions for the approximate mode (approximate.py)
+@st.cache_resource
+def load_sketch_builds():
+    return SketchBuilds()
+
+# SQL data source (sql_backend.py), when `sql_database` is set
+@st.cache_resource
+def load_sql_backend():
+    path = st.secrets.get("sql_database")
+    if not path:
+        return None
+    return SqlBackend.open(path, st.secrets.get("sql_engine"))
+
+# The dataset, loaded once per process and shared by every session
+# (delta_refresh.py). Each version holds the normalized model
+# (employee_model.py), or with `data_model` "frame" the frame with its filter
+# row bitmaps and per-employee fact table. Delta files dropped into
+# `delta_dir` are merged in the background and the new version swapped in;
+# only then does the normalized model keep the merged frame they start from.
+@st.cache_resource
+def load_dataset():
     # Fetch the Google Drive link from Streamlit secrets
-    public_link = st.secrets["google_drive_link"]
-    return load_data_from_google_drive(public_link)
+    df = load_data_from_google_drive(st.secrets["google_drive_link"])
+    if df is None:
+        return None
+    return LiveDataset(df, snapshot_dir=st.secrets.get("snapshot_dir", SNAPSHOT_DIR),
+                       keep_frame=st.secrets.get("data_model", "normalized") == "frame",
+                       result_cache=load_result_cache(),
+                       poll_seconds=st.secrets.get("delta_poll_seconds", 60),
+                       keep_source=bool(st.secrets.get("delta_dir")))
+
+# Worker pool that aggregates and renders the charts of a section in
+# parallel, when `chart_workers` is set
+@st.cache_resource
+def load_chart_pool():
+    workers = int(st.secrets.get("chart_workers", 0))
+    if not workers:
+        return None
+    from chart_pool import ChartPool
+    return ChartPool(workers, st.secrets.get("chart_executor", "process"))
+
+# Dashboard sections: (tab title, header, visualizations in display order)
+SECTIONS = [
+    ("1. Age Group & Year-wise Attrition Analysis", "Age Group & Year-wise Attrition Analysis", [
+        "age_group_turnover",           # Visualization 1: Employee Turnover by Age Group
+        "attrition_rate_trend",         # Visualization 2: Year-wise Attrition Rate
+    ]),
+    ("2. Employee Analysis", "Employee Analysis", [
+        "gender_distribution",          # Visualization 3: Gender Distribution
+        "performance_rating_distribution",  # Visualization 4: Performance Rating Distribution
+        "title_distribution",           # Visualization 5: Job Title Distribution
+        "project_distribution",         # Visualization 6: Projects Distribution
+        "tenure_histogram",             # Visualization 7: Distribution of Employees by Tenure
+        "tenure_group_distribution",    # Visualization 8: Tenure Distribution
+        "hiring_trend",                 # Visualization 9: Hiring Trend
+        "exit_trend",                   # Visualization 10: Exit Trends
+        "total_employees_by_year",      # Visualization 11: Total Employees by Year
+    ]),
+    ("3. Department Level Analysis", "Department Level Analysis", [
+        "department_headcount",         # Visualization 12: Employees by Department
+        "department_avg_salary",        # Visualization 13: Average Salary by Department
+        "managers_by_department",       # Visualization 14: Managers by Department
+    ]),
+    ("4. Salary Analysis", "Salary Analysis", [
+        "salary_by_year",               # Visualization 15: Year-wise Average Salary
+        "salary_histogram",             # Visualization 16: Distribution of Employees by salary
+        "title_avg_salary",             # Visualization 17: Salary by Job Title
+        "rating_avg_salary",            # Visualization 18: Salary by Performance Rating
+        "salary_range_distribution",    # Visualization 19: Employees by Salary Range
+    ]),
+    # Drawn by show_cohorts: cohort survival curves, retention matrix and summary
+    ("5. Cohort & Survival Analysis", "Cohort & Survival Analysis", []),
+]
+COHORT_SECTION = 4
+
+# Columns a visualization needs, and the warning shown when they are missing
+CHART_REQUIREMENTS = {
+    "attrition_rate_trend": (['hire_date', 'last_date', 'left'],
+                             "Required columns (hire_date, last_date, left) not available for attrition analysis"),
+    "exit_trend": (['last_date'], None),
+    "total_employees_by_year": (['hire_date', 'last_date'], None),
+    "salary_by_year": (['hire_date', 'last_date', 'salary'],
+                       "Required columns (hire_date, last_date, salary) not available"),
+    "cohorts": (['hire_date', 'last_date', 'left', 'tenure'],
+                "Required columns (hire_date, last_date, left) not available for cohort analysis"),
+}
+
+# Charts drawn in the browser from a Vega-Lite spec (vega_charts.py) instead
+# of a server-rendered image: `chart_backend` for all charts, overridden per
+# chart in the `chart_backends` table. The source charts of the chart filters
+# are drawn with Vega-Lite unless set otherwise there.
+def chart_backend(name):
+    chart_backends = dict(st.secrets.get("chart_backends", {}))
+    if st.secrets.get("cross_filtering", True) and name in CROSS_FILTERS:
+        return chart_backends.get(name, "altair")
+    return chart_backends.get(name, st.secrets.get("chart_backend", "matplotlib"))
+
+# Payload limits of a Vega-Lite chart: (rows, bytes)
+def spec_limits():
+    from vega_charts import MAX_BYTES, MAX_ROWS
+    return (int(st.secrets.get("altair_max_rows", MAX_ROWS)),
+            int(st.secrets.get("altair_max_kb", MAX_BYTES // 1024)) * 1024)
+
+# Boot warm-up: load the dataset and put the unfiltered Key Metrics and the
+# charts of the first section (of every section without `lazy_sections`)
+# into the shared caches, under the keys the dashboard looks them up with,
+# so the first view after login is served from them. Also imports the
+# plotting modules.
+def warm_caches():
+    try:
+        from charts import render_chart
+        from vega_charts import render_spec
+
+        backend = load_sql_backend()
+        dataset = None
+        if backend is None:
+            live = load_dataset()
+            if live is None:
+                return
+            dataset = live.current
+            backend = dataset.model
+        df = dataset.df if dataset is not None else None
+        version = backend.version if backend is not None else df.attrs.get("version")
+        selection = sidebar_selection()
+        key = selection_key(selection)
+        result_cache = load_result_cache()
+        precomputed = load_precomputed_store()
+
+        def cached_result(name, compute):
+            def compute_result():
+                result = precomputed.get(version, key, name)
+                return result if result is not None else compute()
+            return result_cache.get_or_compute((version, key, name), compute_result)
+
+        if backend is not None:
+            cached_result("kpis", lambda: backend.kpis(selection))
+        else:
+            cached_result("kpis", lambda: selection_kpis(df, selection, dataset.facts))
+
+        figure_cache = load_figure_cache()
+        columns = backend.columns if backend is not None else df.columns
+        sections = SECTIONS[:1] if st.secrets.get("lazy_sections", True) else SECTIONS
+        for _, _, names in sections:
+            for name in names:
+                required, _ = CHART_REQUIREMENTS.get(name, ([], None))
+                if not all(col in columns for col in required):
+                    continue
+                if backend is not None:
+                    result = cached_result(name, lambda: backend.visualization(name, selection))
+                else:
+                    result = cached_result(name, lambda: VISUALIZATIONS[name](df))
+                if chart_backend(name) == "altair":
+                    render_spec(name, result, figure_cache, *spec_limits())
+                else:
+                    render_chart(name, result, figure_cache, theme=st.secrets.get("chart_theme"),
+                                 fmt=st.secrets.get("chart_format", "png"))
+    except Exception:
+        traceback.print_exc()
+
+# Started by the first script run of the server process (`warm_start`,
+# default true), in the background while the login page is shown
+@st.cache_resource
+def start_warmup():
+    thread = threading.Thread(target=warm_caches, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+# Rerun timing (instrumentation.py): spans are recorded when
+# `instrumentation` is set, optionally with memory deltas and appended to
+# `trace_file`
+configure_instrumentation(st.secrets.get("instrumentation", False),
+                          memory=st.secrets.get("instrumentation_memory", False),
+                          export_path=st.secrets.get("trace_file"),
+                          export_format=st.secrets.get("trace_format", "jsonl"))
+
+def is_admin():
+    return st.session_state.get("username") in st.secrets.get("admin_users", ["adminSaheli"])
+
+# Chart filters (crossfilter.py): the sidebar label of each filter column
+CROSS_LABELS = {"dept_name": "Department", "hire_year": "Hire year", "exit_year": "Exit year",
+                "salary_range": "Salary range (all-time average)"}
+
+def cross_key(name):
+    return f"cross_{name}_{st.session_state.get('cross_generation', 0)}"
+
+# Click on a source chart: replace its chart filter with the picked values
+def pick_chart(name):
+    from vega_charts import PICK
+    points = st.session_state[cross_key(name)]["selection"].get(PICK, [])
+    st.session_state["cross_filters"] = update_cross(st.session_state.get("cross_filters"), name,
+                                                     picked_values(name, points))
+    st.session_state["cross_changed"] = True
+
+# New widget keys, so the charts drop their selections too
+def clear_cross_filters():
+    st.session_state["cross_filters"] = {}
+    st.session_state["cross_generation"] = st.session_state.get("cross_generation", 0) + 1
+
+# Waterfall of the spans of a trace: one bar per span from its start to its
+# end, indented by nesting depth
+def show_timing(trace):
+    import altair as alt
+    records = trace.records()
+    if not records:
+        return
+    origin = records[0].start_ns
+    spans = pd.DataFrame({
+        "span": [f"{i:03d} " + "· " * r.depth + r.name + "".join(f" {v}" for v in r.attributes.values())
+                 for i, r in enumerate(records)],
+        "start_ms": [(r.start_ns - origin) / 1e6 for r in records],
+        "end_ms": [(r.start_ns - origin + r.duration_ns) / 1e6 for r in records],
+        "duration_ms": [r.duration_ns / 1e6 for r in records],
+        "memory_kb": [r.memory_delta / 1024 if r.memory_delta is not None else None for r in records],
+    })
+    st.caption(f"{trace.name}: {records[0].duration_ns / 1e6:,.0f} ms, {len(records)} spans")
+    waterfall = alt.Chart(spans).mark_bar().encode(
+        x=alt.X("start_ms", title="ms"), x2="end_ms",
+        y=alt.Y("span", sort=None, title=None, axis=alt.Axis(labelLimit=300)),
+        tooltip=["span", "duration_ms", "memory_kb"],
+    ).properties(height=max(len(spans) * 14, 60))
+    st.altair_chart(waterfall, width="stretch")
+    st.dataframe(spans.drop(columns="end_ms"), hide_index=True)
+
+if st.secrets.get("warm_start", True):
+    start_warmup()
 
 # Sidebar Login
 if "logged_in" not in st.session_state:
@@ -88,6 +369,7 @@ if not st.session_state["logged_in"]:
     if st.sidebar.button("Login"):
         if username == "adminSaheli" and password == "25@das20":
             st.session_state["logged_in"] = True
+            st.session_state["username"] = username
             st.sidebar.success("✅ Logged in successfully!")
             st.rerun()
         else:
@@ -102,548 +384,400 @@ if st.session_state["logged_in"]:
 
         # Streamlit App
         def main():
+            # Usually imported by the boot warm-up already
+            from charts import render_chart
+            from vega_charts import PICK, render_spec
+
             st.title("📊 Employee Data Visualization Dashboard")
             st.markdown("Welcome to the interactive employee data visualization dashboard! Use the sidebar filters to explore the data.")
         
-            # Load data
-            df = load_data()
-        
-            if df is not None:
-                # Data preprocessing
-                if "hire_date" in df.columns:
-                    df["hire_date"] = pd.to_datetime(df["hire_date"], errors='coerce')
-                if "last_date" in df.columns:
-                    df["last_date"] = pd.to_datetime(df["last_date"], errors='coerce')
-                if "birth_date" in df.columns:
-                    df["birth_date"] = pd.to_datetime(df["birth_date"], errors='coerce')
-        
-                # Calculate tenure
-                max_last_date = df['last_date'].max() 
-                if "hire_date" in df.columns and "last_date" in df.columns:
-                    df["tenure"] = ((df['last_date'].fillna(max_last_date) - df['hire_date']).dt.days / 365.0)
-        
+            # Load data: with a SQL database configured, filters and aggregations
+            # run as queries there and no frame is loaded into the app. Otherwise
+            # they run on the normalized employee model, or on the frame itself
+            # when `data_model` is "frame". The version is read once, so a
+            # refresh finishing mid-rerun does not mix two versions.
+            with span("load"):
+                backend = load_sql_backend()
+                dataset = None
+                if backend is None:
+                    live = load_dataset()
+                    if live is not None:
+                        if st.secrets.get("delta_dir"):
+                            live.poll(st.secrets["delta_dir"])
+                        if live.error:
+                            st.sidebar.warning(f"Data refresh failed: {live.error}")
+                        dataset = live.current
+                        backend = dataset.model
+                df = dataset.df if dataset is not None else None
+
+            # Approximate mode: on datasets of at least `approximate_min_rows`
+            # rows, the Key Metrics and Visualizations 7 and 16 are answered from
+            # sketches (with error bounds) until the exact results, computed in
+            # the background, are ready
+            sketches = None
+            st.session_state["exact_pending"] = []
+            if dataset is not None and st.secrets.get("approximate", False):
+                n_rows = len(df) if df is not None else len(dataset.model.emp)
+                if n_rows >= int(st.secrets.get("approximate_min_rows", 1_000_000)):
+                    sketches = load_sketch_builds().get(
+                        dataset.version, lambda: df if df is not None else dataset.model.frame())
+        
+            if backend is not None or df is not None:
+                full_df = df
+
+                def filter_values(col):
+                    return backend.values(col) if backend is not None else df[col].unique()
+
                 # Sidebar filters
                 st.sidebar.header("🔍 Filters")
-                department_name = st.sidebar.multiselect("Department Name", df["dept_name"].unique())
+                department_name = st.sidebar.multiselect("Department Name", filter_values("dept_name"))
                 left_filter = st.sidebar.selectbox("Employee Status", ["All", "Left", "Stayed"])
-                title_filter = st.sidebar.multiselect("Job Title", df["title"].unique())
+                title_filter = st.sidebar.multiselect("Job Title", filter_values("title"))
                 gender_filter = st.sidebar.selectbox("Gender", ["All", "M", "F"])
                
         
-                # Apply filters
-                if department_name:
-                    df = df[df["dept_name"].isin(department_name)]
-                if left_filter == "Left":
-                    df = df[df["left"] == 1]
-                elif left_filter == "Stayed":
-                    df = df[df["left"] == 0]
-                if title_filter:
-                    df = df[df["title"].isin(title_filter)]
-                if gender_filter != "All":
-                    df = df[df["sex"] == gender_filter]
-        
-        
-                # Key Metrics
+                # Chart filters set by clicking the source charts, shown under
+                # the sidebar filters
+                cross_filtering = st.secrets.get("cross_filtering", True)
+                cross = dict(st.session_state.get("cross_filters", {})) if cross_filtering else {}
+                st.session_state.pop("cross_changed", None)
+                if cross:
+                    st.sidebar.subheader("🖱️ Chart filters")
+                    for col, values in cross.items():
+                        st.sidebar.caption(f"{CROSS_LABELS[col]}: {', '.join(str(value) for value in values)}")
+                    st.sidebar.button("Clear chart filters", on_click=clear_cross_filters)
+
+                # Each view (chart or the Key Metrics) is computed with the sidebar
+                # selection plus the chart filters it depends on. Aggregation
+                # results are cached on (dataset version, view selection), so a
+                # chart click only recomputes the views it affects, and a filtered
+                # frame is only materialized when a result has to be computed.
+                selection = sidebar_selection(department_name, left_filter, title_filter, gender_filter)
+                version = backend.version if backend is not None else full_df.attrs.get("version")
+                result_cache = load_result_cache()
+                precomputed = load_precomputed_store()
+                filter_index = dataset.index if backend is None else None
+                filtered = {}
+                filtered_lock = threading.Lock()
+
+                def view_filters(name):
+                    return view_selection(name, selection, cross)
+
+                def view_key(name):
+                    return (version, selection_key(view_filters(name)), name)
+
+                def filtered_df(view_filter=None):
+                    view_filter = view_filters("kpis") if view_filter is None else view_filter
+                    key = selection_key(view_filter)
+                    # Also called from the prefetch threads, hence the lock
+                    with filtered_lock:
+                        if key not in filtered:
+                            # Apply filters through the precomputed per-value row bitmaps
+                            with span("filter"):
+                                filtered[key] = apply_filters(full_df, filter_index, view_filter)
+                        return filtered[key]
+
+                def cached_result(name, compute):
+                    # Served from the batch-precomputed results when the job
+                    # covered this selection, computed live otherwise
+                    key = view_key(name)
+                    def compute_result():
+                        result = precomputed.get(*key)
+                        if result is not None:
+                            return result
+                        with span("compute", result=name):
+                            return compute()
+                    with span("aggregate", result=name):
+                        return result_cache.get_or_compute(key, compute_result)
+
+                def visualization(name):
+                    if backend is not None:
+                        return cached_result(name, lambda: backend.visualization(name, view_filters(name)))
+                    return cached_result(name, lambda: VISUALIZATIONS[name](filtered_df(view_filters(name))))
+
+                # Key Metrics, answered from the per-employee fact table of the
+                # full dataset unless department/title (or chart) filters change
+                # each employee's aggregates
+                def key_metrics():
+                    if backend is not None:
+                        return backend.kpis(view_filters("kpis"))
+                    return selection_kpis(filtered_df(), view_filters("kpis"), dataset.facts)
+
+                # Exact result when cached or ready within `approximate_wait_seconds`,
+                # otherwise the approximate (result, error bound) while the exact
+                # one is computed in the background. The bound is None for exact
+                # results.
+                exact_wait = float(st.secrets.get("approximate_wait_seconds", 0.3))
+
+                def exact_or_approximate(name, compute, approximate):
+                    if sketches is None or result_cache.get(view_key(name)) is not None:
+                        return compute(), None
+                    approximated = approximate()
+                    if approximated is None:
+                        return compute(), None
+                    future = load_prefetch_executor().submit(compute)
+                    try:
+                        return future.result(timeout=exact_wait), None
+                    except TimeoutError:
+                        st.session_state["exact_pending"].append(future)
+                        return approximated
+
+                with span("kpis"):
+                    kpis, kpi_bounds = exact_or_approximate(
+                        "kpis", lambda: cached_result("kpis", key_metrics),
+                        lambda: sketches.kpis(view_filters("kpis")))
+
                 st.header("📈 Key Metrics")
-                col1, col2, col3, col4 = st.columns(4)
-                with col1:
-                    st.metric("Total Employees", f"{df['emp_no'].nunique():,}")
-                with col2:
-                    st.metric("Employees Left", f"{df[df['left'] == 1]['emp_no'].nunique():,}")
-                with col3:
-                    st.metric("Employees Stayed", f"{df[df['left'] == 0]['emp_no'].nunique():,}")
-                with col4:
-                    st.metric("Emp in more than 1 departments", f"{(df['emp_no'].value_counts()>1).sum():,}")
-        
-                col5, col6, col7, col8 = st.columns(4)
-                with col5:
-                    st.metric("Total Department", df['dept_name'].nunique())
-                with col6:
-                    st.metric("Average Salary", f"{df.groupby('emp_no')['salary'].mean().mean():,.2f}")
-                with col7:
-                    st.metric("Average Tenure", f"{df['tenure'].mean():.2f} yr")
-                with col8:
-                    st.metric("Median Tenure", f"{df['tenure'].median():.2f} yr")
-        
-                col9, col10, col11, col12 = st.columns(4)
-                with col9:
-                    st.metric("Avg tenure (Emp who left)", f"{df.loc[df['left'] == 1, 'tenure'].mean():.2f} yrs")
-                with col10:
-                    st.metric("Tenure Range(in year)", f"{df.groupby('emp_no')['tenure'].min().min():.1f} - {df.groupby('emp_no')['tenure'].max().max():.1f}")
-                with col11:
-                    df['age'] = (df['last_date'] - df['birth_date']).dt.days / 365.0 
-                    st.metric("Avg age (Emp who left)", f"{df.loc[df['left'] == 1, 'age'].mean():.2f} yrs")
-                with col12:
-                    st.metric("Avg projects per emp", f"{df.groupby('emp_no')['no_of_projects'].mean().mean():,.2f}")
-        
-                col13, col14, col15, col16 = st.columns(4)
-                with col13:
-                    total_emp = df.groupby('Last_performance_rating').size().reset_index(name='total_emp')
-        
-                    rating_map = {'PIP': 1, 'C': 2, 'B': 3, 'S': 4, 'A': 5}
-                    average_performance_rating = (
-                        total_emp.apply(lambda row: row['total_emp'] * rating_map.get(row['Last_performance_rating'], 0), axis=1).sum() 
-                        / total_emp['total_emp'].sum()
-                    )
-        
-                    if 1 <= average_performance_rating < 2:
-                        avg_ratings = 'PIP'
-                    elif 2 <= average_performance_rating < 3:
-                        avg_ratings = 'C'
-                    elif 3 <= average_performance_rating < 4:
-                        avg_ratings = 'B'
-                    elif 4 <= average_performance_rating < 5:
-                        avg_ratings = 'S'
-                    else:
-                        avg_ratings = 'A'
-                    st.metric("Avg Performance Rating", avg_ratings)
-                with col14:
-                        min_salary = df.groupby('emp_no')['salary'].min().min()
-                        max_salary = df.groupby('emp_no')['salary'].max().max()
-                        st.metric("Salary Range", f"{min_salary/1000:.1f}k - {max_salary/1000:.1f}k")
-                    
-                with col15:
-                    left_employees = df[df['left'] == 1]['emp_no'].nunique()
-                    total_employees = df['emp_no'].nunique()
-                    attrition_rate = (left_employees / total_employees) * 100.00
-                    st.metric("Attrition Rate", f"{attrition_rate:.2f}%")
-        
-                with col16:
-                    st.metric("Total Manager", df.loc[df['title'] == 'Manager', 'emp_no'].nunique())    
-        
-                # Create tabs
-                tab1, tab2, tab3, tab4 = st.tabs([
-                    "1. Age Group & Year-wise Attrition Analysis",
-                    "2. Employee Analysis", 
-                    "3. Department Level Analysis",
-                    "4. Salary Analysis"
-                ])
-        
-                with tab1:
-                    st.header("Age Group & Year-wise Attrition Analysis")
-                    
-                    # Visualization 1: Employee Turnover by Age Group
-                    filtered_df = df[df['left'] == 1].copy()
-                    filtered_df['age'] = ((filtered_df['last_date'] - filtered_df['birth_date']).dt.days / 365)
-        
-                    def age_group(age):
-                        if 21 <= age <= 30: return '21-30'
-                        elif 30 < age <= 40: return '31-40'
-                        elif 40 < age <= 50: return '41-50'
-                        elif 50 < age <= 60: return '51-60'
-                        else: return '60+'
-        
-                    filtered_df['age_group'] = filtered_df['age'].apply(age_group)
-                    grouped_df = (filtered_df.groupby('age_group')['emp_no']
-                                 .nunique()
-                                 .reindex(['21-30', '31-40', '41-50', '51-60', '60+'])
-                                 .reset_index(name='NO_OF_EMP'))
-                    grouped_df['PCT'] = (grouped_df['NO_OF_EMP'] * 100.00) / grouped_df['NO_OF_EMP'].sum()
-        
-                    plt.figure(figsize=(8, 4))
-                    ax = sns.barplot(x='age_group', y='NO_OF_EMP', data=grouped_df, color='#1f77b4',
-                                    order=['21-30', '31-40', '41-50', '51-60', '60+'])
-                    plt.title('Employee Turnover by Age Group', fontsize=10,fontweight='bold')
-                    plt.xlabel('Age Group', fontsize=8)
-                    plt.ylabel('Number of Employees', fontsize=8)
-                    for p in ax.patches:
-                        ax.annotate(f"{int(p.get_height())}", (p.get_x() + p.get_width() / 2., p.get_height()),
-                                   ha='center', va='center', xytext=(0, 5), textcoords='offset points', fontsize=10)
-                    plt.grid(axis='y', alpha=0.2)
-                    st.pyplot(plt)
-        
-                    # Visualization 2: Year-wise Attrition Rate
-                    if all(col in df.columns for col in ['hire_date', 'last_date', 'left']):
-                        hired_emp = (df.groupby(df['hire_date'].dt.year)
-                                    .agg(total_emp_hired=('emp_no', 'nunique'))
-                                    .reset_index()
-                                    .rename(columns={'hire_date': 'year'}))
-                        left_emp = (df[df['left'] == 1]
-                                   .groupby(df['last_date'].dt.year)
-                                   .agg(total_emp_left=('emp_no', 'nunique'))
-                                   .reset_index()
-                                   .rename(columns={'last_date': 'year'}))
-                        merged = pd.merge(hired_emp, left_emp, on='year', how='outer').fillna(0)
-                        merged['cum_hired_emp_count'] = merged['total_emp_hired'].cumsum()
-                        merged['cum_left_emp_count'] = merged['total_emp_left'].cumsum()
-                        merged['new_count'] = merged['cum_left_emp_count'].shift(1).fillna(0)
-                        merged['total_emp'] = merged['cum_hired_emp_count'] - merged['new_count']
-                        merged['pct'] = (merged['total_emp_left'] / merged['total_emp'].replace(0, 1)) * 100
-                        result = merged[merged['total_emp'] > 0].sort_values('year')
-        
-                        plt.figure(figsize=(14, 6))
-                        plt.plot(result['year'], result['pct'], marker='o', markersize=8,
-                                color='royalblue', linewidth=3, label='Attrition Rate')
-                        plt.title('Employee Attrition Rate Trend', fontsize=16,fontweight='bold', pad=20)
-                        plt.xlabel('Year', fontsize=12)
-                        plt.ylabel('Attrition Rate (%)', fontsize=12)
-                        for x, y in zip(result['year'], result['pct']):
-                            plt.text(x, y, f'{y:.1f}%', ha='center', va='bottom', fontsize=10, weight='bold')
-                        plt.grid(alpha=0.2)
-                        plt.legend()
-                        st.pyplot(plt)
-                    else:
-                        st.warning("Required columns (hire_date, last_date, left) not available for attrition analysis")
-        
-                with tab2:
-                    st.header("Employee Analysis")
-                    
-                    # Visualization 3: Gender Distribution
-                    female_count = df[df['sex'] == 'F'].shape[0]
-                    male_count = df[df['sex'] == 'M'].shape[0]
-                    gender_counts = pd.DataFrame({
-                        'gender': ['Female', 'Male'],
-                        'total_no': [female_count, male_count]
-                    })
-                    gender_counts['pct'] = (gender_counts['total_no'] * 100) / gender_counts['total_no'].sum()
-        
-                    plt.figure(figsize=(1, 1))
-                    plt.pie(gender_counts['total_no'], labels=gender_counts['gender'], 
-                           autopct='%1.1f%%', startangle=90, colors=['#ff9999', '#66b3ff'],textprops={'fontsize':6})
-                    plt.title('Employee Distribution by Gender', fontsize=4)
-                    plt.axis('equal')
-                    st.pyplot(plt)
-        
-                    # Visualization 4: Performance Rating Distribution
-                    grouped_df = df.groupby("Last_performance_rating")["emp_no"].nunique().reset_index(name="total_emp")  
-                    grouped_df["pct"] = (grouped_df["total_emp"] * 100.0) / grouped_df["total_emp"].sum()
-                    grouped_df = grouped_df.sort_values(by="total_emp", ascending=False)
-        
-                    plt.figure(figsize=(14, 5))
-                    ax = sns.barplot(x="Last_performance_rating", y="total_emp", data=grouped_df, 
-                                    hue="Last_performance_rating", palette="viridis")
-                    for p in ax.patches:
-                        ax.annotate(f'{int(p.get_height())}', (p.get_x() + p.get_width() / 2., p.get_height()),
-                                   ha='center', va='bottom', fontsize=10)
-                    plt.title("Employee Distribution by Last Performance Rating", fontsize=16,fontweight='bold')
-                    plt.xlabel("Last Performance Rating", fontsize=12)
-                    plt.ylabel("Total Employees", fontsize=12)
-                    ax2 = plt.gca().twinx()
-                    sns.lineplot(x="Last_performance_rating", y="pct", data=grouped_df, 
-                                ax=ax2, color="red", marker="o", label="Percentage", linewidth=2)
-                    ax2.set_ylabel("Percentage of Total (%)", fontsize=12, color="red")
-                    plt.xticks(rotation=45)
-                    st.pyplot(plt)
-        
-                    # Visualization 5: Job Title Distribution
-                    result = df.groupby("title")["emp_no"].nunique().reset_index(name="total_emp")  
-                    result = result.sort_values(by="total_emp", ascending=False)
-                    plt.figure(figsize=(14, 5))
-                    sns.barplot(x="title", y="total_emp", data=result, hue="title", palette="viridis")
-                    plt.title("Employee Count by Job Title", fontsize=16,fontweight='bold')
-                    plt.xlabel("Job Title", fontsize=12)
-                    plt.ylabel("Number of Employees", fontsize=12)
-                    plt.xticks(rotation=45, fontsize=12)
-                    for index, value in enumerate(result["total_emp"]):
-                        plt.text(index, value + 0.1, str(value), ha="center", va="bottom", fontsize=12)
-                    st.pyplot(plt)
-        
-                    # Visualization 6: Projects Distribution
-                    df['project_category'] = pd.cut(
-                        df['no_of_projects'],
-                        bins=[0, 3, 7, 10],
-                        labels=['Low(1-3)', 'Medium(4-7)', 'High(8-10)'],
-                        right=True,
-                        include_lowest=True
-                    )
-                    summary = (df.groupby('project_category', observed=True)['emp_no']
-                             .nunique()
-                             .reset_index()
-                             .rename(columns={'emp_no': 'Total_emp'}))
-                    plt.figure(figsize=(14, 5))
-                    ax = sns.barplot(x='project_category', y='Total_emp', data=summary, 
-                                    hue='project_category', palette='viridis')
-                    plt.title('Employee Distribution by No of Projects', fontsize=16,fontweight='bold')
-                    plt.xlabel('Project Category', fontsize=12)
-                    plt.ylabel('Total Employees', fontsize=12)
-                    for index, value in enumerate(summary['Total_emp']):
-                        plt.text(index, value * 0.5, str(value), color='white', ha='center', va='bottom', fontsize=12)
-                    st.pyplot(plt)
-
-
-                    # Visualization 7: Distribution of Employees by Tenure
-                    df_unique = df.drop_duplicates(subset="emp_no")
-        
-                    plt.figure(figsize=(14, 5))
-                    plt.hist(df_unique["tenure"],bins=15, color="skyblue", edgecolor="black")
-                    plt.title("Distribution of Employees by Tenure", fontsize=16,fontweight='bold')
-                    plt.xlabel("Tenure (Years)", fontsize=12)
-                    plt.ylabel("Total Employees", fontsize=12)
-                    plt.grid(axis="y", linestyle="--", alpha=0.7)
-        
-                    st.pyplot(plt)
-
-                    
-                    # Visualization 8: Tenure Distribution
-                    def tenure_group(tenure):
-                        if 1 <= tenure <= 4: return "Low Tenure(1-4)"
-                        elif 4 < tenure <= 8: return "Medium Tenure(5-8)"
-                        else: return "High Tenure(9+)"
-                    df["tenure_group"] = df["tenure"].apply(tenure_group)
-                    grouped_df = df.groupby("tenure_group")['emp_no'].nunique().reset_index(name="NO_OF_EMP")
-                    grouped_df["PCT"] = (grouped_df["NO_OF_EMP"] * 100.00) / grouped_df["NO_OF_EMP"].sum()
-        
-                    plt.figure(figsize=(14, 5))
-                    ax = sns.barplot(x="tenure_group", y="NO_OF_EMP", data=grouped_df, 
-                                    hue="tenure_group", palette="viridis")
-                    for p in ax.patches:
-                        ax.annotate(f'{int(p.get_height())}', (p.get_x() + p.get_width() / 2., p.get_height()),
-                                   ha='center', va='bottom', fontsize=10)
-                    plt.title("Employee distribution by Tenure Group", fontsize=16,fontweight='bold')
-                    plt.xlabel("Tenure Group", fontsize=12)
-                    plt.ylabel("Number of Employees", fontsize=12)
-                    st.pyplot(plt)
-        
-                    # Visualization 9: Hiring Trend
-                    df["hire_year"] = pd.to_datetime(df["hire_date"]).dt.year
-                    result = df.groupby("hire_year")["emp_no"].nunique().reset_index(name="employee_count") 
-                    result = result.sort_values(by="hire_year")
-                    plt.figure(figsize=(14, 5))
-                    ax = sns.lineplot(x='hire_year', y='employee_count', data=result, marker='o', color='blue')
-                    plt.title('Employee Hired Trends by Year', fontsize=16,fontweight='bold')
-                    plt.xlabel('Year', fontsize=12)
-                    plt.ylabel('Number of Employees', fontsize=12)
-                    for index, row in result.iterrows():
-                        plt.text(row['hire_year'], row['employee_count'] + 0.1, f"{row['employee_count']:,}", 
-                                ha='center', va='bottom', fontsize=10)
-                    st.pyplot(plt)
-        
-                    # Visualization 10: Exit Trends
-                    if 'last_date' in df.columns:
-                        df['exit_year'] = df['last_date'].dt.year
-                        exit_counts = (df.groupby('exit_year', observed=True)
-                                      .agg(total_exits=('emp_no', 'count'))
-                                      .reset_index()
-                                      .sort_values('exit_year'))
-                        plt.figure(figsize=(14, 5))
-                        ax = sns.lineplot(x='exit_year', y='total_exits', data=exit_counts,
-                                         marker='o', markersize=8, linewidth=2.5, color='#e63946')
-                        plt.title('Employee Exit Trends by Year', fontsize=16,fontweight='bold', pad=20)
-                        plt.xlabel('Year', fontsize=12)
-                        plt.ylabel('Number of Exits', fontsize=12)
-                        for x, y in zip(exit_counts['exit_year'], exit_counts['total_exits']):
-                            ax.text(x, y + 0.5, f'{y:,}', ha='center', va='bottom',
-                                   fontsize=10, bbox=dict(facecolor='white', alpha=0.8, edgecolor='none'))
-                        st.pyplot(plt)
-        
-                    # Visualization 11: Total Employees by Year
-                    if all(col in df.columns for col in ['hire_date', 'last_date']):
-                        hired = df.groupby(df['hire_date'].dt.year)["emp_no"].nunique().reset_index(name="total_emp_hired")
-                        left = df[df['left'] == 1].groupby(df['last_date'].dt.year)["emp_no"].nunique().reset_index(name="total_emp_left")
-                        all_years = pd.DataFrame({'years': pd.Series(sorted(set(hired['hire_date'].tolist() + left['last_date'].tolist()))).astype(int)})
-                        merged = pd.merge(all_years, hired, left_on='years', right_on='hire_date', how='left').fillna(0)
-                        merged = pd.merge(merged, left, left_on='years', right_on='last_date', how='left').fillna(0)
-                        merged.drop(['hire_date', 'last_date'], axis=1, inplace=True)
-                        merged['cum_hired_emp_count'] = merged['total_emp_hired'].cumsum().astype(int)
-                        merged['cum_left_emp_count'] = merged['total_emp_left'].cumsum().astype(int)
-                        merged['new_count'] = merged['cum_left_emp_count'].shift(1).fillna(0).astype(int)
-                        merged['total_emp'] = merged['cum_hired_emp_count'] - merged['new_count']
-        
-                        plt.figure(figsize=(20, 7))
-                        plt.plot(merged['years'], merged['total_emp'], marker='o', color='skyblue', label='Total Employees')
-                        for index, value in enumerate(merged['total_emp']):
-                            plt.text(merged['years'].iloc[index], value + 50, f"{value:,}", 
-                                    ha='center', fontsize=10, bbox=dict(facecolor='white', alpha=0.7, edgecolor='gray'))
-                        plt.title('Total Employee by Year', fontsize=20,fontweight='bold')
-                        plt.xlabel('Year', fontsize=16)
-                        plt.ylabel('Total Employee Count', fontsize=16)
-                        plt.xticks(merged['years'], fontsize=12, rotation=45)
-                        st.pyplot(plt)
-        
-                with tab3:
-                    st.header("Department Level Analysis")
-                    
-                    # Visualization 12: Employees by Department
-                    result = df.groupby('dept_name')["emp_no"].nunique().reset_index(name='total_emp')
-                    result = result.sort_values(by='total_emp', ascending=False).reset_index(drop=True)
-                    plt.figure(figsize=(14, 5))
-                    ax = sns.barplot(x='total_emp', y='dept_name', data=result, palette='Blues_r')
-                    for index, value in enumerate(result['total_emp']):
-                        ax.text(value + 1, index, f"{value:,}", va='center')
-                    plt.title('Total Employees by Department', fontsize=16,fontweight='bold')
-                    plt.xlabel('Total Employees', fontsize=12)
-                    plt.ylabel('Department Name', fontsize=12)
-                    st.pyplot(plt)
-        
-                    # Visualization 13: Average Salary by Department
-                    df_grouped = df.groupby('dept_name').agg(
-                        avg_salary=('salary', 'mean'),
-                        total_employees=('salary', 'count')
-                    ).reset_index()
-                    df_grouped = df_grouped.sort_values(by='avg_salary', ascending=False)
-                    plt.figure(figsize=(14, 5))
-                    bars = plt.bar(df_grouped['dept_name'], df_grouped['avg_salary'], color='skyblue')
-                    for bar, count in zip(bars, df_grouped['total_employees']):
-                        plt.text(bar.get_x() + bar.get_width() / 2, bar.get_height(), 
-                                f'{count:,}', ha='center', va='bottom')
-                    plt.title('Average Salary by Department',fontsize=16,fontweight='bold')
-                    plt.xlabel('Department Name',fontsize=12)
-                    plt.ylabel('Average Salary',fontsize=12)
-                    plt.xticks(rotation=45, ha='right')
-                    st.pyplot(plt)
-        
-                    # Visualization 14: Managers by Department
-                    manager_counts = (df[df['title'] == 'Manager']
-                                     .groupby('dept_name')['emp_no']
-                                     .count()
-                                     .reset_index()
-                                     .rename(columns={'emp_no': 'total_manager'})
-                                     .sort_values(by='total_manager', ascending=False))
-                    plt.figure(figsize=(14, 5))
-                    ax = sns.barplot(x='dept_name', y='total_manager', hue='dept_name', 
-                                    data=manager_counts, palette='dark:#1f3b6f_r', legend=False)
-                    for p in ax.patches:
-                        ax.annotate(f"{p.get_height():,.0f}", 
-                                   (p.get_x() + p.get_width() / 2, p.get_height() / 2),
-                                   ha='center', va='center', color='white', fontsize=10, fontweight='bold')
-                    plt.title('Total Managers by Department', fontsize=16, fontweight='bold')
-                    plt.xlabel('Department Name', fontsize=12)
-                    plt.ylabel('Total Managers', fontsize=12)
-                    st.pyplot(plt)
-        
-                with tab4:
-                    st.header("Salary Analysis")
-                    
-                    # Visualization 15: Year-wise Average Salary
-                    if all(col in df.columns for col in ['hire_date', 'last_date', 'salary']):
-                        try:
-                            final_table = df.copy()
-                            
-                            # Your exact calculation code
-                            final_table['hire_year'] = final_table['hire_date'].dt.year
-                            final_table['last_year'] = final_table['last_date'].dt.year
-        
-                            # First get unique employees by hire_year with their salaries
-                            unique_hires = final_table.drop_duplicates(subset=['emp_no', 'hire_year'])
-        
-                            # Then aggregate by hire_year
-                            hired_df = unique_hires.groupby('hire_year').agg({
-                                'emp_no': 'count',          # Count of unique employees (since we already deduplicated)
-                                'salary': 'sum'             # Sum of salaries for these unique employees
-                            }).rename(columns={
-                                'emp_no': 'total_emp_hired',
-                                'salary': 'total_salary_hired'
-                            })
-        
-                            # Similarly for employees who left (if needed)
-                            unique_leavers = final_table[final_table['left'] == 1].drop_duplicates(subset=['emp_no', 'last_year'])
-        
-                            left_df = unique_leavers.groupby('last_year').agg({
-                                'emp_no': 'count',
-                                'salary': 'sum'
-                            }).rename(columns={
-                                'emp_no': 'total_emp_left',
-                                'salary': 'total_salary_left'
-                            })
-        
-                            merged_df = pd.merge(hired_df, left_df, left_index=True, right_index=True, how='outer').fillna(0)
-                            merged_df.reset_index(inplace=True)
-                            merged_df.rename(columns={'index': 'years'}, inplace=True)
-                            merged_df['years'] = merged_df['years'].astype(int)
-        
-                            merged_df['cum_hired_emp_count'] = merged_df['total_emp_hired'].cumsum().astype(int)
-                            merged_df['cum_left_emp_count'] = merged_df['total_emp_left'].cumsum().astype(int)
-                            merged_df['cum_hired_salary'] = merged_df['total_salary_hired'].cumsum().round(2)
-                            merged_df['cum_left_salary'] = merged_df['total_salary_left'].cumsum().round(2)
-        
-                            merged_df['new_count'] = merged_df['cum_left_emp_count'].shift(1).fillna(0).astype(int)
-                            merged_df['total_emp'] = merged_df['cum_hired_emp_count'] - merged_df['new_count']
-                            merged_df['new_sal'] = merged_df['cum_hired_salary'].shift(1).fillna(0).round(2)
-                            merged_df['total_sal'] = merged_df['cum_hired_salary'] - merged_df['cum_left_salary'].shift(1).fillna(0)
-                            merged_df['avg_sal'] = (merged_df['total_sal'] / merged_df['total_emp'].replace(0, 1)).round(2)  # Added .replace(0,1) to avoid divide by zero
-        
-                            # Fixed visualization for Streamlit
-                            fig, ax = plt.subplots(figsize=(12, 6))  # Reduced size from 24 to 12
-                            
-                            # Your exact plotting code
-                            ax.plot(merged_df['years'].astype(str), merged_df['avg_sal'], 
-                                marker='o', color='skyblue', linestyle='-', linewidth=2)
-        
-                            for i, val in enumerate(merged_df['avg_sal']):
-                                ax.text(i, val, f'{val:,.2f}', ha='center', va='bottom', rotation=90)
-        
-                            ax.set_title('Average Salary by Year',fontsize=18,fontweight='bold')
-                            ax.set_xlabel('Year',fontsize=14)
-                            ax.set_ylabel('Average Salary',fontsize=14)
-                            ax.grid(axis='y', linestyle='--', alpha=0.5)
-                            
-                            plt.tight_layout()  # Prevent label cutoff
-                            st.pyplot(fig)  # Streamlit display
-                            plt.close(fig)  # Clean up memory
-        
-        
-        
-                        except Exception as e:
-                            st.error(f"Error generating salary trend: {str(e)}")
-                            st.error(f"Traceback: {traceback.format_exc()}")
-                    else:
-                        st.warning("Required columns (hire_date, last_date, salary) not available")
-        
+                if kpi_bounds is not None:
+                    st.caption("≈ Approximate values with their error bounds (about 95%); "
+                               "the exact values replace them when ready")
+                for row in range(0, len(METRIC_TILES), 4):
+                    for col, (label, key, value) in zip(st.columns(4), METRIC_TILES[row:row + 4]):
+                        with col, span("metric", tile=label):
+                            bound = kpi_bounds.get(key) if kpi_bounds is not None else None
+                            if not bound:
+                                st.metric(label, value(kpis))
+                                continue
+                            if isinstance(kpis[key], int):
+                                bound = int(np.ceil(bound))
+                            st.metric(label, "≈ " + str(value(kpis)))
+                            st.caption("± " + str(value({**kpis, key: bound})))
 
+                # Charts are rendered once per (aggregate result, size, theme) and
+                # the encoded image bytes are served from the figure cache
+                figure_cache = load_figure_cache()
+                chart_theme = st.secrets.get("chart_theme")
+                chart_format = st.secrets.get("chart_format", "png")
+                chart_pool = load_chart_pool()
 
-                    # Visualization 16: Distribution of Employees by salary
-            
-                    df_unique = df.drop_duplicates(subset=["emp_no"])
-        
-                    plt.figure(figsize=(10, 4))
-                    plt.hist(df_unique["salary"], bins=15, color="skyblue", edgecolor="black")
-                    plt.title(" Distribution of Employees by salary",fontsize=14,fontweight='bold')
-                    plt.xlabel("Salary", fontsize=10)
-                    plt.ylabel("Total Employees", fontsize=10)
-                    plt.grid(False)
-                    st.pyplot(plt)
-
-                    
-                    # Visualization 17: Salary by Job Title
-                    result = df.groupby(['title', 'emp_no'])['salary'].mean().reset_index()
-                    result = result.groupby('title')['salary'].mean().reset_index(name='avg_sal')
-                    result = result.sort_values(by='avg_sal', ascending=False)
-                    plt.figure(figsize=(10, 4))
-                    ax = sns.barplot(x='title', y='avg_sal', data=result, palette='viridis')
-                    plt.title('Average Salary by Job Title', fontsize=14,fontweight='bold')
-                    plt.xlabel('Job Title', fontsize=10)
-                    plt.ylabel('Average Salary', fontsize=10)
-                    for index, value in enumerate(result['avg_sal']):
-                        ax.annotate(f'{value:.2f}', (index, value + 500),
-                                   ha='center', va='bottom', fontsize=10)
-                    st.pyplot(plt)
-        
-                    # Visualization 18: Salary by Performance Rating
-                    filtered_table = df.drop_duplicates(subset='emp_no')
-                    result = filtered_table.groupby('Last_performance_rating').agg(
-                        avg_salary=('salary', 'mean'),
-                        employee_count=('emp_no', 'size')
-                    ).reset_index()
-                    result = result.sort_values(by='Last_performance_rating')
-                    plt.figure(figsize=(10, 4))
-                    plt.bar(result['Last_performance_rating'].astype(str), result['avg_salary'], color='skyblue')
-                    for i, val in enumerate(result['avg_salary']):
-                        plt.text(i, val, f'{val:,.2f}', ha='center', va='bottom')
-                    plt.title('Average Salary by Last Performance Rating',fontsize=14,fontweight='bold')
-                    plt.xlabel('Last Performance Rating',fontsize=10)
-                    plt.ylabel('Average Salary',fontsize=10)
-                    st.pyplot(plt)
-        
-                    # Visualization 19: Employees by Salary Range
-                    df['salary'] = df.groupby('emp_no')['salary'].transform('mean').round()
-                    df['salary_range'] = pd.cut(
-                        df['salary'],
-                        bins=[39999, 60000, 80000, 100000, 129492],
-                        labels=['40k-60k', '60k-80k', '80k-100k', '100k-130k'],
-                        right=True
-                    )
-                    salary_dist = df.groupby('salary_range', observed=False).agg(
-                        NO_OF_EMP=('emp_no', 'nunique')
-                    ).reset_index()
-                    plt.figure(figsize=(10, 4))
-                    ax = sns.barplot(x='salary_range', y='NO_OF_EMP', data=salary_dist, color='skyblue')
-                    for i, row in salary_dist.iterrows():
-                        ax.annotate(f"{row['NO_OF_EMP']}", (i, row['NO_OF_EMP']), 
-                                   ha='center', va='bottom')
-                    plt.title('Employees by Salary Range', fontsize=14,fontweight='bold')
-                    plt.xlabel('Salary Range', fontsize=10)
-                    plt.ylabel('Total Employees', fontsize=10)
-                    st.pyplot(plt)
+                def chart_available(name):
+                    required, _ = CHART_REQUIREMENTS.get(name, ([], None))
+                    columns = backend.columns if backend is not None else full_df.columns
+                    return all(col in columns for col in required)
+
+                def chart_image(name):
+                    result = visualization(name)
+                    with span("render", chart=name):
+                        return render_chart(name, result, figure_cache, theme=chart_theme, fmt=chart_format)
+
+                # Approximate image of Visualization 7 or 16 and its error bound, or
+                # (None, None) once the exact result is there
+                def approximate_image(name):
+                    result, bound = exact_or_approximate(
+                        name, lambda: visualization(name), lambda: sketches.visualization(name, view_filters(name)))
+                    if bound is None:
+                        return None, None
+                    with span("render", chart=name, approximate=True):
+                        return render_chart(name, result, figure_cache, theme=chart_theme, fmt=chart_format), bound
+
+                def chart_spec(name):
+                    result = visualization(name)
+                    selected = None
+                    if cross_filtering and name in CROSS_FILTERS:
+                        selected = cross.get(CROSS_FILTERS[name], [])
+                    with span("render", chart=name, backend="altair"):
+                        return render_spec(name, result, figure_cache, *spec_limits(), selected=selected)
+
+                # Images of the given charts, aggregated and rendered in the chart
+                # pool; an entry is the exception when that chart failed
+                def section_images(names):
+                    images, tasks = {}, []
+                    render_args = (None, chart_theme, chart_format)
+                    for name in names:
+                        result = result_cache.get(view_key(name))
+                        if result is None:
+                            result = precomputed.get(*view_key(name))
+                        if result is None and (backend is not None or view_filters(name) != view_filters("kpis")):
+                            # Queried from the backend, or aggregated on this
+                            # view's own filtered frame, in the pool
+                            tasks.append((name, lambda name=name: visualization(name), render_args))
+                            continue
+                        if result is not None:
+                            image = figure_cache.get(figure_key(name, result, *render_args))
+                            if image is not None:
+                                images[name] = image
+                                continue
+                        tasks.append((name, result, render_args))
+                    with span("chart_pool", charts=len(tasks)):
+                        outcomes = chart_pool.run(tasks, filtered_df)
+                    for (name, _, _), outcome in zip(tasks, outcomes):
+                        if isinstance(outcome, Exception):
+                            images[name] = outcome
+                            continue
+                        result, image = outcome
+                        result_cache.put(view_key(name), result)
+                        figure_cache.put(figure_key(name, result, *render_args), image)
+                        images[name] = image
+                    return images
+
+                def show_chart(name, image=None):
+                    with span("chart", chart=name):
+                        draw_chart(name, image)
+
+                def show_error(label, error):
+                    st.error(f"Error generating {label}: {str(error)}")
+                    st.error(f"Traceback: {''.join(traceback.format_exception(error))}")
+
+                # A chart's image, Vega-Lite spec or approximate image; an
+                # error from the pool or from computing it here is shown in
+                # its place
+                def draw_chart(name, image):
+                    if not chart_available(name):
+                        _, warning = CHART_REQUIREMENTS[name]
+                        if warning:
+                            st.warning(warning)
+                        return
+                    try:
+                        if isinstance(image, Exception):
+                            raise image
+                        display_chart(name, image)
+                    except Exception as e:
+                        show_error(name.replace('_', ' '), e)
+
+                def display_chart(name, image):
+                    bound = None
+                    if image is None and sketches is not None and name in APPROXIMATE_VISUALIZATIONS:
+                        image, bound = approximate_image(name)
+                    if image is None and chart_backend(name) == "altair":
+                        spec = chart_spec(name)
+                        if spec is not None:
+                            with span("display", chart=name):
+                                if cross_filtering and name in CROSS_FILTERS:
+                                    # Clicks set this chart's filter (pick_chart)
+                                    st.vega_lite_chart(spec, width="stretch", on_select=lambda: pick_chart(name),
+                                                       selection_mode=PICK, key=cross_key(name))
+                                else:
+                                    st.vega_lite_chart(spec, width="stretch")
+                            return
+                        # Over the payload limits: drawn as an image instead
+                    if image is None:
+                        image = chart_image(name)
+                    if chart_format == "svg":
+                        image = image.decode("utf-8")
+                    with span("display", chart=name):
+                        st.image(image, width="stretch")
+                    if bound is not None:
+                        st.caption(f"≈ Approximate: each bar within ± {int(np.ceil(bound)):,} employees; "
+                                   "the exact chart replaces it when ready")
+
+                def cohort_dimension():
+                    labels = {label: by for by, label in DIMENSIONS.items()}
+                    return labels.get(st.session_state.get("cohort_dimension"), "hire_year")
+
+                # Kaplan-Meier table of the cohorts of `by`, cached per view
+                # selection like the visualizations
+                def cohort_curves(by):
+                    name = cohort_view(by)
+                    if backend is not None:
+                        return cached_result(name, lambda: survival_curves(backend.cohort_spells(by, view_filters(name))))
+                    return cached_result(name, lambda: survival_curves(cohort_spells(filtered_df(view_filters(name)), by)))
+
+                def show_cohort_chart(name, result):
+                    with span("chart", chart=name):
+                        with span("render", chart=name):
+                            image = render_chart(name, result, figure_cache, theme=chart_theme, fmt=chart_format)
+                        if chart_format == "svg":
+                            image = image.decode("utf-8")
+                        with span("display", chart=name):
+                            st.image(image, width="stretch")
+
+                # Cohort section: how long the employees of each hire year,
+                # department or job title stay, within the current filters.
+                # Both charts are drawn with matplotlib.
+                def show_cohorts():
+                    if not chart_available("cohorts"):
+                        st.warning(CHART_REQUIREMENTS["cohorts"][1])
+                        return
+                    st.selectbox("Cohorts by", list(DIMENSIONS.values()), key="cohort_dimension")
+                    by = cohort_dimension()
+                    try:
+                        curves = cohort_curves(by)
+                    except Exception as e:
+                        show_error("cohort analysis", e)
+                        return
+                    if curves.empty:
+                        st.info("No employees match the current filters.")
+                        return
+                    cohorts = curves["cohort"].cat.remove_unused_categories().cat.categories.tolist()
+                    shown = st.multiselect("Cohorts", cohorts, default=largest_cohorts(curves),
+                                           key=f"cohorts_shown_{by}")
+                    st.caption("Share of each cohort still employed by years since hire (Kaplan-Meier, with 95% "
+                               "bands). Employees still employed count until the end of the data.")
+                    if shown:
+                        show_cohort_chart("cohort_survival", curves[curves["cohort"].isin(shown)].reset_index(drop=True))
+                    show_cohort_chart("cohort_retention", retention_matrix(curves))
+                    st.dataframe(cohort_summary(curves), hide_index=True)
+
+                def show_section(index):
+                    _, header, charts = SECTIONS[index]
+                    st.header(header)
+                    if index == COHORT_SECTION:
+                        show_cohorts()
+                        return
+                    images = {}
+                    if chart_pool is not None:
+                        images = section_images([name for name in charts
+                                                 if chart_available(name) and chart_backend(name) != "altair"
+                                                 and not (sketches is not None and name in APPROXIMATE_VISUALIZATIONS)])
+                    for name in charts:
+                        show_chart(name, images.get(name))
+
+                # Warm the caches for the given sections in the background
+                def prefetch_sections(indexes):
+                    executor = load_prefetch_executor()
+                    for index in indexes:
+                        if index == COHORT_SECTION and chart_available("cohorts"):
+                            executor.submit(cohort_curves, cohort_dimension())
+                        for name in SECTIONS[index][2]:
+                            if chart_available(name):
+                                executor.submit(chart_spec if chart_backend(name) == "altair" else chart_image, name)
+
+                if st.secrets.get("lazy_sections", True):
+                    # Only the selected section is computed and drawn. The selector
+                    # lives in a fragment, so switching sections reruns just that
+                    # fragment, and the neighbouring sections are prefetched.
+                    @st.fragment
+                    def section_view():
+                        # A chart click reruns only this fragment; the Key Metrics
+                        # and other views need the whole app
+                        if st.session_state.pop("cross_changed", False):
+                            st.rerun()
+                        titles = [title for title, _, _ in SECTIONS]
+                        selected = st.radio("Section", titles, horizontal=True, label_visibility="collapsed")
+                        index = titles.index(selected)
+                        # A fragment rerun gets its own trace, shown below the section
+                        fragment_rerun = current_trace() is None
+                        with trace("section", section=index + 1) as section_trace:
+                            show_section(index)
+                            if st.secrets.get("prefetch_sections", True):
+                                prefetch_sections([i for i in (index - 1, index + 1) if 0 <= i < len(SECTIONS)])
+                        if fragment_rerun and section_trace is not None and is_admin():
+                            with st.expander("⏱️ Section rerun timing"):
+                                show_timing(section_trace)
+
+                    section_view()
+                else:
+                    # Create tabs
+                    tabs = st.tabs([title for title, _, _ in SECTIONS])
+                    for index, tab in enumerate(tabs):
+                        with tab:
+                            show_section(index)
+
+                if sketches is not None:
+                    # Rerun the app once the exact results behind the approximate
+                    # ones on screen are computed
+                    @st.fragment(run_every=float(st.secrets.get("approximate_poll_seconds", 1)))
+                    def exact_results():
+                        pending = st.session_state.get("exact_pending", [])
+                        if pending and all(future.done() for future in pending):
+                            st.session_state["exact_pending"] = []
+                            st.rerun()
+
+                    exact_results()
         
         if __name__ == "__main__":
-            main()
+            with trace("rerun") as rerun_trace:
+                main()
+            if rerun_trace is not None and is_admin():
+                with st.sidebar.expander("⏱️ Rerun timing"):
+                    show_timing(rerun_trace)
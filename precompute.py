@@ -0,0 +1,128 @@
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from aggregations import VISUALIZATIONS
+from analytics import compute_dashboard
+from data_loader import CHUNK_SIZE, SNAPSHOT_DIR, load_snapshot, prepare_data, read_snapshot, snapshot_version
+from employee_facts import build_employee_facts
+from employee_model import EmployeeModel
+from filters import FilterIndex, selection_key, sidebar_selection
+from result_store import STORE_FILE, write_store
+
+
+# Batch precomputation of the dashboard for a grid of filter combinations.
+# Every combination's Key Metrics and visualization aggregates are computed
+# in a process pool and written to a result store (result_store.py), which
+# the dashboard reads before computing anything live. The results are
+# computed with the data model the dashboard serves (its `data_model`
+# secret): the normalized model by default, or the frame.
+#
+# The grid lists the options of each sidebar widget. For the department and
+# title multiselects an option is a list of values, or "each" for no filter
+# plus every single value:
+#   {"departments": "each", "statuses": ["All", "Left", "Stayed"],
+#    "titles": [[], ["Manager"]], "genders": ["All", "M", "F"]}
+
+DEFAULT_STORE = os.path.join(SNAPSHOT_DIR, STORE_FILE)
+
+DEFAULT_GRID = {
+    "departments": "each",
+    "statuses": ["All", "Left", "Stayed"],
+    "titles": [[]],
+    "genders": ["All", "M", "F"],
+}
+
+
+def _options(option, values):
+    if option == "each":
+        return [[]] + [[value] for value in values]
+    return [list(choice) for choice in option]
+
+
+# Sidebar selections of every combination in `grid`
+def filter_grid(df, grid=DEFAULT_GRID):
+    grid = {**DEFAULT_GRID, **grid}
+    departments = _options(grid["departments"], sorted(df["dept_name"].dropna().unique().tolist()))
+    titles = _options(grid["titles"], sorted(df["title"].dropna().unique().tolist()))
+    return [sidebar_selection(*combination)
+            for combination in itertools.product(departments, grid["statuses"], titles, grid["genders"])]
+
+
+DATA_MODELS = ("normalized", "frame")
+
+# Per-process state of the pool workers: the normalized model, or the
+# prepared dataset with its filter index and fact table, loaded once from
+# the snapshot when the worker starts
+_worker = {}
+
+
+def _init_worker(snapshot_dir, data_model="normalized"):
+    df = prepare_data(read_snapshot(snapshot_dir))
+    if data_model == "normalized":
+        _worker.update(model=EmployeeModel(df))
+    else:
+        _worker.update(df=df, index=FilterIndex(df), facts=build_employee_facts(df))
+
+
+def _compute_selection(selection):
+    model = _worker.get("model")
+    if model is not None:
+        results = {"kpis": model.kpis(selection)}
+        results.update((name, model.visualization(name, selection)) for name in VISUALIZATIONS)
+    else:
+        results = compute_dashboard(_worker["df"], selection, index=_worker["index"], facts=_worker["facts"])
+    key = selection_key(selection)
+    return [(key, name, result) for name, result in results.items()]
+
+
+# Compute every selection of the grid and write the results to `store_path`.
+# Returns the number of selections computed.
+def precompute(snapshot_dir=SNAPSHOT_DIR, store_path=DEFAULT_STORE, grid=DEFAULT_GRID, workers=None,
+               data_model="normalized"):
+    if data_model not in DATA_MODELS:
+        raise ValueError(f"Unknown data model {data_model!r}; expected one of {DATA_MODELS}")
+    df = prepare_data(read_snapshot(snapshot_dir))
+    version = snapshot_version(snapshot_dir)
+    selections = filter_grid(df, grid)
+    del df
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(selections) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(snapshot_dir, data_model)) as pool:
+        rows = itertools.chain.from_iterable(pool.map(_compute_selection, selections, chunksize=chunksize))
+        write_store(store_path, version, rows)
+    return len(selections)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute dashboard aggregates for a grid of filter combinations")
+    parser.add_argument("source", help="employee CSV link or path (refreshes the snapshot first)")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR)
+    parser.add_argument("--store", default=None, help=f"result store to write (default {DEFAULT_STORE})")
+    parser.add_argument("--grid", help="JSON file with the filter grid (default: each department x status x gender)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--data-model", choices=DATA_MODELS, default="normalized",
+                        help="the dashboard's data_model setting (default: normalized)")
+    args = parser.parse_args()
+
+    grid = DEFAULT_GRID
+    if args.grid:
+        with open(args.grid, "r", encoding="utf-8") as f:
+            grid = json.load(f)
+    store_path = args.store or os.path.join(args.snapshot_dir, STORE_FILE)
+
+    start = time.perf_counter()
+    load_snapshot(args.source, snapshot_dir=args.snapshot_dir, chunksize=args.chunk_size)
+    count = precompute(args.snapshot_dir, store_path, grid, args.workers, args.data_model)
+    print(f"Precomputed {count} filter combinations x {len(VISUALIZATIONS) + 1} results "
+          f"into {store_path} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
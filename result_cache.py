@@ -0,0 +1,113 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+# Size-bounded LRU cache for aggregation results and rendered charts, keyed
+# on e.g. (dataset version, normalized filter selection, result name).
+# Entries are evicted once there are more than `max_entries` of them or, when
+# `max_bytes` is set, once their total `sizeof()` exceeds it.
+# Shared between sessions, so every access is guarded by a lock; the
+# computation itself runs outside the lock.
+class ResultCache:
+    def __init__(self, max_entries=512, max_bytes=None, sizeof=len):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._sizes.pop(key)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            self.nbytes += size
+            while len(self._entries) > self.max_entries or (
+                    self.max_bytes is not None and self.nbytes > self.max_bytes and len(self._entries) > 1):
+                evicted, _ = self._entries.popitem(last=False)
+                self.nbytes -= self._sizes.pop(evicted)
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        value = compute()
+        self.put(key, value)
+        return value
+
+    # Copy the entries of dataset version `old` for which `keep(key)` is true
+    # to version `new`, for keys of the form (version, ...)
+    def copy_version(self, old, new, keep):
+        with self._lock:
+            kept = [(key, value) for key, value in self._entries.items()
+                    if isinstance(key, tuple) and key and key[0] == old and keep(key)]
+        for key, value in kept:
+            self.put((new,) + key[1:], value)
+        return len(kept)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+# Content hash of an aggregation result (DataFrame, or dict of arrays for
+# the histograms), so identical results share one rendered image
+def result_hash(result):
+    h = hashlib.sha1()
+    if isinstance(result, pd.DataFrame):
+        h.update(repr(list(zip(result.columns, map(str, result.dtypes)))).encode())
+        h.update(pd.util.hash_pandas_object(result, index=True).to_numpy().tobytes())
+    elif isinstance(result, dict):
+        for key in sorted(result):
+            value = np.asarray(result[key])
+            h.update(f"{key}:{value.dtype}:".encode())
+            h.update(value.tobytes())
+    else:
+        h.update(repr(result).encode())
+    return h.hexdigest()
+
+
+# Figure cache key of a chart: (chart, result hash, size, theme, format)
+def figure_key(name, result, figsize=None, theme=None, fmt="png"):
+    return (name, result_hash(result), tuple(figsize) if figsize else None, theme, fmt)
@@ -0,0 +1,103 @@
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import zlib
+
+
+# On-disk store of precomputed aggregation results (see precompute.py): one
+# SQLite file holding every (dataset version, filter selection, result name)
+# computed by the batch job, each result pickled and zlib-compressed. The
+# file is only ever written by the batch job and only read by the dashboard,
+# so it must come from a trusted location.
+
+STORE_FILE = "precomputed.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    version TEXT NOT NULL,
+    selection TEXT NOT NULL,
+    name TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (version, selection, name)
+)
+"""
+
+
+# Text form of a selection_key() tuple, the store's lookup column
+def encode_key(key):
+    return json.dumps(key, separators=(",", ":"))
+
+
+def encode_result(result):
+    return zlib.compress(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def decode_result(payload):
+    return pickle.loads(zlib.decompress(payload))
+
+
+# Write the results of one batch run into a fresh store file and swap it in
+# atomically, so the dashboard never reads a half-written store.
+# `rows` yields (selection key, result name, result).
+def write_store(path, version, rows):
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    connection = sqlite3.connect(tmp_path)
+    try:
+        connection.execute(SCHEMA)
+        connection.executemany(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+            ((version, encode_key(key), name, encode_result(result)) for key, name, result in rows))
+        connection.commit()
+    except BaseException:
+        connection.close()
+        os.remove(tmp_path)
+        raise
+    connection.close()
+    os.replace(tmp_path, path)
+
+
+# Read-only view of a store file, shared by all sessions. Lookups of
+# selections or versions the batch job did not cover return `default`.
+class PrecomputedStore:
+    def __init__(self, path):
+        self.path = path
+        self._connection = None
+        self._identity = None
+        self._lock = threading.Lock()
+
+    # Connection to the current store file, reopened after the batch job has
+    # swapped in a new one
+    def _connect(self):
+        stat = os.stat(self.path)
+        identity = (stat.st_ino, stat.st_mtime_ns)
+        if self._connection is None or identity != self._identity:
+            if self._connection is not None:
+                self._connection.close()
+            self._connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._identity = identity
+        return self._connection
+
+    def get(self, version, key, name, default=None):
+        if version is None or not os.path.exists(self.path):
+            return default
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT payload FROM results WHERE version = ? AND selection = ? AND name = ?",
+                (version, encode_key(key), name)).fetchone()
+        return default if row is None else decode_result(row[0])
+
+    def versions(self):
+        if not os.path.exists(self.path):
+            return []
+        with self._lock:
+            return [row[0] for row in self._connect().execute("SELECT DISTINCT version FROM results")]
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
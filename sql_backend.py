@@ -0,0 +1,491 @@
+import argparse
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from aggregations import VISUALIZATIONS
+from binning import (AGE_EDGES, AGE_LABELS, AGE_OTHER, PROJECT_EDGES, PROJECT_LABELS, RATING_SCORES,
+                     SALARY_EDGES, SALARY_LABELS, TENURE_EDGES, TENURE_LABELS, TENURE_OTHER)
+from cohorts import DIMENSIONS
+from data_loader import CHUNK_SIZE, SNAPSHOT_DIR, load_snapshot, snapshot_version
+from employee_facts import _weighted_median, rating_label
+from timeseries import HeadcountSeries
+
+
+# SQL data source for the dashboard. The employee dataset lives in a SQLite
+# or DuckDB database as normalized tables, and the sidebar filters, Key
+# Metrics and every visualization aggregation run there as SQL; only the
+# small result sets come back into Python, in the same shape the pandas
+# aggregations return.
+#
+# Tables:
+#   employees(emp_no, birth_day, sex, hire_day, no_of_projects,
+#             Last_performance_rating, left, last_day, hire_year, last_year)
+#   departments(dept_id, dept_name)
+#   titles(title_id, title)
+#   assignments(row_id, emp_no, dept_id, title_id, salary)
+#   meta(key, value)
+# Dates are stored as day numbers (days since 1970-01-01) plus their years,
+# so the same queries run unchanged on both engines. `row_id` keeps the
+# order of the source rows, which decides an employee's "first" row.
+
+ENGINES = ("sqlite", "duckdb")
+
+# Column of the filtered view each sidebar (and chart) filter applies to.
+# The salary_range chart filter is a subquery instead (see _salary_range_clause).
+FILTER_COLUMNS = {
+    "dept_name": "d.dept_name",
+    "title": "t.title",
+    "left": 'e."left"',
+    "sex": "e.sex",
+    "hire_year": "e.hire_year",
+    "exit_year": "e.last_year",
+}
+
+FILTERED_VIEW = """
+filtered AS (
+    SELECT a.row_id, a.emp_no, d.dept_name, t.title, a.salary,
+           e.sex, e.no_of_projects, e.Last_performance_rating, e."left", e.hire_year, e.last_year,
+           (COALESCE(e.last_day, (SELECT MAX(last_day) FROM employees)) - e.hire_day) / 365.0 AS tenure,
+           (e.last_day - e.birth_day) / 365.0 AS age
+    FROM assignments a
+    JOIN employees e ON e.emp_no = a.emp_no
+    LEFT JOIN departments d ON d.dept_id = a.dept_id
+    LEFT JOIN titles t ON t.title_id = a.title_id
+    {where}
+)"""
+
+# First assignment row of every filtered employee
+FIRST_ROWS_VIEW = """
+first_rows AS (
+    SELECT f.* FROM filtered f
+    JOIN (SELECT MIN(row_id) AS row_id FROM filtered GROUP BY emp_no) m ON m.row_id = f.row_id
+)"""
+
+EMPLOYEE_COLUMNS = ["emp_no", "birth_date", "sex", "hire_date", "no_of_projects",
+                    "Last_performance_rating", "left", "last_date"]
+
+
+def _day_numbers(dates):
+    dates = pd.to_datetime(dates, errors="coerce")
+    return ((dates - pd.Timestamp("1970-01-01")).dt.days).astype("Int64")
+
+
+# Normalized tables of the employee dataset (one row per assignment in `df`)
+def normalize(df):
+    first = df.drop_duplicates(subset="emp_no")
+    hire, last = pd.to_datetime(first["hire_date"]), pd.to_datetime(first["last_date"])
+    employees = pd.DataFrame({
+        "emp_no": first["emp_no"].astype("int64"),
+        "birth_day": _day_numbers(first["birth_date"]),
+        "sex": first["sex"].astype("object"),
+        "hire_day": _day_numbers(hire),
+        "no_of_projects": first["no_of_projects"].astype("Int64"),
+        "Last_performance_rating": first["Last_performance_rating"].astype("object"),
+        "left": first["left"].astype("Int64"),
+        "last_day": _day_numbers(last),
+        "hire_year": hire.dt.year.astype("Int64"),
+        "last_year": last.dt.year.astype("Int64"),
+    })
+    dept_codes, dept_names = pd.factorize(df["dept_name"], sort=True)
+    title_codes, title_names = pd.factorize(df["title"], sort=True)
+    tables = {
+        "employees": employees,
+        "departments": pd.DataFrame({"dept_id": np.arange(len(dept_names)), "dept_name": list(dept_names)}),
+        "titles": pd.DataFrame({"title_id": np.arange(len(title_names)), "title": list(title_names)}),
+        "assignments": pd.DataFrame({
+            "row_id": np.arange(len(df), dtype=np.int64),
+            "emp_no": df["emp_no"].to_numpy(dtype=np.int64),
+            "dept_id": pd.Series(dept_codes).where(dept_codes >= 0).astype("Int64"),
+            "title_id": pd.Series(title_codes).where(title_codes >= 0).astype("Int64"),
+            "salary": df["salary"].astype("Int64").array,
+        }),
+    }
+    return tables
+
+
+def _engine(connection):
+    return "sqlite" if isinstance(connection, sqlite3.Connection) else "duckdb"
+
+
+def _write_table(connection, name, frame):
+    if _engine(connection) == "sqlite":
+        frame.to_sql(name, connection, index=False, if_exists="replace")
+    else:
+        connection.register("_frame", frame)
+        connection.execute(f"CREATE OR REPLACE TABLE {name} AS SELECT * FROM _frame")
+        connection.unregister("_frame")
+
+
+# Write the dataset into `connection` as normalized tables, replacing any
+# previous copy. `version` identifies the data (e.g. the source content
+# hash) and versions the dashboard's cached results.
+def write_database(connection, df, version):
+    for name, frame in normalize(df).items():
+        _write_table(connection, name, frame)
+    _write_table(connection, "meta", pd.DataFrame({"key": ["version"], "value": [str(version)]}))
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_employees_emp_no ON employees (emp_no)")
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_assignments_emp_no ON assignments (emp_no)")
+    if _engine(connection) == "sqlite":
+        connection.commit()
+
+
+# Open a database file; the engine follows the extension (.duckdb / .db)
+def connect(path, engine=None, read_only=False):
+    engine = engine or ("duckdb" if path.endswith(".duckdb") else "sqlite")
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown SQL engine {engine!r}; expected one of {ENGINES}")
+    if engine == "duckdb":
+        import duckdb
+        return duckdb.connect(path, read_only=read_only)
+    if read_only:
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    return sqlite3.connect(path, check_same_thread=False)
+
+
+# CASE expression giving the bin index of `expr` for right-closed bins
+# (edges[i], edges[i + 1]], or -1 outside them (see binning.bin_codes)
+def _bin_case(expr, edges, include_lowest=True):
+    whens = []
+    for i, (lo, hi) in enumerate(zip(edges[:-1], edges[1:])):
+        lower = ">=" if i == 0 and include_lowest else ">"
+        whens.append(f"WHEN {expr} {lower} {lo!r} AND {expr} <= {hi!r} THEN {i}")
+    return f"CASE {' '.join(whens)} ELSE -1 END"
+
+
+# Per-bin counts from (code, count) rows as one entry per label; codes of -1
+# go to `other`, or are dropped when there is none
+def _bin_counts(frame, labels, other=None):
+    counts = dict(zip(frame.iloc[:, 0].astype(int), frame.iloc[:, 1].astype(int)))
+    result = [counts.get(i, 0) for i in range(len(labels))]
+    if other is not None:
+        return list(labels) + [other], result + [counts.get(-1, 0)]
+    return list(labels), result
+
+
+def _float(value):
+    return np.nan if value is None or pd.isna(value) else float(value)
+
+
+# Filters, Key Metrics and visualization aggregations answered by SQL
+# queries against a database written by write_database(). Safe to share
+# between sessions: queries are serialized on the one connection.
+class SqlBackend:
+    def __init__(self, connection):
+        self.connection = connection
+        self.engine = _engine(connection)
+        self._lock = threading.Lock()
+        self.version = self._query("SELECT value FROM meta WHERE key = 'version'").iloc[0, 0]
+        self.columns = EMPLOYEE_COLUMNS + ["dept_name", "title", "salary", "tenure"]
+
+    @classmethod
+    def open(cls, path, engine=None):
+        return cls(connect(path, engine, read_only=True))
+
+    # Integer floor of a non-negative expression. SQLite may be built without
+    # FLOOR but truncates on CAST; DuckDB rounds on CAST.
+    def _floor(self, expr):
+        if self.engine == "sqlite":
+            return f"CAST({expr} AS INTEGER)"
+        return f"CAST(FLOOR({expr}) AS BIGINT)"
+
+    # `expr` rounded half to even, like pandas' round()
+    def _round(self, expr):
+        floor = self._floor(expr)
+        return (f"CASE WHEN {expr} - {floor} > 0.5 THEN {floor} + 1 "
+                f"WHEN {expr} - {floor} < 0.5 THEN {floor} "
+                f"ELSE {floor} + {floor} % 2 END")
+
+    # Employees whose average salary over all of their rows falls in one of
+    # the given salary ranges (see filters.salary_bands)
+    def _salary_range_clause(self, values):
+        codes = [SALARY_LABELS.index(value) for value in values if value in SALARY_LABELS] or [-2]
+        band = _bin_case(self._round("AVG(salary)"), SALARY_EDGES, include_lowest=False)
+        return (f"a.emp_no IN (SELECT emp_no FROM assignments GROUP BY emp_no "
+                f"HAVING {band} IN ({', '.join(map(str, codes))}))")
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            cursor = self.connection.execute(sql, list(params))
+            rows = cursor.fetchall()
+            columns = [description[0] for description in cursor.description]
+        return pd.DataFrame(rows, columns=columns)
+
+    # Run `body` against the rows matching `selection`, available as the
+    # `filtered` view (and `first_rows` with `first_rows=True`)
+    def _select(self, body, selection=None, params=(), first_rows=False):
+        clauses, filter_params = [], []
+        for col, values in (selection or {}).items():
+            if values is None or not len(values):
+                continue
+            if col == "salary_range":
+                clauses.append(self._salary_range_clause(values))
+                continue
+            clauses.append(f"{FILTER_COLUMNS[col]} IN ({', '.join('?' * len(values))})")
+            filter_params.extend(value.item() if hasattr(value, "item") else value for value in values)
+        views = [FILTERED_VIEW.format(where="WHERE " + " AND ".join(clauses) if clauses else "")]
+        if first_rows:
+            views.append(FIRST_ROWS_VIEW)
+        return self._query(f"WITH {','.join(views)}\n{body}", filter_params + list(params))
+
+    # Distinct values of a filter column, for the sidebar options
+    def values(self, col):
+        table = {"dept_name": "departments", "title": "titles"}.get(col, "employees")
+        column = FILTER_COLUMNS[col].split(".")[1]
+        return self._query(f"SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL "
+                           f"ORDER BY {column}").iloc[:, 0].tolist()
+
+    def visualization(self, name, selection=None):
+        if name not in VISUALIZATIONS:
+            raise KeyError(f"Unknown visualization {name!r}")
+        return getattr(self, name)(selection)
+
+    # All 16 Key Metrics tiles (see employee_facts.compute_kpis)
+    def kpis(self, selection=None):
+        score = " ".join(f"WHEN '{label}' THEN {value}" for label, value in RATING_SCORES.items())
+        totals = self._select(f"""
+            SELECT COUNT(DISTINCT emp_no) AS total,
+                   COUNT(DISTINCT CASE WHEN "left" = 1 THEN emp_no END) AS left_count,
+                   COUNT(DISTINCT CASE WHEN "left" = 0 THEN emp_no END) AS stayed,
+                   COUNT(DISTINCT dept_name) AS departments,
+                   AVG(tenure) AS avg_tenure,
+                   AVG(CASE WHEN "left" = 1 THEN tenure END) AS avg_tenure_left,
+                   MIN(tenure) AS tenure_min, MAX(tenure) AS tenure_max,
+                   AVG(CASE WHEN "left" = 1 THEN age END) AS avg_age_left,
+                   SUM(CASE Last_performance_rating {score} ELSE 0 END) AS rating_sum,
+                   SUM(CASE WHEN Last_performance_rating IS NOT NULL THEN 1 ELSE 0 END) AS rating_rows,
+                   MIN(salary) AS salary_min, MAX(salary) AS salary_max,
+                   COUNT(DISTINCT CASE WHEN title = 'Manager' THEN emp_no END) AS managers
+            FROM filtered""", selection).iloc[0]
+        per_employee = self._select("""
+            SELECT SUM(CASE WHEN n_rows > 1 THEN 1 ELSE 0 END) AS multi_department,
+                   AVG(salary_mean) AS avg_salary, AVG(projects) AS avg_projects
+            FROM (SELECT emp_no, COUNT(*) AS n_rows, AVG(salary) AS salary_mean,
+                         AVG(no_of_projects) AS projects
+                  FROM filtered GROUP BY emp_no) per_employee""", selection).iloc[0]
+        tenure = self._select("SELECT tenure, COUNT(*) AS n FROM filtered WHERE tenure IS NOT NULL GROUP BY tenure",
+                              selection)
+
+        total, left_count = int(totals["total"]), int(totals["left_count"])
+        rating_rows = _float(totals["rating_rows"])
+        return {
+            "total_employees": total,
+            "employees_left": left_count,
+            "employees_stayed": int(totals["stayed"]),
+            "multi_department": int(per_employee["multi_department"]) if total else 0,
+            "departments": int(totals["departments"]),
+            "avg_salary": _float(per_employee["avg_salary"]),
+            "avg_tenure": _float(totals["avg_tenure"]),
+            "median_tenure": _weighted_median(tenure["tenure"].to_numpy(dtype=float),
+                                              tenure["n"].to_numpy(dtype=float)),
+            "avg_tenure_left": _float(totals["avg_tenure_left"]),
+            "tenure_min": _float(totals["tenure_min"]),
+            "tenure_max": _float(totals["tenure_max"]),
+            "avg_age_left": _float(totals["avg_age_left"]),
+            "avg_projects": _float(per_employee["avg_projects"]),
+            "avg_rating": rating_label(_float(totals["rating_sum"]) / rating_rows if rating_rows else np.nan),
+            "salary_min": _float(totals["salary_min"]),
+            "salary_max": _float(totals["salary_max"]),
+            "attrition_rate": (left_count / total) * 100.00 if total else np.nan,
+            "total_managers": int(totals["managers"]),
+        }
+
+    # Distinct employees per group of `key` (rows with a missing key are
+    # left out), largest group first
+    def _distinct_by(self, key, count_name, selection, where="TRUE"):
+        return self._select(f"""
+            SELECT {key}, COUNT(DISTINCT emp_no) AS {count_name} FROM filtered
+            WHERE {key} IS NOT NULL AND {where}
+            GROUP BY {key} ORDER BY {count_name} DESC, {key}""", selection)
+
+    # Histogram with numpy's bin edges, counted in the database
+    def _histogram(self, column, selection, bins=15):
+        lo, hi, n = self._select(f"SELECT MIN({column}), MAX({column}), COUNT({column}) FROM first_rows",
+                                 selection, first_rows=True).iloc[0]
+        if not n:
+            return dict(zip(("counts", "edges"), np.histogram([], bins=bins)))
+        if lo == hi:
+            counts, edges = np.histogram([float(lo)], bins=bins)
+            return {"counts": counts * int(n), "edges": edges}
+        edges = np.linspace(float(lo), float(hi), bins + 1)
+        whens = " ".join(f"WHEN {column} < ? THEN {i}" for i in range(bins - 1))
+        frame = self._select(f"""
+            SELECT CASE {whens} ELSE {bins - 1} END AS bin, COUNT(*) AS n FROM first_rows
+            WHERE {column} IS NOT NULL GROUP BY 1""", selection, params=edges[1:-1].tolist(), first_rows=True)
+        counts = np.zeros(bins, dtype=np.int64)
+        counts[frame["bin"].astype(int).to_numpy()] = frame["n"].to_numpy(dtype=np.int64)
+        return {"counts": counts, "edges": edges}
+
+    # Hire/exit totals per year of the filtered employees' first rows
+    def _headcount(self, selection, freq):
+        if freq != "year":
+            raise ValueError("The SQL backend computes yearly series only")
+        hires = self._select("""
+            SELECT hire_year AS period, COUNT(*) AS n, SUM(salary) AS salary FROM first_rows
+            WHERE hire_year IS NOT NULL GROUP BY hire_year""", selection, first_rows=True)
+        leaves = self._select("""
+            SELECT last_year AS period, COUNT(*) AS n, SUM(salary) AS salary FROM first_rows
+            WHERE "left" = 1 AND last_year IS NOT NULL GROUP BY last_year""", selection, first_rows=True)
+        totals = [frame.set_index("period")[col].astype(float).rename_axis(None)
+                  for frame in (hires, leaves) for col in ("n", "salary")]
+        return HeadcountSeries.from_totals(*totals, freq=freq).table()
+
+    # Visualization 1: Employee Turnover by Age Group
+    def age_group_turnover(self, selection=None, edges=AGE_EDGES):
+        frame = self._select(f"""
+            SELECT {_bin_case('age', edges)} AS code, COUNT(DISTINCT emp_no) AS n FROM filtered
+            WHERE "left" = 1 GROUP BY 1""", selection)
+        labels, counts = _bin_counts(frame, AGE_LABELS, AGE_OTHER)
+        result = pd.DataFrame({"age_group": labels, "NO_OF_EMP": counts})
+        result["PCT"] = (result["NO_OF_EMP"] * 100.00) / result["NO_OF_EMP"].sum()
+        return result
+
+    # Visualization 2: Year-wise Attrition Rate
+    def attrition_rate_trend(self, selection=None, freq="year"):
+        result = self._headcount(selection, freq).rename(columns={"period": "year"})
+        return result[result["total_emp"] > 0]
+
+    # Visualization 3: Gender Distribution
+    def gender_distribution(self, selection=None):
+        frame = self._select("SELECT sex, COUNT(*) AS n FROM filtered GROUP BY sex", selection)
+        counts = dict(zip(frame["sex"], frame["n"].astype(int)))
+        result = pd.DataFrame({"gender": ["Female", "Male"], "total_no": [counts.get("F", 0), counts.get("M", 0)]})
+        result["pct"] = (result["total_no"] * 100) / result["total_no"].sum()
+        return result
+
+    # Visualization 4: Performance Rating Distribution
+    def performance_rating_distribution(self, selection=None):
+        result = self._distinct_by("Last_performance_rating", "total_emp", selection)
+        result["pct"] = (result["total_emp"] * 100.0) / result["total_emp"].sum()
+        return result
+
+    # Visualization 5: Job Title Distribution
+    def title_distribution(self, selection=None):
+        return self._distinct_by("title", "total_emp", selection)
+
+    # Visualization 6: Projects Distribution
+    def project_distribution(self, selection=None, edges=PROJECT_EDGES):
+        frame = self._select(f"""
+            SELECT {_bin_case('no_of_projects', edges)} AS code, COUNT(DISTINCT emp_no) AS n FROM filtered
+            GROUP BY 1""", selection)
+        labels, counts = _bin_counts(frame, PROJECT_LABELS)
+        result = pd.DataFrame({"project_category": pd.Categorical(labels, categories=PROJECT_LABELS),
+                               "Total_emp": counts})
+        return result[result["Total_emp"] > 0].reset_index(drop=True)
+
+    # Visualization 7: Distribution of Employees by Tenure
+    def tenure_histogram(self, selection=None):
+        return self._histogram("tenure", selection)
+
+    # Visualization 8: Tenure Distribution
+    def tenure_group_distribution(self, selection=None, edges=TENURE_EDGES):
+        frame = self._select(f"""
+            SELECT {_bin_case('tenure', edges)} AS code, COUNT(DISTINCT emp_no) AS n FROM filtered
+            GROUP BY 1""", selection)
+        labels, counts = _bin_counts(frame, TENURE_LABELS, TENURE_OTHER)
+        result = pd.DataFrame({"tenure_group": labels, "NO_OF_EMP": counts})
+        result = result[result["NO_OF_EMP"] > 0].reset_index(drop=True)
+        result["PCT"] = (result["NO_OF_EMP"] * 100.00) / result["NO_OF_EMP"].sum()
+        return result
+
+    # Visualization 9: Hiring Trend
+    def hiring_trend(self, selection=None):
+        return self._select("""
+            SELECT hire_year, COUNT(DISTINCT emp_no) AS employee_count FROM filtered
+            WHERE hire_year IS NOT NULL GROUP BY hire_year ORDER BY hire_year""", selection)
+
+    # Visualization 10: Exit Trends
+    def exit_trend(self, selection=None):
+        return self._select("""
+            SELECT last_year AS exit_year, COUNT(*) AS total_exits FROM filtered
+            WHERE last_year IS NOT NULL GROUP BY last_year ORDER BY last_year""", selection)
+
+    # Visualization 11: Total Employees by Year
+    def total_employees_by_year(self, selection=None, freq="year"):
+        return self._headcount(selection, freq).rename(columns={"period": "years"})
+
+    # Visualization 12: Employees by Department
+    def department_headcount(self, selection=None):
+        return self._distinct_by("dept_name", "total_emp", selection)
+
+    # Visualization 13: Average Salary by Department
+    def department_avg_salary(self, selection=None):
+        return self._select("""
+            SELECT dept_name, AVG(salary) AS avg_salary, COUNT(salary) AS total_employees FROM filtered
+            WHERE dept_name IS NOT NULL GROUP BY dept_name ORDER BY avg_salary DESC, dept_name""", selection)
+
+    # Visualization 14: Managers by Department
+    def managers_by_department(self, selection=None):
+        return self._select("""
+            SELECT dept_name, COUNT(emp_no) AS total_manager FROM filtered
+            WHERE title = 'Manager' AND dept_name IS NOT NULL
+            GROUP BY dept_name ORDER BY total_manager DESC, dept_name""", selection)
+
+    # Visualization 15: Year-wise Average Salary
+    def salary_by_year(self, selection=None, freq="year"):
+        return self._headcount(selection, freq).rename(columns={"period": "years"})
+
+    # Visualization 16: Distribution of Employees by salary
+    def salary_histogram(self, selection=None):
+        return self._histogram("salary", selection)
+
+    # Visualization 17: Salary by Job Title
+    def title_avg_salary(self, selection=None):
+        return self._select("""
+            SELECT title, AVG(salary) AS avg_sal
+            FROM (SELECT title, emp_no, AVG(salary) AS salary FROM filtered
+                  WHERE title IS NOT NULL GROUP BY title, emp_no) per_employee
+            GROUP BY title ORDER BY avg_sal DESC, title""", selection)
+
+    # Visualization 18: Salary by Performance Rating
+    def rating_avg_salary(self, selection=None):
+        return self._select("""
+            SELECT Last_performance_rating, AVG(salary) AS avg_salary, COUNT(*) AS employee_count
+            FROM first_rows WHERE Last_performance_rating IS NOT NULL
+            GROUP BY Last_performance_rating ORDER BY Last_performance_rating""", selection, first_rows=True)
+
+    # Visualization 19: Employees by Salary Range. Average salaries are
+    # rounded half to even, like pandas.
+    def salary_range_distribution(self, selection=None, edges=SALARY_EDGES):
+        frame = self._select(f"""
+            SELECT {_bin_case('rounded', edges, include_lowest=False)} AS code, COUNT(*) AS n
+            FROM (SELECT {self._round("avg_salary")} AS rounded
+                  FROM (SELECT emp_no, AVG(salary) AS avg_salary FROM filtered GROUP BY emp_no) per_employee
+                  ) rounded_salaries
+            GROUP BY 1""", selection)
+        labels, counts = _bin_counts(frame, SALARY_LABELS)
+        return pd.DataFrame({"salary_range": pd.Categorical(labels, categories=SALARY_LABELS), "NO_OF_EMP": counts})
+
+    # Spells of the cohort analysis (cohorts.py): employees per cohort,
+    # tenure and exit, counted once per employee and cohort
+    def cohort_spells(self, by, selection=None):
+        if by not in DIMENSIONS:
+            raise KeyError(f"Unknown cohort dimension {by!r}; expected one of {list(DIMENSIONS)}")
+        return self._select(f"""
+            SELECT {by} AS cohort, tenure AS duration, "left" = 1 AS event, COUNT(DISTINCT emp_no) AS n
+            FROM filtered WHERE {by} IS NOT NULL AND tenure IS NOT NULL
+            GROUP BY 1, 2, 3""", selection)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the employee dataset into a SQLite or DuckDB database")
+    parser.add_argument("source", help="employee CSV link or path")
+    parser.add_argument("database", help="database file to write (.duckdb for DuckDB, otherwise SQLite)")
+    parser.add_argument("--engine", choices=ENGINES, default=None)
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    df = load_snapshot(args.source, snapshot_dir=args.snapshot_dir, chunksize=args.chunk_size)
+    connection = connect(args.database, args.engine)
+    try:
+        write_database(connection, df, snapshot_version(args.snapshot_dir))
+    finally:
+        connection.close()
+    print(f"Wrote {len(df):,} rows to {args.database}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+
+# Synthetic employee datasets with the same schema as the dashboard's CSV:
+# one row per employee and department/title/salary assignment.
+
+DEPARTMENTS = ['Customer Service', 'Development', 'Finance', 'Human Resources', 'Marketing',
+               'Production', 'Quality Management', 'Research', 'Sales']
+TITLES = ['Assistant Engineer', 'Engineer', 'Manager', 'Senior Engineer', 'Senior Staff',
+          'Staff', 'Technique Leader']
+RATINGS = ['PIP', 'C', 'B', 'S', 'A']
+
+START_DATE = np.datetime64('1985-01-01')
+END_DATE = np.datetime64('2013-12-31')
+
+
+# Generate roughly `n_rows` assignment rows (each employee gets 1-3 rows)
+def generate_employees(n_rows, seed=0, attrition=0.1, first_emp_no=10001):
+    rng = np.random.default_rng(seed)
+    n_employees = max(1, n_rows // 2)
+    span = int((END_DATE - START_DATE).astype(int))
+
+    hire = START_DATE + rng.integers(0, span - 365, n_employees).astype('timedelta64[D]')
+    birth = hire - rng.integers(21 * 365, 45 * 365, n_employees).astype('timedelta64[D]')
+    left = rng.random(n_employees) < attrition
+    stay_days = rng.integers(90, span, n_employees).astype('timedelta64[D]')
+    last = np.minimum(hire + stay_days, END_DATE)
+    last = np.where(left, last, np.datetime64('NaT'))
+
+    assignments = rng.integers(1, 4, n_employees)
+    # Trim or pad the assignment counts so the row count comes out exact
+    surplus = assignments.sum() - n_rows
+    while surplus != 0:
+        step = rng.integers(0, n_employees, abs(surplus))
+        np.add.at(assignments, step, -1 if surplus > 0 else 1)
+        assignments = np.maximum(assignments, 1)
+        surplus = assignments.sum() - n_rows
+    rows = np.repeat(np.arange(n_employees), assignments)
+
+    return pd.DataFrame({
+        'emp_no': (first_emp_no + rows).astype(np.int64),
+        'birth_date': birth[rows],
+        'sex': rng.choice(['M', 'F'], n_employees, p=[0.6, 0.4])[rows],
+        'hire_date': hire[rows],
+        'no_of_projects': rng.integers(1, 11, n_employees)[rows],
+        'Last_performance_rating': rng.choice(RATINGS, n_employees)[rows],
+        'left': left.astype(np.int64)[rows],
+        'last_date': last[rows],
+        'dept_name': rng.choice(DEPARTMENTS, len(rows)),
+        'title': rng.choice(TITLES, len(rows), p=[0.1, 0.2, 0.05, 0.2, 0.2, 0.2, 0.05]),
+        'salary': rng.integers(40000, 129000, len(rows)),
+    })
+
+
+# Write a synthetic dataset as CSV, with dates formatted like the source
+def write_csv(df, path):
+    df.to_csv(path, index=False, date_format='%Y-%m-%d')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic employee dataset")
+    parser.add_argument("rows", type=int, help="number of assignment rows")
+    parser.add_argument("output", help="CSV file to write")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--attrition", type=float, default=0.1)
+    args = parser.parse_args()
+    write_csv(generate_employees(args.rows, seed=args.seed, attrition=args.attrition), args.output)
+
+
+if __name__ == "__main__":
+    main()
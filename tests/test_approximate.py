@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+import analytics
+from aggregations import VISUALIZATIONS
+from approximate import (HLL_PRECISION, SketchCube, StreamingHistogram, _stratified_sample, estimate_count,
+                         hll_error, hll_positions)
+from data_loader import prepare_data
+from synthetic_data import generate_employees
+
+
+def hll_registers(keys, precision=HLL_PRECISION):
+    registers = np.zeros(1 << precision, dtype=np.uint8)
+    index, rank = hll_positions(keys, precision)
+    np.maximum.at(registers, index, rank)
+    return registers
+
+
+@pytest.mark.parametrize("cardinality", [1, 100, 5_000, 40_000, 200_000, 1_000_000])
+def test_hll_estimate_within_bound(cardinality):
+    keys = np.random.default_rng(cardinality).choice(10 ** 9, cardinality, replace=False)
+    # Repeated keys do not change the estimate
+    estimate = estimate_count(hll_registers(np.concatenate([keys, keys[: cardinality // 2]])))
+    assert abs(estimate - cardinality) <= hll_error(cardinality)
+
+
+@pytest.mark.parametrize("precision", [10, 12])
+def test_hll_error_bound_holds_for_most_key_sets(precision):
+    # The bound is about 95%: count how often 40 random key sets exceed it
+    rng = np.random.default_rng(precision)
+    misses = sum(abs(estimate_count(hll_registers(rng.choice(10 ** 9, 50_000, replace=False), precision)) - 50_000)
+                 > hll_error(50_000, precision) for _ in range(40))
+    assert misses <= 6
+
+
+def test_hll_registers_merge_to_the_union():
+    keys = np.arange(0, 120_000)
+    merged = np.maximum(hll_registers(keys[:80_000]), hll_registers(keys[40_000:]))
+    np.testing.assert_array_equal(merged, hll_registers(keys))
+
+
+def test_streaming_histogram_median_within_half_a_bin():
+    rng = np.random.default_rng(3)
+    for values in (rng.gamma(2.0, 3.0, 10_001), rng.uniform(0, 40, 4_000), np.array([2.5, 7.5])):
+        lo, hi = values.min(), values.max()
+        halves = np.array_split(values, 2)
+        # Histograms of two parts merge by adding their counts
+        counts = sum(np.bincount(StreamingHistogram.bin_of(part, lo, hi), minlength=1024) for part in halves)
+        histogram = StreamingHistogram(lo, hi, counts, lo, hi)
+        assert abs(histogram.median() - np.median(values)) <= histogram.resolution / 2 + 1e-12
+
+
+def test_stratified_sample_uses_the_same_rate_in_every_stratum():
+    strata = np.repeat(np.arange(1, 6), [5_000, 2_000, 300, 7, 1])
+    keep, population, sampled = _stratified_sample(strata, 731, seed=1)
+    np.testing.assert_array_equal(population[1:], [5_000, 2_000, 300, 7, 1])
+    np.testing.assert_array_equal(np.bincount(strata[keep], minlength=6), sampled)
+    assert len(np.unique(keep)) == len(keep)
+    # About 10% of every stratum, and at least one employee of each
+    np.testing.assert_array_equal(sampled[1:], [500, 200, 30, 1, 1])
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    df = prepare_data(generate_employees(60_000, seed=4))
+    return df, SketchCube(df, sample_employees=5_000, seed=0)
+
+
+SELECTIONS = [
+    analytics.make_filters(),
+    analytics.make_filters(["Sales", "Development"], "Left"),
+    analytics.make_filters([], "Stayed", ["Engineer"], "F"),
+]
+
+
+@pytest.mark.parametrize("selection", SELECTIONS)
+def test_approximate_kpis_within_bounds(dataset, selection):
+    df, cube = dataset
+    exact = analytics.compute_kpis(df, selection)
+    approximate, bounds = cube.kpis(selection)
+    # Sketch estimates; the sampled ones are checked over many samples below
+    for key in ("total_employees", "employees_left", "employees_stayed", "attrition_rate", "total_managers",
+                "median_tenure"):
+        assert abs(approximate[key] - exact[key]) <= bounds[key] + 1e-9, key
+    for key in ("departments", "avg_tenure", "tenure_min", "tenure_max", "salary_min", "salary_max", "avg_rating"):
+        assert approximate[key] == pytest.approx(exact[key]), key
+
+
+def test_sampled_kpi_bounds_hold_for_most_samples(dataset):
+    df, _ = dataset
+    selection = SELECTIONS[1]
+    exact = analytics.compute_kpis(df, selection)
+    misses = 0
+    for seed in range(20):
+        approximate, bounds = SketchCube(df, sample_employees=5_000, seed=seed).kpis(selection)
+        misses += sum(abs(approximate[key] - exact[key]) > bounds[key]
+                      for key in ("multi_department", "avg_salary", "avg_projects"))
+    assert misses <= 9
+
+
+def test_approximate_tenure_histogram_within_bound(dataset):
+    df, cube = dataset
+    selection = analytics.make_filters(["Sales"])
+    exact = VISUALIZATIONS["tenure_histogram"](analytics.filter_frame(df, selection))
+    approximate, bound = cube.visualization("tenure_histogram", selection)
+    # The tenure range comes from the cells, so the bars line up
+    np.testing.assert_allclose(approximate["edges"], exact["edges"])
+    assert np.abs(approximate["counts"] - exact["counts"]).max() <= bound
+
+
+def test_approximate_salary_histogram_within_bound(dataset):
+    df, cube = dataset
+    selection = analytics.make_filters(["Sales"])
+    exact = VISUALIZATIONS["salary_histogram"](analytics.filter_frame(df, selection))
+    approximate, bound = cube.visualization("salary_histogram", selection)
+    # The salary range is the sample's, which can be narrower than the
+    # exact one, so only the totals are compared
+    assert abs(approximate["counts"].sum() - exact["counts"].sum()) <= bound * 3
+
+
+def test_chart_filters_are_not_covered(dataset):
+    _, cube = dataset
+    assert cube.kpis({"hire_year": [1990]}) is None
+    assert cube.visualization("salary_histogram", {"salary_range": ["60k-80k"]}) is None
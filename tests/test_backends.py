@@ -0,0 +1,97 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import analytics
+from aggregations import VISUALIZATIONS
+from binning import SALARY_LABELS
+from data_loader import optimize_dtypes, prepare_data
+from employee_model import EmployeeModel
+from filters import DERIVED_FILTERS, FilterIndex, filter_column, sidebar_selection
+from sql_backend import SqlBackend, connect, write_database
+from synthetic_data import generate_employees
+
+
+# The frame path (analytics.py), the normalized model (employee_model.py)
+# and the SQL backend (sql_backend.py) must give the same Key Metrics and
+# visualizations, row order included, for any selection.
+
+@pytest.fixture(scope="module")
+def backends(tmp_path_factory):
+    raw = generate_employees(6_001, seed=2)
+    df = prepare_data(raw.copy())
+    connection = connect(str(tmp_path_factory.mktemp("sql") / "employees.sqlite"))
+    write_database(connection, optimize_dtypes(raw.copy()), "test")
+    yield df, EmployeeModel(df), SqlBackend(connection)
+    connection.close()
+
+
+def _grid():
+    sidebar = [sidebar_selection(*widgets) for widgets in itertools.product(
+        [[], ["Sales"], ["Development", "Research"]], ["All", "Left", "Stayed"], [[], ["Engineer"]], ["All", "F"])]
+    chart = [{"hire_year": [1995]}, {"exit_year": [2000]}, {"salary_range": [SALARY_LABELS[1]]},
+             {"dept_name": ["Sales"], "exit_year": [2000, 2001]}, {"hire_year": [1990, 1991], "sex": ["M"]},
+             {"title": ["Manager"], "left": [1]}, {"dept_name": ["No such department"]}]
+    return sidebar[::3] + chart
+
+
+GRID = _grid()
+
+
+def assert_same_result(expected, got, label):
+    if isinstance(expected, dict):
+        np.testing.assert_array_equal(expected["counts"], got["counts"], err_msg=label)
+        np.testing.assert_allclose(expected["edges"], got["edges"], err_msg=label)
+        return
+    expected, got = expected.reset_index(drop=True), got.reset_index(drop=True)
+    for frame in (expected, got):
+        for col in frame.columns:
+            if isinstance(frame[col].dtype, pd.CategoricalDtype):
+                frame[col] = frame[col].astype(str)
+    pd.testing.assert_frame_equal(expected, got, check_dtype=False, obj=label)
+
+
+def assert_same_kpis(expected, got, label):
+    assert expected.keys() == got.keys()
+    for key, value in expected.items():
+        if isinstance(value, str) or value is None:
+            assert got[key] == value, (label, key)
+        elif pd.isna(value):
+            assert pd.isna(got[key]), (label, key)
+        else:
+            assert float(got[key]) == pytest.approx(float(value), rel=1e-9, abs=1e-9), (label, key)
+
+
+@pytest.mark.parametrize("selection", GRID, ids=[str(i) for i in range(len(GRID))])
+def test_backends_agree(backends, selection):
+    df, model, sql = backends
+    filtered = analytics.filter_frame(df, selection)
+    expected = analytics.compute_kpis(df, selection)
+    assert_same_kpis(expected, model.kpis(selection), "model")
+    assert_same_kpis(expected, sql.kpis(selection), "sql")
+    for name, aggregate in VISUALIZATIONS.items():
+        result = aggregate(filtered)
+        assert_same_result(result, model.visualization(name, selection), f"model {name}")
+        assert_same_result(result, sql.visualization(name, selection), f"sql {name}")
+
+
+@pytest.mark.parametrize("n_rows", [1, 13, 1_000])
+def test_filter_bitmaps_match_boolean_masks(n_rows):
+    df = prepare_data(generate_employees(n_rows, seed=n_rows))
+    index = FilterIndex(df)
+    rng = np.random.default_rng(n_rows)
+    columns = ["dept_name", "title", "left", "sex"] + list(DERIVED_FILTERS)
+    for _ in range(30):
+        selection = {}
+        for col in rng.choice(columns, rng.integers(0, 4), replace=False):
+            values = pd.Series(filter_column(df, col)).dropna().unique().tolist()
+            picked = [values[i] for i in rng.choice(len(values), min(len(values), 2), replace=False)]
+            selection[col] = picked + (["missing"] if rng.random() < 0.3 else [])
+        rows = index.select(selection)
+        expected = analytics.filter_frame(df, selection)
+        got = df if rows is None else df.iloc[rows]
+        pd.testing.assert_frame_equal(got, expected)
+    assert index.select({"dept_name": [], "sex": None}) is None
+    assert len(index.select({"dept_name": ["No such department"]})) == 0
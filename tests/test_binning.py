@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from binning import (PROJECT_EDGES, PROJECT_LABELS, RATING_SCORES, SALARY_EDGES, SALARY_LABELS, age_groups,
+                     project_categories, rating_scores, salary_ranges, tenure_groups)
+
+
+# The row-wise binning the dashboard used before binning.py
+def apply_age_group(age):
+    if 21 <= age <= 30: return '21-30'
+    elif 30 < age <= 40: return '31-40'
+    elif 40 < age <= 50: return '41-50'
+    elif 50 < age <= 60: return '51-60'
+    else: return '60+'
+
+
+def apply_tenure_group(tenure):
+    if 1 <= tenure <= 4: return "Low Tenure(1-4)"
+    elif 4 < tenure <= 8: return "Medium Tenure(5-8)"
+    else: return "High Tenure(9+)"
+
+
+def values_with_edges(edges, low, high, n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    values = np.concatenate([rng.uniform(low, high, n), edges, np.nextafter(edges, np.inf),
+                             np.nextafter(edges, -np.inf), [np.nan, low - 1, high + 1]])
+    return pd.Series(values)
+
+
+def test_age_groups_match_row_wise_apply():
+    ages = values_with_edges([21, 30, 40, 50, 60], 15, 70)
+    expected = ages.apply(apply_age_group)
+    assert age_groups(ages).astype(str).tolist() == expected.tolist()
+
+
+def test_tenure_groups_match_row_wise_apply():
+    tenure = values_with_edges([1, 4, 8], 0, 20)
+    expected = tenure.apply(apply_tenure_group)
+    assert tenure_groups(tenure).astype(str).tolist() == expected.tolist()
+
+
+def test_project_categories_match_pd_cut():
+    projects = pd.Series(np.arange(-1, 12, 0.5))
+    expected = pd.cut(projects, bins=PROJECT_EDGES, labels=PROJECT_LABELS, right=True, include_lowest=True)
+    pd.testing.assert_series_equal(project_categories(projects), expected.cat.as_unordered().rename('project_category'))
+
+
+def test_salary_ranges_match_pd_cut():
+    salaries = values_with_edges(SALARY_EDGES, 35_000, 135_000).round()
+    expected = pd.cut(salaries, bins=SALARY_EDGES, labels=SALARY_LABELS, right=True)
+    pd.testing.assert_series_equal(salary_ranges(salaries), expected.cat.as_unordered().rename('salary_range'))
+
+
+def test_rating_scores_match_dictionary_lookup():
+    ratings = pd.Series(["A", "PIP", "B", "X", None, "S", "C", "A"], dtype="category")
+    expected = [np.nan if pd.isna(rating) else RATING_SCORES.get(rating, 0) for rating in ratings.astype(object)]
+    np.testing.assert_array_equal(rating_scores(ratings).to_numpy(), np.array(expected, dtype=float))
@@ -0,0 +1,102 @@
+import threading
+
+import matplotlib
+import numpy as np
+import pandas as pd
+import pytest
+
+import chart_pool
+from aggregations import VISUALIZATIONS
+from chart_pool import ChartPool, SharedFrame
+from charts import _style, render_figure
+from data_loader import freeze_frame, prepare_data
+from synthetic_data import generate_employees
+
+CHARTS = ["hiring_trend", "department_headcount", "salary_histogram"]
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return freeze_frame(prepare_data(generate_employees(3_000, seed=12)))
+
+
+def address(values):
+    return values.__array_interface__["data"][0]
+
+
+def test_shared_frame_is_mapped_without_copying(frame):
+    shared = SharedFrame(frame)
+    try:
+        df = chart_pool._attach(shared.handle)
+        pd.testing.assert_frame_equal(df, frame)
+        # The worker's own mapping of the block
+        start = address(np.frombuffer(chart_pool._attached["shm"].buf, dtype=np.uint8))
+        for col in ["emp_no", "salary", "tenure", "hire_date", "dept_name", "title"]:
+            values = df[col].array
+            values = values.codes if isinstance(values, pd.Categorical) else values.to_numpy()
+            assert start <= address(values) < start + shared.size, col
+        del df, values
+    finally:
+        chart_pool._detach()
+        shared.close()
+
+
+def expected_outcomes(df, theme=None):
+    results = [VISUALIZATIONS[name](df) for name in CHARTS]
+    return results, [render_figure(name, result, None, theme) for name, result in zip(CHARTS, results)]
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_pool_aggregates_queries_and_renders(frame, executor):
+    results, images = expected_outcomes(frame)
+    # From the frame, from a query and from a known result
+    tasks = [(CHARTS[0], None, (None, None, "png")),
+             (CHARTS[1], lambda: VISUALIZATIONS[CHARTS[1]](frame), (None, None, "png")),
+             (CHARTS[2], results[2], (None, None, "png"))]
+    pool = ChartPool(2, executor)
+    try:
+        outcomes = pool.run(tasks, lambda: frame)
+    finally:
+        pool.shutdown()
+    for name, expected, image, outcome in zip(CHARTS, results, images, outcomes):
+        result, got = outcome
+        if isinstance(expected, pd.DataFrame):
+            pd.testing.assert_frame_equal(result, expected, obj=name)
+        assert got == image, name
+
+
+def test_unstyled_renders_run_concurrently_and_styles_wait():
+    inside = threading.Barrier(2, timeout=5)
+    order = []
+
+    def render(theme, wait):
+        with _style.use(theme):
+            if wait:
+                inside.wait()
+            order.append((theme, matplotlib.rcParams["axes.grid"]))
+
+    default = matplotlib.rcParams["axes.grid"]
+    with _style.use(None):
+        # A second unstyled render gets in while this one is drawing
+        unstyled = threading.Thread(target=render, args=(None, True))
+        unstyled.start()
+        inside.wait()
+        unstyled.join()
+        # A styled render waits until this one has finished
+        styled = threading.Thread(target=render, args=("ggplot", False))
+        styled.start()
+        styled.join(0.2)
+        assert styled.is_alive()
+    styled.join(5)
+    assert order == [(None, default), ("ggplot", True)]
+    assert matplotlib.rcParams["axes.grid"] == default
+
+
+def test_threaded_renders_match_sequential(frame):
+    results, images = expected_outcomes(frame, theme="ggplot")
+    pool = ChartPool(3, "thread")
+    try:
+        outcomes = pool.run([(name, result, (None, "ggplot", "png")) for name, result in zip(CHARTS, results)], None)
+    finally:
+        pool.shutdown()
+    assert [image for _, image in outcomes] == images
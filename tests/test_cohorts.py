@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cohorts import cohort_spells, cohort_summary, retention_matrix, survival_curves
+
+
+# Kaplan-Meier estimate of one cohort, one distinct duration at a time
+def naive_km(durations, events):
+    rows, survival = [], 1.0
+    for time in np.unique(durations):
+        at_risk = int((durations >= time).sum())
+        exits = int(((durations == time) & events).sum())
+        survival *= 1 - exits / at_risk
+        rows.append((time, at_risk, exits, int((durations == time).sum()) - exits, survival))
+    return pd.DataFrame(rows, columns=["time", "at_risk", "exits", "censored", "survival"])
+
+
+def spells(cohorts, durations, events):
+    return pd.DataFrame({"cohort": cohorts, "duration": np.asarray(durations, dtype=float),
+                         "event": np.asarray(events, dtype=bool), "n": 1})
+
+
+def assert_matches_naive(table, curves):
+    for cohort, group in table.groupby("cohort"):
+        expected = naive_km(group["duration"].to_numpy(), group["event"].to_numpy())
+        got = curves[curves["cohort"] == cohort].reset_index(drop=True)
+        pd.testing.assert_frame_equal(got[expected.columns], expected, check_dtype=False)
+
+
+def test_tied_durations_and_a_cohort_that_fully_exits():
+    table = spells(
+        ["a"] * 6 + ["b"] * 3,
+        [1, 1, 1, 2, 3, 3, 2, 2, 5],
+        [True, True, False, True, False, True, True, True, True],
+    )
+    curves = survival_curves(table)
+    assert_matches_naive(table, curves)
+    b = curves[curves["cohort"] == "b"]
+    assert b["survival"].tolist() == pytest.approx([1 / 3, 0.0])
+    assert (curves["lower"] <= curves["survival"]).all() and (curves["survival"] <= curves["upper"]).all()
+
+
+def test_random_cohorts_match_naive_loop():
+    rng = np.random.default_rng(7)
+    n = 2000
+    table = spells(rng.choice(list("pqrstu"), n), rng.integers(0, 15, n) + rng.choice([0, 0.5], n),
+                   rng.random(n) < 0.4)
+    assert_matches_naive(table, survival_curves(table))
+
+
+def test_weighted_spells_match_expanded():
+    table = spells(["x", "x", "y", "y", "y"], [1, 2, 1, 1, 4], [True, False, True, False, True])
+    weighted = table.assign(n=[3, 2, 1, 4, 2])
+    expanded = table.loc[table.index.repeat(weighted["n"])].assign(n=1)
+    pd.testing.assert_frame_equal(survival_curves(weighted), survival_curves(expanded))
+
+
+def test_retention_matrix_and_summary():
+    table = spells(["a"] * 4 + ["b"] * 2, [0.5, 1.5, 2.5, 3.0, 0.5, 1.0], [True, True, False, False, True, True])
+    curves = survival_curves(table)
+    matrix = retention_matrix(curves, years=[1, 2, 3])
+    assert matrix.loc["a"].tolist() == pytest.approx([75.0, 50.0, 50.0])
+    # Cohort b is not followed beyond one year
+    assert matrix.loc["b", 1] == pytest.approx(0.0)
+    assert np.isnan(matrix.loc["b", 2])
+    summary = cohort_summary(curves, years=(1,)).set_index("cohort")
+    assert summary.loc["a", "employees"] == 4 and summary.loc["a", "median_tenure"] == 1.5
+    assert summary.loc["b", "left"] == 2
+
+
+def test_cohort_spells_count_each_employee_once_per_cohort():
+    df = pd.DataFrame({"emp_no": [1, 1, 1, 2], "dept_name": ["A", "A", "B", "A"],
+                       "tenure": [4.0, 4.0, 4.0, 2.0], "left": [1, 1, 1, 0]})
+    result = cohort_spells(df, "dept_name")
+    assert sorted(zip(result["cohort"], result["duration"])) == [("A", 2.0), ("A", 4.0), ("B", 4.0)]
+    with pytest.raises(KeyError):
+        cohort_spells(df, "sex")
+
+
+def test_durations_are_carried_exactly():
+    rng = np.random.default_rng(11)
+    n = 5000
+    durations = rng.random(n) * 40 + 1e-7
+    table = spells(rng.integers(0, 300, n), durations, rng.random(n) < 0.3)
+    curves = survival_curves(table)
+    for cohort, group in table.groupby("cohort"):
+        got = curves.loc[curves["cohort"] == cohort, "time"].to_numpy()
+        np.testing.assert_array_equal(got, np.unique(group["duration"]))
+    assert_matches_naive(table, curves)
+
+
+def test_negative_tenures_count_as_leaving_at_hire():
+    table = spells(["a", "a", "b", "b", "b"], [1.0, 2.0, -0.5, 1.0, 3.0], [True, False, True, False, False])
+    curves = survival_curves(table)
+    matrix = retention_matrix(curves, years=[0, 1, 2])
+    assert matrix.loc["a"].tolist() == pytest.approx([100.0, 50.0, 50.0])
+    assert matrix.loc["b"].tolist() == pytest.approx([200 / 3, 200 / 3, 200 / 3])
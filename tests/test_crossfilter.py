@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from aggregations import VISUALIZATIONS
+from cohorts import COHORT_VIEWS
+from crossfilter import CROSS_FILTERS, DEPENDENCIES, picked_values, update_cross, view_selection
+from data_loader import prepare_data
+from employee_model import EmployeeModel
+from filters import selection_key, sidebar_selection
+from synthetic_data import generate_employees
+
+VIEWS = list(VISUALIZATIONS) + ["kpis"] + list(COHORT_VIEWS)
+
+# Views a chart filter leaves alone: its source chart and the views broken
+# down by the same column
+UNAFFECTED = {
+    "dept_name": {"department_headcount", "department_avg_salary", "managers_by_department", "cohorts_dept_name"},
+    "hire_year": {"hiring_trend", "cohorts_hire_year"},
+    "exit_year": {"exit_trend"},
+    "salary_range": {"salary_range_distribution"},
+}
+
+CLICKS = {"dept_name": ["Sales"], "hire_year": [1995], "exit_year": [2001], "salary_range": ["60k-80k"]}
+
+
+def changed_views(sidebar, before, after):
+    return {name for name in VIEWS
+            if selection_key(view_selection(name, sidebar, before)) != selection_key(view_selection(name, sidebar, after))}
+
+
+def test_each_chart_filter_changes_exactly_the_dependent_views():
+    sidebar = sidebar_selection([], "Left", [], "All")
+    assert set(DEPENDENCIES) == set(VIEWS)
+    for chart, col in CROSS_FILTERS.items():
+        cross = update_cross({}, chart, CLICKS[col])
+        assert changed_views(sidebar, {}, cross) == set(VIEWS) - UNAFFECTED[col], col
+        # On top of the other chart filters, and when cleared again
+        others = {other: values for other, values in CLICKS.items() if other != col}
+        assert changed_views(sidebar, others, {**others, **cross}) == set(VIEWS) - UNAFFECTED[col], col
+        assert update_cross(cross, chart, []) == {}
+
+
+def test_department_click_narrows_the_sidebar_departments():
+    sidebar = sidebar_selection(["Sales", "Research"])
+    assert view_selection("kpis", sidebar, {"dept_name": ["Sales"]})["dept_name"] == ["Sales"]
+    assert view_selection("kpis", sidebar, {"dept_name": ["Finance"]})["dept_name"] == ["Sales", "Research"]
+
+
+def test_picked_values():
+    points = [{"hire_year": 1995.0}, {"hire_year": 1990}, {"hire_year": None}, "bad", {"hire_year": 1995}]
+    assert picked_values("hiring_trend", points) == [1990, 1995]
+    assert picked_values("department_headcount", [{"dept_name": "Sales"}]) == ["Sales"]
+    assert picked_values("exit_trend", None) == []
+
+
+def test_view_results_match_naive_masks():
+    df = prepare_data(generate_employees(4_000, seed=8, attrition=0.3))
+    model = EmployeeModel(df)
+    sidebar = sidebar_selection(["Sales", "Development"], "All", [], "All")
+    cross = {"hire_year": [1990, 1991, 1992], "exit_year": [2000, 2005], "dept_name": ["Sales"]}
+    for name in ["department_avg_salary", "hiring_trend", "exit_trend", "title_distribution", "gender_distribution"]:
+        applied = {**sidebar, **{col: values for col, values in cross.items() if name not in UNAFFECTED[col]}}
+        mask = np.ones(len(df), dtype=bool)
+        for col, values in applied.items():
+            if values:
+                mask &= df[col].isin(values).to_numpy()
+        expected = VISUALIZATIONS[name](df[mask])
+        got = model.visualization(name, view_selection(name, sidebar, cross))
+        pd.testing.assert_frame_equal(got.reset_index(drop=True), expected.reset_index(drop=True),
+                                      check_dtype=False, check_categorical=False, obj=name)
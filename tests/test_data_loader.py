@@ -0,0 +1,73 @@
+import io
+import json
+import os
+import tracemalloc
+
+import pandas as pd
+import pytest
+
+from data_loader import MemoryBudgetExceeded, _snapshot_paths, load_snapshot, optimize_dtypes, stream_csv
+from synthetic_data import generate_employees, write_csv
+
+
+def csv_bytes(rows, seed=3):
+    buffer = io.BytesIO()
+    generate_employees(rows, seed=seed).to_csv(buffer, index=False, date_format="%Y-%m-%d")
+    return buffer.getvalue()
+
+
+def test_chunked_stream_matches_one_chunk():
+    data = csv_bytes(20_000)
+    streamed, preview, bytes_read, _ = stream_csv(io.BytesIO(data), chunksize=1_000)
+    whole = stream_csv(io.BytesIO(data), chunksize=10**6)[0]
+    pd.testing.assert_frame_equal(streamed, whole)
+    assert bytes_read == len(data)
+    assert preview[0] == data.decode().splitlines()[0]
+    for col in ["dept_name", "title"]:
+        categories = streamed[col].cat.categories
+        assert list(categories) == sorted(categories)
+
+
+def test_peak_memory_is_one_frame_plus_chunks():
+    data, chunksize = csv_bytes(100_000), 10_000
+    chunk = optimize_dtypes(pd.read_csv(io.BytesIO(data), nrows=chunksize))
+    chunk_bytes = chunk.memory_usage(deep=True).sum()
+    tracemalloc.start()
+    try:
+        df = stream_csv(io.BytesIO(data), chunksize=chunksize)[0]
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    frame_bytes = df.memory_usage(deep=True).sum()
+    # Keeping every chunk and concatenating them would add a whole frame
+    # (ten chunks here) on top of the result
+    assert peak - frame_bytes < 5 * chunk_bytes
+
+
+def test_memory_budget_stops_the_stream_and_removes_the_partial_file(tmp_path):
+    source = tmp_path / "employees.csv"
+    source.write_bytes(csv_bytes(50_000))
+    snapshot_dir = tmp_path / "snapshot"
+    with pytest.raises(MemoryBudgetExceeded):
+        load_snapshot(str(source), str(snapshot_dir), chunksize=5_000, max_memory_mb=0.5)
+    assert os.listdir(snapshot_dir) == []
+
+
+def test_same_content_under_new_validators_keeps_snapshot_and_replaces_meta(tmp_path):
+    source = tmp_path / "employees.csv"
+    write_csv(generate_employees(500, seed=1), source)
+    snapshot_dir = str(tmp_path / "snapshot")
+    first = load_snapshot(str(source), snapshot_dir)
+    data_path, meta_path = _snapshot_paths(snapshot_dir)
+    meta = json.load(open(meta_path))
+    written = os.stat(data_path).st_mtime_ns
+
+    # A new modification time is a new ETag for a local source
+    os.utime(source, ns=(os.stat(source).st_atime_ns, os.stat(source).st_mtime_ns + 10**9))
+    again = load_snapshot(str(source), snapshot_dir)
+    new_meta = json.load(open(meta_path))
+    assert new_meta["etag"] != meta["etag"]
+    assert new_meta["sha256"] == meta["sha256"]
+    assert os.stat(data_path).st_mtime_ns == written
+    assert sorted(os.listdir(snapshot_dir)) == sorted(os.path.basename(p) for p in (data_path, meta_path))
+    pd.testing.assert_frame_equal(again, first)
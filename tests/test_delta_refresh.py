@@ -0,0 +1,193 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import analytics
+from aggregations import VISUALIZATIONS
+from data_loader import load_snapshot, prepare_data, read_snapshot
+from delta_refresh import LiveDataset
+from employee_model import EmployeeModel
+from filters import selection_key, sidebar_selection
+from result_cache import ResultCache
+from synthetic_data import generate_employees, write_csv
+
+SELECTIONS = [
+    sidebar_selection(),
+    sidebar_selection(["Sales"]),
+    sidebar_selection(["Finance"], "Left"),
+    sidebar_selection(["Marketing", "Production"], "Stayed", [], "F"),
+    sidebar_selection([], "All", ["Engineer"]),
+    sidebar_selection([], "Left", [], "M"),
+    {"hire_year": [1990, 1991]},
+    {"exit_year": [2013]},
+    {"salary_range": ["80k-100k"]},
+]
+
+CHARTS = ["department_headcount", "gender_distribution", "salary_histogram", "attrition_rate_trend",
+          "tenure_group_distribution", "salary_range_distribution"]
+
+
+# A base dataset, two deltas, and the merged dataset written out by hand: the
+# updates applied to every row of an employee, new assignment rows appended
+# in delta order with the employee's attributes
+@pytest.fixture(scope="module")
+def scenario(tmp_path_factory):
+    root = tmp_path_factory.mktemp("delta")
+    raw = generate_employees(3_000, seed=21, attrition=0.2)
+    rng = np.random.default_rng(3)
+    staying = rng.choice(raw.loc[raw["left"] == 0, "emp_no"].unique(), 30, replace=False)
+    exits, raises, late_exits = staying[:10], staying[10:20], staying[20:25]
+
+    # Delta 1: exits within the data, new salaries in Sales, a new hire in a
+    # new department
+    first = raw.drop_duplicates("emp_no").set_index("emp_no")
+    delta1 = pd.concat([
+        pd.DataFrame({"emp_no": exits, "last_date": "2013-06-30", "left": 1}),
+        pd.DataFrame({"emp_no": raises, "dept_name": "Sales", "title": "Senior Staff", "salary": 125_000}),
+        pd.DataFrame({"emp_no": [99_001, 99_001], "birth_date": "1980-02-01", "sex": "F", "hire_date": "2012-05-05",
+                      "no_of_projects": 3, "Last_performance_rating": "A", "left": 0,
+                      "dept_name": ["Research Lab", "Sales"], "title": "Engineer", "salary": [50_000, 61_000]}),
+    ])
+    # Delta 2: exits after the end of the data (every open tenure moves) and
+    # a rating change
+    delta2 = pd.DataFrame({"emp_no": late_exits, "last_date": "2014-03-31", "left": 1,
+                           "Last_performance_rating": "PIP"})
+
+    merged1 = raw.copy()
+    exited = merged1["emp_no"].isin(exits)
+    merged1.loc[exited, "last_date"] = pd.Timestamp("2013-06-30")
+    merged1.loc[exited, "left"] = 1
+    new_rows = first.loc[raises].reset_index()
+    new_rows[["dept_name", "title", "salary"]] = ["Sales", "Senior Staff", 125_000]
+    hire = delta1[delta1["emp_no"] == 99_001].assign(last_date=pd.NaT)
+    for col in ["birth_date", "hire_date"]:
+        hire[col] = pd.to_datetime(hire[col])
+    merged1 = pd.concat([merged1, new_rows[raw.columns], hire[raw.columns]], ignore_index=True)
+    merged2 = merged1.copy()
+    late = merged2["emp_no"].isin(late_exits)
+    merged2.loc[late, ["last_date", "left", "Last_performance_rating"]] = [pd.Timestamp("2014-03-31"), 1, "PIP"]
+
+    paths = {}
+    for name, frame in [("base", raw), ("merged1", merged1), ("merged2", merged2)]:
+        paths[name] = str(root / f"{name}.csv")
+        write_csv(frame, paths[name])
+    for name, frame in [("001.csv", delta1), ("002.csv", delta2)]:
+        paths[name] = str(root / name)
+        frame.to_csv(paths[name], index=False)
+    return root, paths
+
+
+# The merged CSV loaded and prepared from scratch
+def reload(root, paths, name):
+    return prepare_data(load_snapshot(paths[name], str(root / f"reload_{name}")))
+
+
+def live_dataset(tmp_path, paths, keep_frame, result_cache=None):
+    snapshot_dir = str(tmp_path / "snapshot")
+    return LiveDataset(load_snapshot(paths["base"], snapshot_dir), snapshot_dir, keep_frame=keep_frame,
+                       result_cache=result_cache, poll_seconds=0)
+
+
+def assert_same_frame(got, expected):
+    got, expected = got.reset_index(drop=True), expected.reset_index(drop=True)
+    assert list(got.columns) == list(expected.columns)
+    for col in expected.columns:
+        a, b = got[col], expected[col]
+        if isinstance(b.dtype, pd.CategoricalDtype):
+            assert list(a.cat.categories) == list(b.cat.categories), col
+            a, b = a.astype(object), b.astype(object)
+        pd.testing.assert_series_equal(a, b, check_dtype=False, obj=col)
+
+
+def assert_same_kpis(got, expected, label):
+    assert got.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, str) or value is None or pd.isna(value):
+            assert got[key] == value or (pd.isna(value) and pd.isna(got[key])), (label, key)
+        else:
+            assert float(got[key]) == pytest.approx(float(value)), (label, key)
+
+
+def assert_same_result(got, expected, label):
+    if isinstance(expected, dict):
+        for part in expected:
+            np.testing.assert_allclose(got[part], expected[part], err_msg=label)
+        return
+    pd.testing.assert_frame_equal(got.reset_index(drop=True), expected.reset_index(drop=True),
+                                  check_dtype=False, check_categorical=False, obj=label)
+
+
+@pytest.mark.parametrize("keep_frame", [True, False])
+def test_merged_frame_matches_full_reload(scenario, tmp_path, keep_frame):
+    root, paths = scenario
+    live = live_dataset(tmp_path, paths, keep_frame)
+    for delta, merged in [("001.csv", "merged1"), ("002.csv", "merged2")]:
+        live.refresh([paths[delta]])
+        expected = reload(root, paths, merged)
+        assert_same_frame(live.current.frame, expected)
+        # The snapshot written by the refresh reloads to the same data
+        assert_same_frame(prepare_data(read_snapshot(live.snapshot_dir)), expected)
+    live.shutdown()
+
+
+@pytest.mark.parametrize("keep_frame", [True, False])
+def test_carried_over_results_match_fresh_results(scenario, tmp_path, keep_frame):
+    root, paths = scenario
+    cache = ResultCache(max_entries=10_000)
+    live = live_dataset(tmp_path, paths, keep_frame, cache)
+    base, old = live.current.frame, live.current.version
+    for selection in SELECTIONS:
+        filtered = analytics.filter_frame(base, selection)
+        cache.put((old, selection_key(selection), "kpis"), analytics.compute_kpis(base, selection))
+        for name in CHARTS:
+            cache.put((old, selection_key(selection), name), VISUALIZATIONS[name](filtered))
+
+    previous = base
+    for delta, merged in [("001.csv", "merged1"), ("002.csv", "merged2")]:
+        live.refresh([paths[delta]])
+        expected = reload(root, paths, merged)
+        new = live.current.version
+        carried = {(key, name) for version, key, name in cache._entries if version == new}
+        for key, name in carried:
+            selection = {col: list(values) for col, values in key}
+            for col in ["left", "hire_year", "exit_year"]:
+                if col in selection:
+                    selection[col] = [int(value) for value in selection[col]]
+            if name == "kpis":
+                assert_same_kpis(cache.get((new, key, name)), analytics.compute_kpis(expected, selection), key)
+            else:
+                fresh = VISUALIZATIONS[name](analytics.filter_frame(expected, selection))
+                assert_same_result(cache.get((new, key, name)), fresh, f"{delta} {key} {name}")
+
+        if delta == "002.csv":
+            # Exits after the end of the data move every open tenure, so only
+            # the unfiltered time series appended by the refresh are cached
+            assert {key for key, _ in carried} == {()}
+            continue
+        # A filtered selection is carried over exactly when no row of an
+        # employee in the delta matches it, before or after the merge
+        affected = pd.read_csv(paths[delta])["emp_no"].unique()
+        untouched = [all(analytics.filter_frame(frame[frame["emp_no"].isin(affected)], selection).empty
+                         for frame in (previous, expected)) for selection in SELECTIONS[1:]]
+        assert any(untouched) and not all(untouched)
+        for selection, kept in zip(SELECTIONS[1:], untouched):
+            assert ((selection_key(selection), "kpis") in carried) == kept, (delta, selection)
+        previous = expected
+    live.shutdown()
+
+
+def test_extended_model_matches_rebuilt_model(scenario, tmp_path):
+    root, paths = scenario
+    live = live_dataset(tmp_path, paths, keep_frame=False)
+    for delta, merged in [("001.csv", "merged1"), ("002.csv", "merged2")]:
+        live.refresh([paths[delta]])
+        extended, rebuilt = live.current.model, EmployeeModel(reload(root, paths, merged))
+        assert extended.emp_nos.equals(rebuilt.emp_nos)
+        for name in ["emp", "first_row", "n_rows", "dept", "title", "salary", "salary_sum", "salary_n"]:
+            np.testing.assert_array_equal(getattr(extended, name), getattr(rebuilt, name), err_msg=name)
+        for selection in SELECTIONS:
+            assert_same_kpis(extended.kpis(selection), rebuilt.kpis(selection), selection)
+            for name in VISUALIZATIONS:
+                assert_same_result(extended.visualization(name, selection), rebuilt.visualization(name, selection),
+                                   f"{delta} {name}")
+    live.shutdown()
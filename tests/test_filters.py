@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from binning import SALARY_EDGES, SALARY_LABELS
+from data_loader import prepare_data
+from filters import DERIVED_FILTERS, FilterIndex, apply_filters, derive_filters, sidebar_selection
+from synthetic_data import generate_employees
+
+
+# The derived filter columns, one employee at a time
+def naive_derived(df):
+    mean_salary = {emp: round(group["salary"].mean()) for emp, group in df.groupby("emp_no")}
+    band = pd.cut(pd.Series([mean_salary[emp] for emp in df["emp_no"]], dtype=float),
+                  bins=SALARY_EDGES, labels=SALARY_LABELS, right=True)
+    return pd.DataFrame({
+        "hire_year": [date.year for date in df["hire_date"]],
+        "exit_year": [None if pd.isna(date) else date.year for date in df["last_date"]],
+        "salary_range": band.astype(object).tolist(),
+    })
+
+
+def as_list(values):
+    return [None if pd.isna(value) else value for value in values]
+
+
+def employees():
+    return prepare_data(generate_employees(3_000, seed=11, attrition=0.3))
+
+
+def test_derived_filter_columns_match_naive():
+    df = employees()
+    expected = naive_derived(df)
+    for col in DERIVED_FILTERS:
+        assert as_list(df[col]) == as_list(expected[col]), col
+
+
+def test_rederiving_changed_rows_matches_full_derivation():
+    df = employees()
+    rows = df["emp_no"].isin(df["emp_no"].unique()[::7]).to_numpy()
+    df.loc[rows, "salary"] = df.loc[rows, "salary"] + 25_000
+    df.loc[rows, "last_date"] = pd.Timestamp("2013-06-30")
+    partial = derive_filters(df.copy(), rows)
+    full = derive_filters(df.drop(columns=list(DERIVED_FILTERS)))
+    pd.testing.assert_frame_equal(partial, full[partial.columns])
+
+
+def test_bitmaps_of_derived_filters_built_on_demand():
+    df = employees()
+    bare = df.drop(columns=list(DERIVED_FILTERS))
+    index, bare_index = FilterIndex(df, columns=list(df.columns)), FilterIndex(bare)
+    expected = naive_derived(df)
+    selections = [{"hire_year": [1990, 1999]}, {"exit_year": [2001]}, {"salary_range": [SALARY_LABELS[2]]},
+                  {**sidebar_selection(["Sales"], "Left"), "exit_year": [2005, 2006]}]
+    for selection in selections:
+        mask = np.ones(len(df), dtype=bool)
+        for col, values in selection.items():
+            if values:
+                column = expected[col] if col in expected else df[col].astype(object)
+                mask &= column.isin(values).to_numpy()
+        np.testing.assert_array_equal(index.select(selection), np.flatnonzero(mask))
+        np.testing.assert_array_equal(bare_index.select(selection), np.flatnonzero(mask))
+        pd.testing.assert_frame_equal(apply_filters(df, index, selection), df[mask])
+    assert apply_filters(df, index, sidebar_selection()) is df
@@ -0,0 +1,95 @@
+import json
+import threading
+
+import pytest
+
+import instrumentation
+from instrumentation import configure, current_trace, span, trace
+
+
+@pytest.fixture(autouse=True)
+def disabled_after():
+    yield
+    configure(enabled=False)
+
+
+def test_disabled_spans_are_a_shared_no_op():
+    configure(enabled=False)
+    with trace("rerun") as opened:
+        assert opened is None
+        assert span("filter") is span("kpis") is instrumentation._noop
+    assert current_trace() is None
+
+
+def test_nested_spans_and_errors():
+    configure(enabled=True)
+    with trace("rerun", user="a") as opened:
+        with span("load"):
+            pass
+        with span("section", tab=1):
+            with span("chart", chart="hiring_trend"):
+                pass
+            with pytest.raises(ValueError), span("chart", chart="broken"):
+                raise ValueError("bad data")
+        # A nested trace() is a span of the open trace
+        with trace("fragment") as inner:
+            assert inner is opened
+    records = {(record.name, record.attributes.get("chart")): record for record in opened.records()}
+    root = records[("rerun", None)]
+    assert root.parent is None and root.depth == 0 and root.attributes == {"user": "a"}
+    assert records[("load", None)].parent == root.span_id
+    section = records[("section", None)]
+    assert records[("chart", "hiring_trend")].parent == section.span_id
+    assert records[("chart", "hiring_trend")].depth == 2
+    assert records[("chart", "broken")].error == "ValueError"
+    assert records[("fragment", None)].parent == root.span_id
+    assert all(record.duration_ns >= 0 for record in opened.records())
+    assert root.duration_ns >= section.duration_ns
+    assert current_trace() is None
+
+
+def test_spans_from_worker_threads_have_their_own_stack():
+    configure(enabled=True)
+    with trace("rerun") as opened:
+        def work(i):
+            with opened.span("worker", i=i):
+                with opened.span("step", i=i):
+                    pass
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    workers = {record.attributes["i"]: record for record in opened.records() if record.name == "worker"}
+    steps = [record for record in opened.records() if record.name == "step"]
+    assert len(workers) == 4 and len(steps) == 4
+    for step in steps:
+        assert step.parent == workers[step.attributes["i"]].span_id and step.depth == 1
+
+
+@pytest.mark.parametrize("fmt", ["jsonl", "otlp"])
+def test_export(tmp_path, fmt):
+    path = str(tmp_path / "trace.out")
+    configure(enabled=True, export_path=path, export_format=fmt)
+    with trace("rerun") as opened:
+        with span("chart", chart="hiring_trend", cached=True):
+            pass
+    lines = [json.loads(line) for line in open(path, encoding="utf-8")]
+    if fmt == "jsonl":
+        assert [line["name"] for line in lines] == ["rerun", "chart"]
+        assert {line["trace_id"] for line in lines} == {opened.trace_id}
+        assert lines[1]["parent_id"] == lines[0]["span_id"]
+        assert lines[1]["attributes"] == {"chart": "hiring_trend", "cached": True}
+    else:
+        spans = lines[0]["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert [span["name"] for span in spans] == ["rerun", "chart"]
+        assert spans[1]["parentSpanId"] == spans[0]["spanId"] and "parentSpanId" not in spans[0]
+        attributes = {a["key"]: a["value"] for a in spans[1]["attributes"]}
+        assert attributes["chart"] == {"stringValue": "hiring_trend"}
+        assert attributes["cached"] == {"boolValue": True}
+        assert int(spans[1]["endTimeUnixNano"]) >= int(spans[1]["startTimeUnixNano"])
+
+
+def test_unknown_export_format():
+    with pytest.raises(ValueError):
+        configure(enabled=True, export_format="csv")
@@ -0,0 +1,89 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from filters import selection_key, sidebar_selection
+from result_cache import ResultCache, figure_key, result_hash
+
+
+# Plain LRU over an OrderedDict, evicting by entry count and total size
+class ReferenceLRU:
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries, self.max_bytes = max_entries, max_bytes
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, value):
+        self.entries.pop(key, None)
+        self.entries[key] = value
+        while len(self.entries) > self.max_entries or (
+                self.max_bytes is not None and sum(map(len, self.entries.values())) > self.max_bytes
+                and len(self.entries) > 1):
+            self.entries.popitem(last=False)
+
+
+def test_random_gets_and_puts_match_reference_lru():
+    rng = np.random.default_rng(5)
+    for max_entries, max_bytes in [(8, None), (50, 40), (4, 1)]:
+        cache, reference = ResultCache(max_entries, max_bytes), ReferenceLRU(max_entries, max_bytes)
+        hits = misses = 0
+        for _ in range(3000):
+            key = int(rng.integers(0, 20))
+            if rng.random() < 0.5:
+                value = "x" * int(rng.integers(0, 12))
+                cache.put(key, value)
+                reference.put(key, value)
+            else:
+                expected = reference.get(key)
+                hits, misses = hits + (expected is not None), misses + (expected is None)
+                assert cache.get(key) == expected
+            assert list(cache._entries) == list(reference.entries)
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"]) == (hits, misses)
+        assert stats["bytes"] == (sum(map(len, reference.entries.values())) if max_bytes is not None else 0)
+
+
+def test_get_or_compute_computes_once_per_key():
+    cache, calls = ResultCache(max_entries=2), []
+    compute = lambda key: lambda: calls.append(key) or key * 2
+    assert [cache.get_or_compute(key, compute(key)) for key in [1, 1, 2, 1, 3, 2]] == [2, 2, 4, 2, 6, 4]
+    # 2 was evicted by 3, as 1 had been used more recently
+    assert calls == [1, 2, 3, 2]
+    assert cache.stats()["hits"] == 2
+
+
+def test_copy_version_keeps_only_the_selected_keys():
+    cache = ResultCache()
+    cache.put(("v1", (), "a"), 1)
+    cache.put(("v1", (("sex", ("F",)),), "b"), 2)
+    cache.put(("v0", (), "a"), 3)
+    assert cache.copy_version("v1", "v2", lambda key: key[2] == "a") == 1
+    assert cache.get(("v2", (), "a")) == 1
+    assert cache.get(("v2", (("sex", ("F",)),), "b")) is None
+
+
+def test_selection_key_is_normalized():
+    a = sidebar_selection(["Sales", "Development"], "Left", [], "All")
+    b = {"sex": [], "left": [1], "dept_name": ["Development", "Sales"], "title": []}
+    assert selection_key(a) == selection_key(b) == (("dept_name", ("Development", "Sales")), ("left", ("1",)))
+    assert selection_key(sidebar_selection()) == ()
+
+
+def test_result_hash_depends_on_values_columns_and_dtypes():
+    df = pd.DataFrame({"year": [2000, 2001], "count": [5, 7]})
+    assert result_hash(df) == result_hash(df.copy())
+    assert result_hash(df) != result_hash(df.assign(count=[5, 8]))
+    assert result_hash(df) != result_hash(df.rename(columns={"count": "total"}))
+    assert result_hash(df) != result_hash(df.astype({"count": float}))
+    assert result_hash(df) != result_hash(df.iloc[::-1])
+    histogram = {"counts": np.array([1, 2]), "edges": np.array([0.0, 1.0, 2.0])}
+    assert result_hash(histogram) == result_hash(dict(reversed(list(histogram.items()))))
+    assert result_hash(histogram) != result_hash({**histogram, "counts": np.array([1, 3])})
+    assert figure_key("chart", df, (4, 3)) == figure_key("chart", df.copy(), [4, 3])
+    assert figure_key("chart", df) != figure_key("chart", df, fmt="svg")
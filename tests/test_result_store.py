@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregations import VISUALIZATIONS
+from data_loader import load_snapshot, prepare_data, snapshot_version
+from employee_model import EmployeeModel
+from filters import selection_key, sidebar_selection
+from precompute import filter_grid, precompute
+from result_store import PrecomputedStore, write_store
+from synthetic_data import generate_employees, write_csv
+
+
+def test_reader_sees_each_swapped_in_store(tmp_path):
+    path = str(tmp_path / "store.sqlite")
+    store = PrecomputedStore(path)
+    assert store.get("v1", (), "a", default="none") == "none"
+    write_store(path, "v1", [((), "a", {"x": 1}), ((("sex", ("F",)),), "a", [1, 2])])
+    assert store.get("v1", (), "a") == {"x": 1}
+    assert store.get("v1", (("sex", ("F",)),), "a") == [1, 2]
+
+    # A new batch run replaces the file under the open connection
+    write_store(path, "v2", [((), "a", {"x": 2})])
+    assert store.get("v2", (), "a") == {"x": 2}
+    assert store.get("v1", (), "a") is None
+    assert store.versions() == ["v2"]
+    store.close()
+
+
+def test_failed_batch_leaves_the_previous_store(tmp_path):
+    path = str(tmp_path / "store.sqlite")
+    write_store(path, "v1", [((), "a", 1)])
+
+    def rows():
+        yield (), "a", 2
+        raise RuntimeError("worker failed")
+
+    with pytest.raises(RuntimeError):
+        write_store(path, "v2", rows())
+    store = PrecomputedStore(path)
+    assert store.get("v1", (), "a") == 1
+    assert os.listdir(tmp_path) == ["store.sqlite"]
+    store.close()
+
+
+def test_precomputed_results_match_the_model(tmp_path):
+    source = tmp_path / "employees.csv"
+    write_csv(generate_employees(2_000, seed=6), source)
+    snapshot_dir = str(tmp_path / "snapshot")
+    df = prepare_data(load_snapshot(str(source), snapshot_dir))
+    path = str(tmp_path / "store.sqlite")
+    grid = {"departments": [[], ["Sales"]], "statuses": ["All", "Left"], "genders": ["All"]}
+    assert precompute(snapshot_dir, path, grid, workers=2) == 4
+
+    model, store = EmployeeModel(df), PrecomputedStore(path)
+    version = snapshot_version(snapshot_dir)
+    for selection in filter_grid(df, grid):
+        key = selection_key(selection)
+        assert store.get(version, key, "kpis") == model.kpis(selection)
+        for name in VISUALIZATIONS:
+            expected, got = model.visualization(name, selection), store.get(version, key, name)
+            if isinstance(expected, pd.DataFrame):
+                pd.testing.assert_frame_equal(got, expected)
+            else:
+                assert got.keys() == expected.keys()
+                for part in expected:
+                    np.testing.assert_array_equal(got[part], expected[part])
+    assert store.get(version, selection_key(sidebar_selection([], "Stayed")), "kpis") is None
+    store.close()
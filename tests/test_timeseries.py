@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from synthetic_data import generate_employees
+from timeseries import HeadcountSeries, period_codes, period_labels
+
+
+# Per-period table of `df`, one period and one employee at a time: hires and
+# exits are distinct employees, the headcount of a period is every hire up
+# to it minus every exit before it, and an employee's salary is the one on
+# their first row
+def naive_table(df, freq):
+    first = df.drop_duplicates(subset="emp_no")
+    hire = dict(zip(first["emp_no"], period_codes(first["hire_date"], freq)))
+    salary = dict(zip(first["emp_no"], first["salary"].astype(float)))
+    leavers = df[(df["left"] == 1) & df["last_date"].notna()].drop_duplicates(subset="emp_no")
+    leave = dict(zip(leavers["emp_no"], period_codes(leavers["last_date"], freq)))
+    leave_salary = dict(zip(leavers["emp_no"], leavers["salary"].astype(float)))
+    rows = []
+    for period in sorted(set(hire.values()) | set(leave.values())):
+        hired = [emp for emp, p in hire.items() if p == period]
+        left = [emp for emp, p in leave.items() if p == period]
+        active = sum(p <= period for p in hire.values()) - sum(p < period for p in leave.values())
+        total_sal = (sum(salary[emp] for emp, p in hire.items() if p <= period)
+                     - sum(leave_salary[emp] for emp, p in leave.items() if p < period))
+        rows.append((period, len(hired), len(left), active, len(left) / (active or 1) * 100, total_sal,
+                     round(total_sal / (active or 1), 2)))
+    table = pd.DataFrame(rows, columns=["period", "total_emp_hired", "total_emp_left", "total_emp", "pct",
+                                        "total_sal", "avg_sal"])
+    table["period"] = period_labels(table["period"], freq)
+    return table
+
+
+def assert_tables_equal(got, expected):
+    pd.testing.assert_frame_equal(got.reset_index(drop=True), expected, check_dtype=False)
+
+
+@pytest.fixture(scope="module")
+def employees():
+    return generate_employees(1_500, seed=4, attrition=0.3)
+
+
+@pytest.mark.parametrize("freq", ["year", "quarter", "month"])
+def test_from_frame_matches_naive_table(employees, freq):
+    assert_tables_equal(HeadcountSeries.from_frame(employees, freq).table(), naive_table(employees, freq))
+
+
+def test_append_matches_rebuild(employees):
+    # A delta: some employees leave (one after the current last date), and
+    # new employees are hired
+    rng = np.random.default_rng(1)
+    leaving = rng.choice(employees.loc[employees["left"] == 0, "emp_no"].unique(), 40, replace=False)
+    updated = employees.copy()
+    changed = updated["emp_no"].isin(leaving)
+    updated.loc[changed, "left"] = 1
+    updated.loc[changed, "last_date"] = pd.Timestamp("2012-06-30")
+    updated.loc[updated["emp_no"] == leaving[0], "last_date"] = pd.Timestamp("2015-01-31")
+    hires = generate_employees(60, seed=9, attrition=0.5, first_emp_no=90_001)
+    merged = pd.concat([updated, hires], ignore_index=True)
+
+    for freq in ["year", "month"]:
+        series = HeadcountSeries.from_frame(employees, freq)
+        before = series.table()
+        appended = series.copy().append(pd.concat([updated[changed], hires]))
+        assert_tables_equal(appended.table(), naive_table(merged, freq))
+        assert_tables_equal(appended.table(), HeadcountSeries.from_frame(merged, freq).table())
+        # The copy was appended to, not the original
+        assert_tables_equal(series.table(), before)
+
+    # Appending the same rows again changes nothing
+    series = HeadcountSeries.from_frame(merged).append(updated[changed])
+    assert_tables_equal(series.table(), naive_table(merged, "year"))
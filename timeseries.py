@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+
+
+# Headcount / attrition / average salary time series built from hire and
+# leave events. Each employee contributes one hire event (with their salary)
+# and, once they have left, one leave event; active headcount in a period is
+# every hire up to that period minus every exit before it. All series come
+# out of one sorted sweep over the event periods.
+
+FREQUENCIES = ("year", "quarter", "month")
+
+
+# Integer period code of each date (NaN for missing dates)
+def period_codes(dates, freq="year"):
+    year = dates.dt.year
+    if freq == "year":
+        return year
+    if freq == "quarter":
+        return year * 4 + (dates.dt.month - 1) // 3
+    if freq == "month":
+        return year * 12 + dates.dt.month - 1
+    raise ValueError(f"Unknown frequency {freq!r}; expected one of {FREQUENCIES}")
+
+
+# Display label of each period code
+def period_labels(codes, freq="year"):
+    codes = np.asarray(codes, dtype=np.int64)
+    if freq == "year":
+        return codes
+    if freq == "quarter":
+        return [f"{code // 4}Q{code % 4 + 1}" for code in codes]
+    return [f"{code // 12}-{code % 12 + 1:02d}" for code in codes]
+
+
+# One row per employee: hire period and salary, plus leave period and salary
+# for employees who left. Like the original pipelines, the first assignment
+# row of an employee supplies the salary.
+def employee_events(df, freq="year"):
+    hires = df.drop_duplicates(subset="emp_no")
+    events = pd.DataFrame({
+        "hire_period": period_codes(hires["hire_date"], freq).to_numpy(dtype=float),
+        "hire_salary": hires["salary"].to_numpy(dtype=float),
+    }, index=hires["emp_no"].to_numpy())
+    leavers = df[(df["left"] == 1) & df["last_date"].notna()].drop_duplicates(subset="emp_no")
+    leave = pd.DataFrame({
+        "leave_period": period_codes(leavers["last_date"], freq).to_numpy(dtype=float),
+        "leave_salary": leavers["salary"].to_numpy(dtype=float),
+    }, index=leavers["emp_no"].to_numpy())
+    return events.join(leave, how="outer")
+
+
+# Event counts and salary sums per period, as Series indexed by period code
+def _bincount(periods, salaries):
+    keep = ~np.isnan(periods)
+    periods, salaries = periods[keep].astype(np.int64), np.nan_to_num(salaries[keep])
+    if not len(periods):
+        empty = pd.Series(dtype=float)
+        return empty, empty
+    axis, positions = np.unique(periods, return_inverse=True)
+    counts = np.bincount(positions, minlength=len(axis)).astype(float)
+    sums = np.bincount(positions, weights=salaries, minlength=len(axis))
+    return pd.Series(counts, index=axis), pd.Series(sums, index=axis)
+
+
+class HeadcountSeries:
+    def __init__(self, freq="year"):
+        if freq not in FREQUENCIES:
+            raise ValueError(f"Unknown frequency {freq!r}; expected one of {FREQUENCIES}")
+        self.freq = freq
+        self.employees = pd.DataFrame(columns=["hire_period", "hire_salary", "leave_period", "leave_salary"],
+                                      dtype=float)
+        self.hires = self.hire_salary = self.leaves = self.leave_salary = pd.Series(dtype=float)
+
+    @classmethod
+    def from_frame(cls, df, freq="year"):
+        series = cls(freq)
+        series.append(df)
+        return series
+
+    # Series from per-period event totals computed elsewhere (e.g. by a SQL
+    # query): hire and exit counts and salary sums, as Series indexed by
+    # period code. Such a series has no employee table, so it cannot be
+    # appended to.
+    @classmethod
+    def from_totals(cls, hires, hire_salary, leaves, leave_salary, freq="year"):
+        series = cls(freq)
+        series.hires, series.hire_salary, series.leaves, series.leave_salary = (
+            totals.astype(float) for totals in (hires, hire_salary, leaves, leave_salary))
+        return series
+
+    # Add the hire/exit events of the employees in `df` (all of their rows):
+    # new employees are added, and the events of known employees (e.g. who
+    # have since left) replace the ones they had. Only the per-period
+    # accumulators of the affected periods change; nothing is recomputed
+    # from scratch.
+    def append(self, df):
+        events = employee_events(df, self.freq)
+        known = events.index.intersection(self.employees.index)
+        self._add(self.employees.loc[known], -1)
+        self._add(events, 1)
+        if len(self.employees):
+            self.employees = pd.concat([self.employees.drop(index=known), events])
+        else:
+            self.employees = events.copy()
+        return self
+
+    # Add (sign 1) or remove (sign -1) the events of `events` from the
+    # per-period accumulators; periods left without events are dropped
+    def _add(self, events, sign):
+        hires, hire_salary = _bincount(events["hire_period"].to_numpy(), events["hire_salary"].to_numpy())
+        leaves, leave_salary = _bincount(events["leave_period"].to_numpy(), events["leave_salary"].to_numpy())
+        self.hires = self.hires.add(sign * hires, fill_value=0)
+        self.hire_salary = self.hire_salary.add(sign * hire_salary, fill_value=0)
+        self.leaves = self.leaves.add(sign * leaves, fill_value=0)
+        self.leave_salary = self.leave_salary.add(sign * leave_salary, fill_value=0)
+        if sign < 0:
+            self.hire_salary = self.hire_salary[self.hires != 0]
+            self.hires = self.hires[self.hires != 0]
+            self.leave_salary = self.leave_salary[self.leaves != 0]
+            self.leaves = self.leaves[self.leaves != 0]
+
+    # Independent copy, to append to while the original is still read
+    def copy(self):
+        series = HeadcountSeries(self.freq)
+        series.employees = self.employees.copy()
+        series.hires, series.hire_salary, series.leaves, series.leave_salary = (
+            self.hires, self.hire_salary, self.leaves, self.leave_salary)
+        return series
+
+    # Per-period table: hires, exits, active headcount, attrition rate and
+    # average salary of the active employees
+    def table(self):
+        axis = self.hires.index.union(self.leaves.index).sort_values()
+        hires = self.hires.reindex(axis, fill_value=0).to_numpy()
+        leaves = self.leaves.reindex(axis, fill_value=0).to_numpy()
+        hire_salary = self.hire_salary.reindex(axis, fill_value=0).to_numpy()
+        leave_salary = self.leave_salary.reindex(axis, fill_value=0).to_numpy()
+
+        # Employees who leave in a period still count towards its headcount
+        left_before = np.cumsum(leaves) - leaves
+        salary_left_before = np.cumsum(leave_salary) - leave_salary
+        total_emp = np.cumsum(hires) - left_before
+        total_sal = np.cumsum(hire_salary) - salary_left_before
+        denominator = np.where(total_emp == 0, 1, total_emp)
+
+        return pd.DataFrame({
+            "period": period_labels(axis, self.freq),
+            "total_emp_hired": hires.astype(int),
+            "total_emp_left": leaves.astype(int),
+            "total_emp": total_emp.astype(int),
+            "pct": leaves / denominator * 100,
+            "total_sal": total_sal,
+            "avg_sal": np.round(total_sal / denominator, 2),
+        })
@@ -0,0 +1,280 @@
+import json
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from result_cache import figure_key
+
+
+# Vega-Lite versions of the 19 visualizations, drawn in the browser. A spec
+# carries only the columns of the aggregation result the chart shows, so
+# the payload is a few hundred rows at most, and hover tooltips and
+# zoom/pan on the trend charts need no rerun.
+#
+# Charts whose result has more than `max_rows` rows, or whose spec is
+# larger than `max_bytes`, are not built; the caller draws them with
+# matplotlib instead.
+#
+# The source charts of crossfilter.py take `selected`: a list of the picked
+# values (possibly empty) adds a click selection named PICK that highlights
+# them; None leaves the chart without one.
+
+MAX_ROWS = 5000
+MAX_BYTES = 512 * 1024
+
+BAR_COLOR = "skyblue"
+PICK = "pick"
+
+
+def _pick(field, selected):
+    if not selected:
+        return alt.selection_point(name=PICK, fields=[field])
+    return alt.selection_point(name=PICK, fields=[field], value=[{field: value} for value in selected])
+
+
+def _highlight(pick):
+    return alt.condition(pick, alt.value(1.0), alt.value(0.35))
+
+
+# The given columns of a result, with categoricals as strings and floats
+# rounded to what the labels show
+def _data(result, columns):
+    data = result[columns].reset_index(drop=True)
+    for col in columns:
+        if isinstance(data[col].dtype, pd.CategoricalDtype) or data[col].dtype == object:
+            data[col] = data[col].astype(str)
+        elif pd.api.types.is_float_dtype(data[col]):
+            data[col] = data[col].round(2)
+    return data
+
+
+def _histogram_data(hist):
+    edges = np.asarray(hist["edges"], dtype=float)
+    return pd.DataFrame({"start": edges[:-1].round(2), "end": edges[1:].round(2),
+                         "count": np.asarray(hist["counts"]).astype(int)})
+
+
+# Bars with their value on top, in the result's order
+def _bars(data, x, y, title, x_title, y_title, label_format=",", color=None, horizontal=False, selected=None):
+    order = data[x].tolist()
+    category = alt.X(f"{x}:N", title=x_title, sort=order, axis=alt.Axis(labelAngle=-45))
+    value = alt.Y(f"{y}:Q", title=y_title)
+    if horizontal:
+        category = alt.Y(f"{x}:N", title=x_title, sort=order)
+        value = alt.X(f"{y}:Q", title=y_title)
+    base = alt.Chart(data).encode(category, value, tooltip=list(data.columns))
+    bars = base.mark_bar(color=BAR_COLOR) if color is None else base.mark_bar().encode(
+        color=alt.Color(f"{x}:N", scale=alt.Scale(scheme=color), legend=None, sort=order))
+    if selected is not None:
+        pick = _pick(x, selected)
+        bars = bars.add_params(pick).encode(opacity=_highlight(pick))
+    labels = base.mark_text(align="left" if horizontal else "center", baseline="middle" if horizontal else "bottom",
+                            dx=3 if horizontal else 0, dy=0 if horizontal else -3).encode(
+        text=alt.Text(f"{y}:Q", format=label_format))
+    return (bars + labels).properties(title=title)
+
+
+# Line with points and value labels over years, zoomable along the x axis
+def _trend(data, x, y, title, x_title, y_title, color, label_format=",", selected=None):
+    base = alt.Chart(data).encode(alt.X(f"{x}:Q", title=x_title, axis=alt.Axis(format="d")),
+                                  alt.Y(f"{y}:Q", title=y_title), tooltip=list(data.columns))
+    labels = base.mark_text(baseline="bottom", dy=-6, fontSize=10).encode(text=alt.Text(f"{y}:Q", format=label_format))
+    if selected is None:
+        line = base.mark_line(color=color, point=alt.OverlayMarkDef(color=color, size=60))
+        return (line + labels).properties(title=title).interactive(bind_y=False)
+    # The points carry the click selection (a line mark would pick one datum
+    # for the whole line)
+    pick = _pick(x, selected)
+    points = base.mark_circle(color=color, size=90).add_params(pick).encode(opacity=_highlight(pick))
+    return (base.mark_line(color=color) + points + labels).properties(title=title).interactive(bind_y=False)
+
+
+def _histogram(hist, title, x_title):
+    data = _histogram_data(hist)
+    return alt.Chart(data).mark_bar(color=BAR_COLOR, stroke="black", strokeWidth=0.5).encode(
+        alt.X("start:Q", title=x_title, bin="binned"), alt.X2("end:Q"),
+        alt.Y("count:Q", title="Total Employees"), tooltip=["start", "end", "count"],
+    ).properties(title=title)
+
+
+# Visualization 1: Employee Turnover by Age Group
+def chart_age_group_turnover(result):
+    return _bars(_data(result, ["age_group", "NO_OF_EMP"]), "age_group", "NO_OF_EMP",
+                 "Employee Turnover by Age Group", "Age Group", "Number of Employees")
+
+
+# Visualization 2: Year-wise Attrition Rate
+def chart_attrition_rate_trend(result):
+    return _trend(_data(result, ["year", "pct"]), "year", "pct", "Employee Attrition Rate Trend",
+                  "Year", "Attrition Rate (%)", "royalblue", label_format=".1f")
+
+
+# Visualization 3: Gender Distribution
+def chart_gender_distribution(result):
+    data = _data(result, ["gender", "total_no", "pct"])
+    return alt.Chart(data).mark_arc().encode(
+        theta=alt.Theta("total_no:Q"),
+        color=alt.Color("gender:N", scale=alt.Scale(range=["#ff9999", "#66b3ff"]), title="Gender"),
+        tooltip=["gender", "total_no", alt.Tooltip("pct:Q", format=".1f", title="%")],
+    ).properties(title="Employee Distribution by Gender")
+
+
+# Visualization 4: Performance Rating Distribution
+def chart_performance_rating_distribution(result):
+    data = _data(result, ["Last_performance_rating", "total_emp", "pct"])
+    order = data["Last_performance_rating"].tolist()
+    x = alt.X("Last_performance_rating:N", title="Last Performance Rating", sort=order)
+    base = alt.Chart(data).encode(x, tooltip=list(data.columns))
+    bars = base.mark_bar().encode(alt.Y("total_emp:Q", title="Total Employees"),
+                                  color=alt.Color("Last_performance_rating:N", scale=alt.Scale(scheme="viridis"),
+                                                  legend=None, sort=order))
+    labels = base.mark_text(baseline="bottom", dy=-3).encode(alt.Y("total_emp:Q"), text=alt.Text("total_emp:Q", format=","))
+    line = base.mark_line(color="red", point=alt.OverlayMarkDef(color="red")).encode(
+        alt.Y("pct:Q", title="Percentage of Total (%)", axis=alt.Axis(titleColor="red")))
+    return alt.layer(bars + labels, line).resolve_scale(y="independent").properties(
+        title="Employee Distribution by Last Performance Rating")
+
+
+# Visualization 5: Job Title Distribution
+def chart_title_distribution(result):
+    return _bars(_data(result, ["title", "total_emp"]), "title", "total_emp", "Employee Count by Job Title",
+                 "Job Title", "Number of Employees", color="viridis")
+
+
+# Visualization 6: Projects Distribution
+def chart_project_distribution(result):
+    return _bars(_data(result, ["project_category", "Total_emp"]), "project_category", "Total_emp",
+                 "Employee Distribution by No of Projects", "Project Category", "Total Employees", color="viridis")
+
+
+# Visualization 7: Distribution of Employees by Tenure
+def chart_tenure_histogram(result):
+    return _histogram(result, "Distribution of Employees by Tenure", "Tenure (Years)")
+
+
+# Visualization 8: Tenure Distribution
+def chart_tenure_group_distribution(result):
+    return _bars(_data(result, ["tenure_group", "NO_OF_EMP"]), "tenure_group", "NO_OF_EMP",
+                 "Employee distribution by Tenure Group", "Tenure Group", "Number of Employees", color="viridis")
+
+
+# Visualization 9: Hiring Trend
+def chart_hiring_trend(result, selected=None):
+    return _trend(_data(result, ["hire_year", "employee_count"]), "hire_year", "employee_count",
+                  "Employee Hired Trends by Year", "Year", "Number of Employees", "blue", selected=selected)
+
+
+# Visualization 10: Exit Trends
+def chart_exit_trend(result, selected=None):
+    return _trend(_data(result, ["exit_year", "total_exits"]), "exit_year", "total_exits",
+                  "Employee Exit Trends by Year", "Year", "Number of Exits", "#e63946", selected=selected)
+
+
+# Visualization 11: Total Employees by Year
+def chart_total_employees_by_year(result):
+    return _trend(_data(result, ["years", "total_emp"]), "years", "total_emp", "Total Employee by Year",
+                  "Year", "Total Employee Count", "skyblue")
+
+
+# Visualization 12: Employees by Department
+def chart_department_headcount(result, selected=None):
+    return _bars(_data(result, ["dept_name", "total_emp"]), "dept_name", "total_emp",
+                 "Total Employees by Department", "Department Name", "Total Employees", color="blues",
+                 horizontal=True, selected=selected)
+
+
+# Visualization 13: Average Salary by Department (labels: employee counts)
+def chart_department_avg_salary(result):
+    data = _data(result, ["dept_name", "avg_salary", "total_employees"])
+    order = data["dept_name"].tolist()
+    base = alt.Chart(data).encode(alt.X("dept_name:N", title="Department Name", sort=order,
+                                        axis=alt.Axis(labelAngle=-45)),
+                                  alt.Y("avg_salary:Q", title="Average Salary"), tooltip=list(data.columns))
+    labels = base.mark_text(baseline="bottom", dy=-3).encode(text=alt.Text("total_employees:Q", format=","))
+    return (base.mark_bar(color=BAR_COLOR) + labels).properties(title="Average Salary by Department")
+
+
+# Visualization 14: Managers by Department
+def chart_managers_by_department(result):
+    return _bars(_data(result, ["dept_name", "total_manager"]), "dept_name", "total_manager",
+                 "Total Managers by Department", "Department Name", "Total Managers", color="darkblue")
+
+
+# Visualization 15: Year-wise Average Salary
+def chart_salary_by_year(result):
+    return _trend(_data(result, ["years", "avg_sal"]), "years", "avg_sal", "Average Salary by Year",
+                  "Year", "Average Salary", "skyblue", label_format=",.2f")
+
+
+# Visualization 16: Distribution of Employees by salary
+def chart_salary_histogram(result):
+    return _histogram(result, "Distribution of Employees by salary", "Salary")
+
+
+# Visualization 17: Salary by Job Title
+def chart_title_avg_salary(result):
+    return _bars(_data(result, ["title", "avg_sal"]), "title", "avg_sal", "Average Salary by Job Title",
+                 "Job Title", "Average Salary", label_format=",.2f", color="viridis")
+
+
+# Visualization 18: Salary by Performance Rating
+def chart_rating_avg_salary(result):
+    return _bars(_data(result, ["Last_performance_rating", "avg_salary"]), "Last_performance_rating", "avg_salary",
+                 "Average Salary by Last Performance Rating", "Last Performance Rating", "Average Salary",
+                 label_format=",.2f")
+
+
+# Visualization 19: Employees by Salary Range
+def chart_salary_range_distribution(result, selected=None):
+    return _bars(_data(result, ["salary_range", "NO_OF_EMP"]), "salary_range", "NO_OF_EMP",
+                 "Employees by Salary Range", "Salary Range", "Total Employees", selected=selected)
+
+
+# Spec builder of each visualization, keyed like aggregations.VISUALIZATIONS
+CHARTS = {
+    "age_group_turnover": chart_age_group_turnover,
+    "attrition_rate_trend": chart_attrition_rate_trend,
+    "gender_distribution": chart_gender_distribution,
+    "performance_rating_distribution": chart_performance_rating_distribution,
+    "title_distribution": chart_title_distribution,
+    "project_distribution": chart_project_distribution,
+    "tenure_histogram": chart_tenure_histogram,
+    "tenure_group_distribution": chart_tenure_group_distribution,
+    "hiring_trend": chart_hiring_trend,
+    "exit_trend": chart_exit_trend,
+    "total_employees_by_year": chart_total_employees_by_year,
+    "department_headcount": chart_department_headcount,
+    "department_avg_salary": chart_department_avg_salary,
+    "managers_by_department": chart_managers_by_department,
+    "salary_by_year": chart_salary_by_year,
+    "salary_histogram": chart_salary_histogram,
+    "title_avg_salary": chart_title_avg_salary,
+    "rating_avg_salary": chart_rating_avg_salary,
+    "salary_range_distribution": chart_salary_range_distribution,
+}
+
+
+def _rows(result):
+    if isinstance(result, dict):
+        return len(result["counts"])
+    return len(result)
+
+
+# Vega-Lite spec of a chart as JSON, or "" when it exceeds the payload limits
+def build_spec(name, result, max_rows=MAX_ROWS, max_bytes=MAX_BYTES, selected=None):
+    if _rows(result) > max_rows:
+        return ""
+    chart = CHARTS[name](result) if selected is None else CHARTS[name](result, selected=selected)
+    spec = json.dumps(chart.to_dict(validate=False), separators=(",", ":"))
+    return spec if len(spec) <= max_bytes else ""
+
+
+# Spec of a chart, built once per result (and picked values) and served
+# from `cache` (the figure cache) afterwards. Returns None when the chart
+# exceeds the limits.
+def render_spec(name, result, cache, max_rows=MAX_ROWS, max_bytes=MAX_BYTES, selected=None):
+    fmt = "vega-lite" if selected is None else "vega-lite-pick:" + json.dumps(list(selected), default=str)
+    key = figure_key(name, result, None, None, fmt)
+    spec = cache.get_or_compute(key, lambda: build_spec(name, result, max_rows, max_bytes, selected))
+    return json.loads(spec) if spec else None